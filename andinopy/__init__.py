@@ -5,11 +5,12 @@
 #   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
 #                                     |_|    |___/
 # by Jakob Groß
+import atexit
 import configparser
 import logging
 import os
-
-from setuptools.command.setopt import config_file
+import threading
+import time
 
 andinopy_logger = logging.getLogger('andinopy')
 andinopy_logger.addHandler(logging.NullHandler())
@@ -18,6 +19,18 @@ base_config = configparser.ConfigParser()
 config_file_s = ""
 initialized = False
 
+# seconds save_base_config waits for further changes if [andino_tcp] config_save_delay is not set
+DEFAULT_SAVE_DELAY = 2.0
+# a config changed without a pause is still written after this many delays
+MAX_SAVE_DELAYS = 10
+# save_base_config calls and actual file writes, the difference has been coalesced
+save_requests = 0
+physical_writes = 0
+_dirty = False
+_dirty_since = 0.0
+_save_timer = None
+_save_lock = threading.Lock()
+
 
 def initialize_cfg(config_file_i=None):
     global initialized
@@ -39,11 +52,71 @@ def initialize_cfg(config_file_i=None):
 
 
 def save_base_config():
-    global initialized
-    global config_file_s
+    """
+    Mark the config as changed. It is written on a background thread once it has not changed for
+    [andino_tcp] config_save_delay seconds, so a burst of changes results in a single write.
+    Changes without a pause are written every MAX_SAVE_DELAYS delays, a delay of 0 writes immediately
+    """
+    global save_requests
+    global _dirty
+    global _dirty_since
+    global _save_timer
     if not initialized:
         raise RuntimeWarning("Config was not initialized - cannot save config")
-    fp = open(config_file_s[:-4]+"_saved.cfg", 'w')
-    base_config.write(fp, space_around_delimiters=False)
+    save_delay = base_config.getfloat("andino_tcp", "config_save_delay", fallback=DEFAULT_SAVE_DELAY)
+    with _save_lock:
+        save_requests += 1
+        now = time.monotonic()
+        if not _dirty:
+            _dirty_since = now
+        _dirty = True
+        if save_delay <= 0:
+            _write_base_config()
+            return
+        if _save_timer is not None:
+            _save_timer.cancel()
+        # every change restarts the delay, but not beyond the longest wait
+        delay = min(save_delay, _dirty_since + save_delay * MAX_SAVE_DELAYS - now)
+        _save_timer = threading.Timer(max(delay, 0), flush_base_config)
+        _save_timer.daemon = True
+        _save_timer.start()
+
+
+def flush_base_config():
+    """
+    Write pending config changes now
+    """
+    global _save_timer
+    with _save_lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+            _save_timer = None
+        if _dirty:
+            _write_base_config()
+
+
+def save_statistics() -> dict:
+    return {"requested": save_requests, "written": physical_writes, "coalesced": save_requests - physical_writes}
+
+
+def _write_base_config():
+    # write to a temporary file and rename it, a power loss leaves either the old or the new file
+    global physical_writes
+    global _dirty
+    file_name = config_file_s[:-4] + "_saved.cfg"
+    try:
+        with open(file_name + ".tmp", 'w') as fp:
+            base_config.write(fp, space_around_delimiters=False)
+            fp.flush()
+            os.fsync(fp.fileno())
+        os.replace(file_name + ".tmp", file_name)
+    except OSError as os_error:
+        # still dirty, the next save or the flush at exit tries again
+        andinopy_logger.error(f"saving config to {file_name} failed: {os_error}")
+        return
+    _dirty = False
+    physical_writes += 1
     andinopy_logger.info("config saved")
-    fp.close()
+
+
+atexit.register(flush_base_config)
@@ -1,12 +1,10 @@
 import logging
-import multiprocessing
+import os
 import resource
 import threading
 import time
 import andinopy
-import gpiozero
 import sys
-from gpiozero.pins.mock import MockFactory
 
 from andinopy.tcp.andino_tcp import andino_tcp
 
@@ -29,13 +27,15 @@ ch.setFormatter(formatter)
 log.addHandler(ch)
 
 if sys.platform.startswith("win"):
+    import gpiozero
+    from gpiozero.pins.mock import MockFactory
     gpiozero.Device.pin_factory = MockFactory()
 server = andino_tcp()
 try:
 
     server.start()
     print("andino server started on port 9999")
-    cores = multiprocessing.cpu_count()
+    cores = os.cpu_count()
     usage = resource.getrusage(resource.RUSAGE_SELF)
     user_time = usage.ru_utime
     total_user_time = user_time
@@ -6,16 +6,18 @@
 #                                     |_|    |___/
 # by Jakob Groß
 import sys
-from typing import Dict, Tuple, List
 
 from andinopy import base_config, save_base_config
+from andinopy.base_devices.oled_renderer import oled_renderer
+from andinopy.base_devices.ssd1306_framebuffer import ssd1306_framebuffer
+from andinopy.base_devices.oled_text import oled_text_renderer
+from andinopy.base_devices.oled_protocol import oled_update, check_update, format_oled_text
 
 if sys.platform == "linux":
     import busio
     import adafruit_ssd1306
 from PIL import Image
 from PIL import ImageFont
-from PIL import ImageDraw
 
 
 class andino_io_oled:
@@ -32,6 +34,9 @@ class andino_io_oled:
             self.display = adafruit_ssd1306.SSD1306_I2C(self.WIDTH, self.HEIGHT, self.i2c)
             self.display.fill(0)
             self.display.show()
+            # only changed pages and columns are sent, framebuffer.on_bytes_sent reports the bytes per frame
+            self.framebuffer = ssd1306_framebuffer(self._i2c_write, self.WIDTH, self.HEIGHT)
+            self.framebuffer.set_cleared()
 
         self.padding = -2
         self.config: (str, str) = ("21", None)
@@ -40,19 +45,13 @@ class andino_io_oled:
             self.font_path = r"/usr/share/fonts/truetype/FIRACODE.TTF"
         else:
             self.font_path = r"C:\Windows\Fonts\Consolas\consola.ttf"
-        self.fonts = {"default": ImageFont.load_default()}
-        for i in [60, 30, 40, 21, 20, 16, 14, 8]:
-            self.fonts[f"font{i}"] = ImageFont.truetype(self.font_path, i)
-        self.modes: Dict[str, Tuple[List[int], str]] = {  # top diffs,font
-            "10": ([0], "font60"),  # 1 Line, 3 Chars mode
-            "11": ([20], "font30"),  # 1 Line, 4 Chars mode
-            "20": ([0, 35], "font30"),  # 2 Line, 6 Chars
-            "21": ([5, 40], "font21"),  # 2 Line, 9 Chars
-            "30": ([2, 24, 46], "font20"),  # 3 Line, 9 Chars
-            "31": ([2, 27, 52], "font16"),  # 3 Line, 12 Chars
-            "40": ([1, 17, 34, 51], "font14"),  # 4 Line, 14 Chars
-            "60": ([3, 13, 23, 33, 43, 53], "font8")  # 6 Lines
-        }
+        # fonts are loaded the first time a mode uses them, rasterised lines are cached
+        self.text_renderer = oled_text_renderer(self.WIDTH, self.HEIGHT, self._load_font, self.padding)
+        self.modes = self.text_renderer.modes
+        # set_text returns at once, frames are rendered and sent by the render thread
+        self.renderer = oled_renderer(self._render_image, self._show_image,
+                                      float(base_config.get("oled", "max_fps", fallback="10")))
+        self.renderer.start()
 
     # region send_counter
     @property
@@ -87,40 +86,59 @@ class andino_io_oled:
     def set_text(self, text: [[str]]):
         """
         Set TExt on the display
+        The text is shown by the render thread, bursts of updates are shown as the latest one
         :param text: [["col1 row1","col1 row2"],["col2 row2"...]]
         """
         self.text = text
-        self.display_text()
+        self.renderer.request()
+
+    def apply(self, update: oled_update):
+        """
+        Apply a parsed OLED command
+        :param update: see andinopy.base_devices.oled_protocol
+        :raises ValueError: if the update does not fit the modes
+        """
+        check_update(update, self.modes, self.config)
+        if update.modes is not None:
+            self.set_mode(*update.modes)
+        if update.columns is not None:
+            self.set_text(update.columns)
+
+    def info(self) -> str:
+        """
+        :return: the modes and the text like in OLED commands
+        """
+        modes = " ".join(mode for mode in self.config if mode is not None)
+        return f"{modes} {format_oled_text(self.text)}"
+
+    def stop(self):
+        self.renderer.stop()
 
     def display_text(self):
         """
-        Displays the text set in self.text
+        Displays the text set in self.text, waits until it is sent
         """
+        self._show_image(self._render_image())
+
+    def _load_font(self, name: str):
+        if name == "default":
+            return ImageFont.load_default()
+        return ImageFont.truetype(self.font_path, int(name[len("font"):]))
+
+    def _render_image(self) -> Image.Image:
+        return self.text_renderer.render(self.config, self.text, self.rotate == 1)
+
+    def _show_image(self, my_image: Image.Image):
+        # the image replaces the whole frame, no clearing needed
         if sys.platform == "linux":
-            self.display.fill(0)
-            self.display.show()
-        my_image = Image.new('1', (self.WIDTH, self.HEIGHT))
-
-        draw = ImageDraw.Draw(my_image)
-        for j in range(len(self.config)):
-            if self.config[j] is not None:
-                offset = 0.5*self.WIDTH*j
-                row, font = self.modes[self.config[j]]
-                font = self.fonts[font]
-
-                for i in range(len(row)):
-                    text = text = self.text[j][i]
-                    draw.text(xy=(offset, self.padding + row[i]), font=font, text=text, fill=255)
-                    # print(my_image.tobytes())
-
-        if self.rotate == 1:
-            my_image = my_image.rotate(180)
-        if sys.platform == "linux":
-            self.display.image(my_image)
-            self.display.show()
+            self.framebuffer.show(my_image)
         else:
             my_image.show()
 
+    def _i2c_write(self, data: bytes):
+        with self.display.i2c_device:
+            self.display.i2c_device.write(data)
+
 
 if __name__ == "__main__":
     display = andino_io_oled()
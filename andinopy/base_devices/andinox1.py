@@ -7,7 +7,10 @@
 # by Jakob Groß
 import subprocess
 import time
-from threading import Thread, Timer
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from threading import Thread, Timer, Lock
+from typing import Deque, Dict, List, Optional
 
 import serial
 
@@ -17,6 +20,28 @@ from andinopy.interfaces.andino_temp_interface import andino_temp_interface
 
 
 class andino_x1(andino_hardware_interface, andino_temp_interface):
+    # method -> text of its command, the x1 confirms a command by echoing it
+    x1_commands: Dict[str, callable] = {
+        "reset": lambda: "RESET",
+        "info": lambda: "INFO",
+        "hardware": lambda mode: f"HARD {mode}",
+        "set_polling": lambda polling_time: f"POLL {polling_time}",
+        "set_skip": lambda skip_count: f"SKIP {skip_count}",
+        "set_edge_detection": lambda value: f"EDGE {int(value)}",
+        "set_send_time": lambda send_time: f"SEND {send_time}",
+        "set_send_broadcast_timer": lambda value: f"CNTR {int(value)}",
+        "set_debounce": lambda debouncing: f"DEBO {debouncing}",
+        "set_power": lambda value: f"POWR {value}",
+        "set_send_relays_status": lambda value: f"REL? {int(value)}",
+        "set_relay": lambda relay_num, value: f"REL{relay_num} {value}",
+        "pulse_relay": lambda relay_num, value: f"RPU{relay_num} {int(value)}",
+        "set_broadcast_on_change": lambda value: f"CHNG {int(value)}",
+        "set_temp_broadcast_timer": lambda value: f"SENDT {value}",
+        "get_temp": lambda: "TEMP",
+        "set_bus": lambda count: f"TBUS {count}",
+        "get_addresses": lambda: "ADDRT",
+    }
+
     def get_counters(self, mode: int) -> str:
         raise NotImplementedError()
 
@@ -40,7 +65,12 @@ class andino_x1(andino_hardware_interface, andino_temp_interface):
         self._read_size = read_size
         self._serial_port = serial.Serial(port, baud, byte_size, parity, writeTimeout=write_timeout,
                                           timeout=timeout)
-        self.received = []
+        # unsolicited answers which did not match a pending request, only the latest are kept
+        self.received: Deque[str] = deque(maxlen=64)
+        # requests waiting for their confirmation, keyed by the command, oldest first
+        self._pending: Dict[str, Deque[Future]] = {}
+        self._pending_lock = Lock()
+        self._write_lock = Lock()
         self.timeout = 1  # 1second
         self._shutdown_index = None
         self._shutdown_after_seconds = None
@@ -51,7 +81,14 @@ class andino_x1(andino_hardware_interface, andino_temp_interface):
             buffer = ""
 
             while x1instance.running:
-                data = serial_port.read(1024).decode()
+                # read what is buffered instead of waiting for the timeout to fill read_size bytes
+                try:
+                    data = serial_port.read(min(max(serial_port.in_waiting, 1), x1instance._read_size)).decode()
+                except Exception:
+                    if not x1instance.running:
+                        # port closed by stop
+                        break
+                    raise
                 buffer += data
                 buffer = buffer.replace("\r", "")
                 index = buffer.find("\n")
@@ -113,63 +150,83 @@ class andino_x1(andino_hardware_interface, andino_temp_interface):
         if self._serial_port.is_open:
             self._serial_port.close()
         self._receive_thread.join(1)
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = {}
+        for futures in pending.values():
+            for future in futures:
+                future.set_result("ERROR")
 
     def _send_to_x1(self, message):
-        self._serial_port.write((message + "\r\n").encode())
+        with self._write_lock:
+            self._serial_port.write((message + "\r\n").encode())
+
+    def _send_many_to_x1(self, messages: List[str]):
+        with self._write_lock:
+            self._serial_port.write("".join(message + "\r\n" for message in messages).encode())
+
+    def command_text(self, method: str, *arguments) -> Optional[str]:
+        """
+        :param method: name of the method sending the command, e.g. "set_relay"
+        :param arguments: arguments of the method
+        :return: the text the method sends to the x1, None if the method sends no command
+        """
+        build = self.x1_commands.get(method)
+        return None if build is None else build(*arguments)
 
     def reset(self) -> str:
-        return self.send_with_confirm("RESET")
+        return self.send_with_confirm(self.command_text("reset"))
 
     def info(self) -> str:
-        return self.send_with_confirm("INFO")
+        return self.send_with_confirm(self.command_text("info"))
 
     def hardware(self, mode: int) -> str:
-        return self.send_with_confirm(f"HARD {mode}")
+        return self.send_with_confirm(self.command_text("hardware", mode))
 
     def set_polling(self, polling_time: int) -> str:
-        return self.send_with_confirm(f"POLL {polling_time}")
+        return self.send_with_confirm(self.command_text("set_polling", polling_time))
 
     def set_skip(self, skip_count: int) -> str:
-        return self.send_with_confirm("SKIP")
+        return self.send_with_confirm(self.command_text("set_skip", skip_count))
 
     def set_edge_detection(self, value: bool) -> str:
-        return self.send_with_confirm(f"EGDE {int(value)}")
+        return self.send_with_confirm(self.command_text("set_edge_detection", value))
 
     def set_send_time(self, send_time: int) -> str:
-        return self.send_with_confirm(f"SEND {send_time}")
+        return self.send_with_confirm(self.command_text("set_send_time", send_time))
 
     def set_send_broadcast_timer(self, value: bool) -> str:
-        return self.send_with_confirm(f"CNTR {int(value)}")
+        return self.send_with_confirm(self.command_text("set_send_broadcast_timer", value))
 
     def set_debounce(self, debouncing: int) -> str:
-        return self.send_with_confirm(f"DEBO {debouncing}")
+        return self.send_with_confirm(self.command_text("set_debounce", debouncing))
 
     def set_power(self, value: int) -> str:
-        return self.send_with_confirm(f"POWR {value}")
+        return self.send_with_confirm(self.command_text("set_power", value))
 
     def set_send_relays_status(self, value: bool) -> str:
-        return self.send_with_confirm(f"REL? {int(value)}")
+        return self.send_with_confirm(self.command_text("set_send_relays_status", value))
 
     def set_relay(self, relay_num: int, value: int) -> str:
-        return self.send_with_confirm(f"REL{relay_num} {value}")
+        return self.send_with_confirm(self.command_text("set_relay", relay_num, value))
 
     def pulse_relay(self, relay_num: int, value: int) -> str:
-        return self.send_with_confirm(f"RPU{relay_num} {int(value)}")
+        return self.send_with_confirm(self.command_text("pulse_relay", relay_num, value))
 
     def set_broadcast_on_change(self, value: bool) -> str:
-        return self.send_with_confirm(f"CHNG {int(value)}")
+        return self.send_with_confirm(self.command_text("set_broadcast_on_change", value))
 
     def set_temp_broadcast_timer(self, value: int) -> str:
-        return self.send_with_confirm(f"SENDT {value}")
+        return self.send_with_confirm(self.command_text("set_temp_broadcast_timer", value))
 
     def get_temp(self) -> str:
-        return self.send_with_confirm(f"TEMP")
+        return self.send_with_confirm(self.command_text("get_temp"))
 
     def set_bus(self, count: int) -> str:
-        return self.send_with_confirm(f"TBUS {count}")
+        return self.send_with_confirm(self.command_text("set_bus", count))
 
     def get_addresses(self) -> str:
-        return self.send_with_confirm(f"ADDRT")
+        return self.send_with_confirm(self.command_text("get_addresses"))
 
     def handle_receive(self, from_x1):
         recv: str = from_x1
@@ -196,18 +253,69 @@ class andino_x1(andino_hardware_interface, andino_temp_interface):
 
             self.broadcast(recv)
         else:
-
+            with self._pending_lock:
+                futures = self._pending.get(recv)
+                if futures:
+                    futures.popleft().set_result(recv)
+                    if not futures:
+                        del self._pending[recv]
+                    return
             self.received.append(recv)
 
+    def _add_pending(self, message: str) -> Future:
+        future = Future()
+        with self._pending_lock:
+            self._pending.setdefault(message, deque()).append(future)
+        return future
+
+    def _remove_pending(self, message: str, future: Future):
+        with self._pending_lock:
+            futures = self._pending.get(message)
+            if futures is not None and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._pending[message]
+
     def send_with_confirm(self, message):
-        check_interval = 0.01  # check all 10 ms
+        """
+        Send a command and wait until the x1 confirms it
+        :param message: command
+        :return: the confirmation or "ERROR" if it did not arrive within self.timeout
+        """
+        # registered before sending so a fast answer can't be missed
+        future = self._add_pending(message)
         self._send_to_x1(message)
-        for i in range(int(self.timeout / check_interval)):
-            for recv in self.received:
-                if message == recv:
-                    return self.received.pop()
-            time.sleep(check_interval)
-        return "ERROR"
+        return self._wait_confirm(message, future, self.timeout)
+
+    def send_many(self, messages: List[str], window: int = 8) -> List[str]:
+        """
+        Send several commands back to back without waiting for each confirmation first
+        :param messages: commands
+        :param window: maximum number of unconfirmed commands sent to the x1
+        :return: the confirmation or "ERROR" for every command, in order
+        """
+        futures = [self._add_pending(message) for message in messages]
+        sent_at = [0.0] * len(messages)
+        start = time.monotonic()
+        for i in range(min(window, len(messages))):
+            sent_at[i] = start
+        self._send_many_to_x1(messages[:window])
+        results = []
+        for i in range(len(messages)):
+            timeout = max(sent_at[i] + self.timeout - time.monotonic(), 0)
+            results.append(self._wait_confirm(messages[i], futures[i], timeout))
+            if i + window < len(messages):
+                sent_at[i + window] = time.monotonic()
+                self._send_to_x1(messages[i + window])
+        return results
+
+    def _wait_confirm(self, message: str, future: Future, timeout: float) -> str:
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            self._remove_pending(message, future)
+            # the confirmation may have arrived while removing
+            return future.result() if future.done() else "ERROR"
 
     def broadcast(self, received: str):
         self.broad_cast_function(received[5:])
@@ -5,9 +5,13 @@
 #   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
 #                                     |_|    |___/
 # by Jakob Groß
+import asyncio
 import sys
 import threading
 import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError
+from typing import Deque, Dict, List, Optional, Tuple
 
 import serial
 
@@ -19,8 +23,9 @@ def nextion_exception(message):
 
 
 nextion_codes = {
-    0x0: lambda: print(""),
-    0x1: lambda: nextion_exception("Invalid Command"),
+    0x0: lambda: nextion_exception("Invalid Instruction"),
+    # instruction successful, only sent with bkcmd=1 or 3
+    0x1: lambda: None,
     0x2: lambda: nextion_exception("Invalid ComponentID in last instruction"),
     0x3: lambda: nextion_exception("Invalid PageID in last instruction"),
     0x4: lambda: nextion_exception("Invalid PictureID in last instruction"),
@@ -39,12 +44,24 @@ nextion_codes = {
                                     "Max length is 29 characters: 14 for page + “.” + 14 for component."),
     0x24: lambda: nextion_exception("Serial Buffer overflow"),
 }
+NEXTION_SUCCESS = 0x1
+
+# kinds of answers a request waits for
+REQUEST_GET = "get"
+REQUEST_PAGE = "sendme"
+# answers of requests given up on are discarded until the answer of the sync marker arrives
+REQUEST_SYNC = "sync"
+# any other command, only answered with a return code if it fails or bkcmd=3 acknowledges it
+COMMAND_WRITE = "write"
 
 
 class display:
     port: serial.Serial = None
     _read_thread: threading.Thread = None
     _stop_bits: bytes = bytes([0xFF, 0xFF, 0xFF])
+    _read_size: int = 4096
+    # the display has a 1024 byte serial buffer
+    _write_size: int = 1024
 
     def __init__(self, serial_port: str = "/dev/ttyAMA0", serial_baud: int = 9600, serial_stop_bits: int = 1,
                  serial_data_bits: int = 8, serial_timeout: float = None,
@@ -77,6 +94,31 @@ class display:
         self._debug_level = 3
         self.running = False
         self.requested_value = None
+        self.timeout = 1  # 1second
+        # commands which may still be answered (future, kind, sync marker, sent at), the display answers in order
+        self._pending: Deque[Tuple[Optional[Future], str, Optional[str], float]] = deque()
+        self._pending_lock = threading.Lock()
+        self._sync_counter = 0
+        self._read_buffer = bytearray()
+        self._read_cursor = 0
+        # last value written per "obj.attr", writes of the same value are skipped
+        self.use_shadow = True
+        self._shadow: Dict[str, str] = {}
+        self._shadow_lock = threading.Lock()
+        self.shadow_hits = 0
+        self.shadow_misses = 0
+        # commands are written by one writer thread, pending updates of the same attribute are collapsed
+        self._write_queue: Deque[list] = deque()
+        self._collapsible: Dict[str, list] = {}
+        self._write_condition = threading.Condition()
+        self._write_thread: threading.Thread = None
+        self._writer_running = False
+        self.max_queue = 1024
+        self.collapsed = 0
+        # with bkcmd=3 every command is acknowledged, at most ack_window commands are unacknowledged
+        self.ack_mode = False
+        self.ack_window = 8
+        self._in_flight = 0
         andinopy_logger.info("Nextion device initialized")
 
     def start(self):
@@ -92,41 +134,169 @@ class display:
         self.running = True
 
         def _read_thread(handle: display):
-            read_buffer = bytearray()
             andinopy_logger.info("Nextion device listener Thread started")
-            # print(handle.port.fd)
+            handle._read_buffer = bytearray()
+            handle._read_cursor = 0
             while handle.running:
                 try:
-                    x = handle.port.read(1)
+                    # read what is buffered instead of one byte per call
+                    x = handle.port.read(min(max(handle.port.in_waiting, 1), handle._read_size))
                 except serial.SerialException as serialEx:
+                    if not handle.running:
+                        break
                     andinopy_logger.info(f"Serial Exception: {serialEx} - rebuilding Port, retrying in 2 seconds")
                     handle.rebuild_port()
                     time.sleep(2)
                     continue
-                andinopy_logger.debug(f"Nextion read: {x}")
-                read_buffer.append(int.from_bytes(x, "big"))
-                if read_buffer.endswith(b'\xff\xff\xff'):
-                    if len(read_buffer) > 3:
-                        handle.from_nextion(read_buffer[:-3])
-                    read_buffer = bytearray()
+                except (OSError, TypeError, AttributeError):
+                    if not handle.running:
+                        # port closed by stop
+                        break
+                    raise
+                if x:
+                    handle._feed(x)
 
             andinopy_logger.info("Nextion device listener Thread stopped")
 
         self._read_thread = threading.Thread(target=_read_thread, args=[self])
         self._read_thread.start()
+        self._writer_running = True
+        self._write_thread = threading.Thread(target=self._t_write_thread_code)
+        self._write_thread.start()
         andinopy_logger.info("Nextion device started")
 
     def get_attr(self, attr_name):
-        self.send_raw(f"get {attr_name}")
-        return self.get_request()
+        """
+        Read an attribute of the display
+        :param attr_name: e.g. "page0.n0.val"
+        :return: the value or None if no answer arrived within self.timeout
+        """
+        return self._wait_request(self.request(f"get {attr_name}"), self.timeout)
+
+    def get_attrs(self, attr_names: List[str]) -> list:
+        """
+        Read several attributes with all requests sent before waiting for the first answer
+        :param attr_names: attributes to read
+        :return: the values in order, None for every attribute without an answer within self.timeout
+        """
+        futures = [self.request(f"get {attr_name}") for attr_name in attr_names]
+        end = time.monotonic() + self.timeout
+        return [self._wait_request(future, max(end - time.monotonic(), 0)) for future in futures]
+
+    async def get_attr_async(self, attr_name):
+        """
+        Read an attribute of the display without blocking the event loop
+        :param attr_name: e.g. "page0.n0.val"
+        :return: the value or None if no answer arrived within self.timeout
+        """
+        future = self.request(f"get {attr_name}")
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            return self._wait_request(future, 0)
+
+    def get_page(self):
+        """
+        :return: the current page id or None if no answer arrived within self.timeout
+        """
+        return self._wait_request(self.request("sendme"), self.timeout)
+
+    def request(self, command: str) -> Future:
+        """
+        Send a command which the display answers with a value (get, sendme)
+        :param command: command
+        :return: Future resolved with the answer
+        """
+        future = Future()
+        kind = REQUEST_PAGE if command.strip() == "sendme" else REQUEST_GET
+        # the writer queue adds the future to the pending ones, so they have the order of the display's answers
+        if not self._send(command, pending=(future, kind, None)):
+            future.set_result(None)
+        return future
+
+    def _wait_request(self, future: Future, timeout: float):
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            self._resync()
+            # the answer may have arrived meanwhile
+            return future.result() if future.done() else None
+
+    def _resync(self):
+        """
+        A request was not answered in time, its answer may still come or be lost. Every waiting request fails
+        and the answers sent until the display answers a marker are discarded, so no answer reaches the wrong
+        request
+        :return: None
+        """
+        # the write condition keeps other requests from being queued before the marker
+        with self._write_condition:
+            with self._pending_lock:
+                # an older marker is replaced, its answer is discarded like the others
+                failed = [future for future, _, _, _ in self._pending if future is not None and not future.done()]
+                self._pending.clear()
+            self._sync_counter += 1
+            marker = f"andinopy-sync-{self._sync_counter}"
+            self._send(f'get "{marker}"', pending=(None, REQUEST_SYNC, marker))
+        for future in failed:
+            future.set_result(None)
+
+    def _resolve_request(self, kind: str, value):
+        """
+        Hand a value to the oldest request, the writes sent before it succeeded without an answer
+        :param kind: REQUEST_GET or REQUEST_PAGE
+        :param value: the answer
+        """
+        with self._pending_lock:
+            pending = self._pending
+            if pending and pending[0][1] == REQUEST_SYNC:
+                # answer of a request given up on
+                if kind == REQUEST_GET and value == pending[0][2]:
+                    pending.popleft()
+                return
+            for index, (future, expected, _, _) in enumerate(pending):
+                if expected != COMMAND_WRITE:
+                    if expected == kind:
+                        for _ in range(index):
+                            pending.popleft()
+                        pending.popleft()
+                        future.set_result(value)
+                        return
+                    break
+        # unsolicited, e.g. a print from the HMI or a page sending its number
+        self.requested_value = value
+
+    def _resolve_return_code(self, success: bool):
+        """
+        A return code answers the oldest command not known to be done. With bkcmd=2 only failures are answered,
+        a failed get or sendme is answered with the error instead of a value
+        :param success: 0x01 was received
+        """
+        with self._pending_lock:
+            pending = self._pending
+            if not pending or pending[0][1] == REQUEST_SYNC:
+                return
+            if success:
+                # only writes are acknowledged, requests are answered with their value
+                if pending[0][1] == COMMAND_WRITE:
+                    pending.popleft()
+                return
+            future = pending.popleft()[0]
+            if future is not None:
+                future.set_result(None)
 
     def rebuild_port(self):
+        self.invalidate_shadow()
         self.port.close()
         self.port = serial.Serial(port=self.serial_port, baudrate=self.serial_baud,
                                   stopbits=self.serial_stop_bits,
                                   bytesize=self.serial_data_bits, timeout=self.serial_timeout)
 
     def get_request(self):
+        """
+        Wait for a value the display sent without a request
+        :return: the value or None if the display was stopped
+        """
         while self.requested_value is None and self.running:
             time.sleep(0.01)
         x = self.requested_value
@@ -139,7 +309,8 @@ class display:
         :return None
         """
         andinopy_logger.info("Nextion device changed page")
-        self.send_raw(f"page {page}")
+        self.invalidate_shadow()
+        self._send(f"page {page}")
 
     def set_text(self, obj: str, text: str):
         """
@@ -152,10 +323,14 @@ class display:
 
     def set_debug_level(self, level: int):
         self._debug_level = level
-        self.send_raw(f"bkcmd={level}")
+        self._send(f"bkcmd={level}")
+        self.ack_mode = level == 3
 
     def reset(self):
-        self.send_raw("reset")
+        self.invalidate_shadow()
+        self._send("reset")
+        # the display restarts with its default bkcmd
+        self.ack_mode = False
 
     def set_attr(self, obj: str, atr: str, val: str):
         """
@@ -165,40 +340,210 @@ class display:
         :param val: new attribute value
         :return:
         """
-        self.send_raw(f"{obj}.{atr}={val}")
+        key = f"{obj}.{atr}"
+        if not self.use_shadow:
+            self._send(f"{key}={val}", key)
+            return
+        with self._shadow_lock:
+            if self._shadow.get(key) == val:
+                self.shadow_hits += 1
+                return
+            self.shadow_misses += 1
+            # recorded before the write, so an error reply of the display always removes it
+            self._shadow[key] = val
+        if not self._send(f"{key}={val}", key):
+            with self._shadow_lock:
+                if self._shadow.get(key) == val:
+                    del self._shadow[key]
+
+    def invalidate_shadow(self):
+        """
+        Forget the written values, the next write of every attribute is sent to the display
+        :return: None
+        """
+        with self._shadow_lock:
+            self._shadow.clear()
+
+    def shadow_statistics(self) -> Dict[str, int]:
+        """
+        :return: skipped (hits) and sent (misses) attribute writes
+        """
+        return {"hits": self.shadow_hits, "misses": self.shadow_misses}
 
     def send_raw(self, text: str):
         """
         send raw Text to the nextion display
+        raw commands may change any attribute so the written values are forgotten
         :param text:
         :return:
         """
+        self.invalidate_shadow()
+        self._send(text)
+
+    def _send(self, text: str, key: str = None, pending: tuple = None) -> bool:
         try:
             encoded = text.rstrip().encode(self.encoding) + self._stop_bits
-            self.port.write(encoded)
         except UnicodeEncodeError as unicodeEncodeError:
             print(f"Text: {text} could no be encoded to: {self.encoding}")
+            return False
+        self._enqueue(encoded, key, pending)
+        return True
 
     def send_hex(self, text: str):
-        self.port.write(bytes.fromhex(text))
-        self.port.write(self._stop_bits)
+        self.invalidate_shadow()
+        self._enqueue(bytes.fromhex(text) + self._stop_bits)
+
+    # region writer
+    def _enqueue(self, data: bytes, key: str = None, pending: tuple = None):
+        """
+        Queue a command for the writer thread
+        :param data: encoded command
+        :param key: "obj.attr" if the command only sets this attribute, a newer value replaces a pending one
+        :param pending: (future, kind, marker) of a request, waits for its answer in the order of the commands
+        :return: None
+        """
+        if pending is None:
+            # an error reply of the write must not be taken for the answer of a request
+            pending = (None, COMMAND_WRITE, None)
+        with self._write_condition:
+            if not self._writer_running:
+                self._add_pending(pending)
+                self.port.write(data)
+                return
+            if key is None:
+                # nothing is moved across other commands
+                self._collapsible.clear()
+            else:
+                entry = self._collapsible.get(key)
+                if entry is not None:
+                    entry[1] = data
+                    self.collapsed += 1
+                    return
+            while len(self._write_queue) >= self.max_queue and self._writer_running:
+                self._write_condition.wait()
+            self._add_pending(pending)
+            entry = [key, data]
+            self._write_queue.append(entry)
+            if key is not None:
+                self._collapsible[key] = entry
+            self._write_condition.notify_all()
+
+    def _add_pending(self, pending: tuple):
+        # called with the write condition held, the reader only takes the short pending lock
+        now = time.monotonic()
+        with self._pending_lock:
+            queue = self._pending
+            # a write not failed within the timeout succeeded, with bkcmd=2 nothing else tells
+            while queue and queue[0][1] == COMMAND_WRITE and now - queue[0][3] > self.timeout:
+                queue.popleft()
+            queue.append(pending + (now,))
+
+    def _acknowledge(self):
+        if self.ack_mode:
+            with self._write_condition:
+                if self._in_flight:
+                    self._in_flight -= 1
+                    self._write_condition.notify_all()
+
+    def _t_write_thread_code(self):
+        andinopy_logger.info("Nextion device writer Thread started")
+        while True:
+            with self._write_condition:
+                while self._writer_running and (not self._write_queue or
+                                                (self.ack_mode and self._in_flight >= self.ack_window)):
+                    if not self._write_condition.wait(self.timeout) and self._write_queue and self._in_flight:
+                        andinopy_logger.info("Nextion acknowledgements missing - resuming")
+                        self._in_flight = 0
+                if not self._write_queue:
+                    break
+                allowed = len(self._write_queue)
+                if self.ack_mode and self._writer_running:
+                    allowed = max(self.ack_window - self._in_flight, 1)
+                batch = []
+                size = 0
+                while self._write_queue and len(batch) < allowed \
+                        and (not batch or size + len(self._write_queue[0][1]) <= self._write_size):
+                    entry = self._write_queue.popleft()
+                    if self._collapsible.get(entry[0]) is entry:
+                        del self._collapsible[entry[0]]
+                    batch.append(entry[1])
+                    size += len(entry[1])
+                if self.ack_mode:
+                    self._in_flight += len(batch)
+                self._write_condition.notify_all()
+            try:
+                self.port.write(b"".join(batch))
+            except Exception as exception:
+                andinopy_logger.info(f"Nextion write failed: {exception}")
+        andinopy_logger.info("Nextion device writer Thread stopped")
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until the writer thread has written every queued command
+        :param timeout: seconds, None waits forever
+        :return: True if the queue is empty
+        """
+        with self._write_condition:
+            return self._write_condition.wait_for(lambda: not self._write_queue, timeout)
+
+    # endregion
 
     def stop(self):
         andinopy_logger.info("Nextion device stopped")
         self.running = False
+        with self._pending_lock:
+            while self._pending:
+                future = self._pending.popleft()[0]
+                if future is not None:
+                    future.set_result(None)
+        with self._write_condition:
+            self._writer_running = False
+            self._write_condition.notify_all()
+        if self._write_thread is not None:
+            self._write_thread.join(2)
         self._read_thread.join(0.1)
         time.sleep(1)
         if self.port.is_open:
             self.port.close()
 
-    def from_nextion(self, read_buffer: bytearray):
+    def _feed(self, data: bytes):
+        """
+        Collects received bytes and hands every frame terminated by FF FF FF to from_nextion
+        :param data: bytes read from the port
+        :return: None
+        """
+        buffer = self._read_buffer
+        buffer += data
+        start = 0
+        index = buffer.find(self._stop_bits, self._read_cursor)
+        if index < 0:
+            # the terminator may be split across reads
+            self._read_cursor = max(0, len(buffer) - 2)
+            return
+        with memoryview(buffer) as view:
+            while index >= 0:
+                if index > start:
+                    self.from_nextion(view[start:index])
+                start = index + 3
+                index = buffer.find(self._stop_bits, start)
+        del buffer[:start]
+        self._read_cursor = max(0, len(buffer) - 2)
+
+    def from_nextion(self, read_buffer: memoryview):
         # print(read_buffer)
         if read_buffer[0] == 0x88:
             # Started
+            self.invalidate_shadow()
+            self.ack_mode = False
             return
         if len(read_buffer) >= 3 and read_buffer[0:3] == b"\x00\x00\x00":
             return
         if read_buffer[0] in nextion_codes:
+            self._acknowledge()
+            if read_buffer[0] != NEXTION_SUCCESS:
+                # the reply does not tell which command failed, any written value may be wrong
+                self.invalidate_shadow()
+            self._resolve_return_code(read_buffer[0] == NEXTION_SUCCESS)
             nextion_codes[read_buffer[0]]()
             return
 
@@ -209,18 +554,22 @@ class display:
             return
         if read_buffer[0] == 0x71:
             # Numerical Data:
-            self.requested_value = int(read_buffer[1]) \
-                                   + (int(read_buffer[2]) * 256) \
-                                   + (int(read_buffer[3]) * 65536) \
-                                   + (int(read_buffer[4]) * 16777216)
+            self._acknowledge()
+            self._resolve_request(REQUEST_GET, int(read_buffer[1])
+                                  + (int(read_buffer[2]) * 256)
+                                  + (int(read_buffer[3]) * 65536)
+                                  + (int(read_buffer[4]) * 16777216))
             return
         if read_buffer[0] == 0x70:
-            self.requested_value = read_buffer[1:].decode(encoding="ascii")
+            self._acknowledge()
+            self._resolve_request(REQUEST_GET, str(read_buffer[1:], encoding="ascii"))
             return
 
         if read_buffer[0] == 0x66:
             # Page Number
-            self.requested_value = int(read_buffer[2])
+            self._acknowledge()
+            self.invalidate_shadow()
+            self._resolve_request(REQUEST_PAGE, int(read_buffer[1]))
             return
 
         if read_buffer[0] == 0x86:
@@ -231,4 +580,5 @@ class display:
 
         else:
             if self.on_display_string is not None:
-                self.on_display_string(read_buffer)
+                # the frame is only valid during this call
+                self.on_display_string(bytearray(read_buffer))
@@ -0,0 +1,136 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+OLED commands of the tcp protocol:
+    OLED MODE <mode column 1> [<mode column 2>]
+    OLED INFO
+    OLED <{line 1}{line 2}...>[<{line 1}...>]
+Inside {} every character is text, a backslash escapes the next one (\\} and \\\\)
+"""
+from typing import Dict, List, Optional, Tuple
+
+MAX_COLUMNS = 2
+
+
+class oled_update:
+    def __init__(self, modes: Tuple[str, Optional[str]] = None, columns: List[List[str]] = None,
+                 info: bool = False):
+        """
+        One parsed OLED command
+        :param modes: mode of every column, None if the command does not change them
+        :param columns: lines of every column, None if the command does not change them
+        :param info: the current modes and text are requested
+        """
+        self.modes = modes
+        self.columns = columns
+        self.info = info
+
+    def __eq__(self, other):
+        return isinstance(other, oled_update) and (self.modes, self.columns, self.info) == \
+            (other.modes, other.columns, other.info)
+
+    def __repr__(self):
+        return f"oled_update(modes={self.modes}, columns={self.columns}, info={self.info})"
+
+
+def parse_oled_command(command: str) -> oled_update:
+    """
+    :param command: the arguments of an OLED command
+    :return: the update
+    :raises ValueError: on a syntax error
+    """
+    words = command.split()
+    keyword = words[0].upper() if words else ""
+    if keyword == "MODE":
+        if not 2 <= len(words) <= 1 + MAX_COLUMNS:
+            raise ValueError(f"OLED MODE takes 1 to {MAX_COLUMNS} modes: {command}")
+        return oled_update(modes=(words[1], words[2] if len(words) == 3 else None))
+    if keyword == "INFO":
+        if len(words) != 1:
+            raise ValueError(f"OLED INFO takes no arguments: {command}")
+        return oled_update(info=True)
+    return oled_update(columns=_parse_columns(command))
+
+
+def _parse_columns(text: str) -> List[List[str]]:
+    columns = []
+    length = len(text)
+    i = 0
+    while i < length:
+        char = text[i]
+        if char == "<":
+            i += 1
+            lines = []
+            while True:
+                if i >= length:
+                    raise ValueError(f"missing > of the column opened at {text.rfind('<', 0, i)}")
+                char = text[i]
+                if char == ">":
+                    i += 1
+                    break
+                elif char == "{":
+                    opened = i
+                    i += 1
+                    parts = []
+                    while True:
+                        close = text.find("}", i)
+                        if close < 0:
+                            raise ValueError(f"missing }} of the line opened at {opened}")
+                        escape = text.find("\\", i, close)
+                        if escape < 0:
+                            parts.append(text[i:close])
+                            i = close + 1
+                            break
+                        parts.append(text[i:escape])
+                        parts.append(text[escape + 1])
+                        i = escape + 2
+                    lines.append("".join(parts))
+                elif char.isspace():
+                    i += 1
+                else:
+                    raise ValueError(f"unexpected {char!r} at {i}, lines are written in {{}}")
+            columns.append(lines)
+        elif char.isspace():
+            i += 1
+        else:
+            raise ValueError(f"unexpected {char!r} at {i}, columns are written in <>")
+    if not 1 <= len(columns) <= MAX_COLUMNS:
+        raise ValueError(f"1 to {MAX_COLUMNS} columns expected, got {len(columns)}")
+    return columns
+
+
+def format_oled_text(columns: List[List[str]]) -> str:
+    """
+    :return: the columns written like the text of an OLED command
+    """
+    return "".join("<" + "".join("{" + line.replace("\\", "\\\\").replace("}", "\\}") + "}" for line in lines)
+                   + ">" for lines in columns)
+
+
+def check_update(update: oled_update, modes: Dict[str, Tuple[List[int], str]],
+                 config: Tuple[str, Optional[str]]):
+    """
+    Check the update fits the modes of the display
+    :param update: the update
+    :param modes: mode -> (top of every line, font name)
+    :param config: the current mode of every column
+    :raises ValueError: if a mode is unknown or the text does not have a line for every line of its column
+    """
+    if update.modes is not None:
+        for mode in update.modes:
+            if mode is not None and mode not in modes:
+                raise ValueError(f"unknown OLED mode {mode}, known are {', '.join(modes)}")
+        config = update.modes
+    if update.columns is not None:
+        used = [mode for mode in config if mode is not None]
+        if len(update.columns) != len(used) or None in config[:len(used)]:
+            raise ValueError(f"{len(used)} columns expected for modes {config}, got {len(update.columns)}")
+        for j, lines in enumerate(update.columns):
+            expected = len(modes[config[j]][0])
+            if len(lines) != expected:
+                raise ValueError(f"mode {config[j]} has {expected} lines, column {j + 1} has {len(lines)}")
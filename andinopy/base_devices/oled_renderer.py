@@ -0,0 +1,109 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import threading
+import time
+
+from andinopy import andinopy_logger
+
+
+class oled_renderer:
+    def __init__(self, render: callable, push: callable, max_fps: float = 10):
+        """
+        Renders frames on its own thread, requests arriving while a frame is rendered or the frame rate
+        is capped are coalesced into one frame of the latest state
+        :param render: returns the frame of the current state, frames are compared with ==
+        :param push: sends a frame to the display, not called for a frame equal to the last one
+        :param max_fps: maximum frames per second
+        """
+        self._render = render
+        self._push = push
+        self.max_fps = max_fps
+        self._condition = threading.Condition()
+        self._pending = False
+        self._busy = False
+        self._running = False
+        self._thread: threading.Thread = None
+        self._last_frame = None
+        self.requests = 0
+        self.frames_rendered = 0
+        self.frames_pushed = 0
+        self.frames_skipped = 0
+
+    # region start_stop
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._t_render_thread_code)
+        # scripts using the display without stopping it can still exit
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # endregion
+
+    def request(self):
+        """
+        Render the current state, returns at once
+        :return: None
+        """
+        with self._condition:
+            self.requests += 1
+            self._pending = True
+            self._condition.notify_all()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every request has been rendered
+        :param timeout: seconds, None waits forever
+        :return: True if nothing is pending
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def statistics(self) -> dict:
+        return {"requests": self.requests, "rendered": self.frames_rendered, "pushed": self.frames_pushed,
+                "skipped": self.frames_skipped}
+
+    def _t_render_thread_code(self):
+        next_frame = 0.0
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    break
+                # frame rate cap, requests arriving meanwhile are part of this frame
+                delay = next_frame - time.monotonic()
+                while self._running and delay > 0:
+                    self._condition.wait(delay)
+                    delay = next_frame - time.monotonic()
+                if not self._running:
+                    break
+                self._pending = False
+                self._busy = True
+            try:
+                frame = self._render()
+                self.frames_rendered += 1
+                if self._last_frame is not None and frame == self._last_frame:
+                    self.frames_skipped += 1
+                else:
+                    self._push(frame)
+                    self._last_frame = frame
+                    self.frames_pushed += 1
+            except Exception as exception:
+                andinopy_logger.error(f"OLED render failed: {exception}")
+            next_frame = time.monotonic() + 1 / self.max_fps
+            with self._condition:
+                self._busy = False
+                self._condition.notify_all()
@@ -0,0 +1,118 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple, List, Optional
+
+from PIL import Image
+from PIL import ImageDraw
+
+OLED_MODES: Dict[str, Tuple[List[int], str]] = {  # top diffs,font
+    "10": ([0], "font60"),  # 1 Line, 3 Chars mode
+    "11": ([20], "font30"),  # 1 Line, 4 Chars mode
+    "20": ([0, 35], "font30"),  # 2 Line, 6 Chars
+    "21": ([5, 40], "font21"),  # 2 Line, 9 Chars
+    "30": ([2, 24, 46], "font20"),  # 3 Line, 9 Chars
+    "31": ([2, 27, 52], "font16"),  # 3 Line, 12 Chars
+    "40": ([1, 17, 34, 51], "font14"),  # 4 Line, 14 Chars
+    "60": ([3, 13, 23, 33, 43, 53], "font8")  # 6 Lines
+}
+
+
+class oled_text_renderer:
+    def __init__(self, width: int, height: int, load_font: callable, padding: int = -2,
+                 modes: Dict[str, Tuple[List[int], str]] = None, cache_size: int = 64):
+        """
+        Draws the text columns of the OLED from cached line bitmaps
+        :param width: pixels
+        :param height: pixels
+        :param load_font: font name of a mode -> PIL font, called the first time a mode uses the font
+        :param padding: added to the top of every line
+        :param modes: mode -> (top of every line, font name), see OLED_MODES
+        :param cache_size: rasterised lines kept, the least recently used are dropped
+        """
+        self.width = width
+        self.height = height
+        self.padding = padding
+        self.modes = OLED_MODES if modes is None else modes
+        self.cache_size = cache_size
+        self.fonts = {}
+        self._load_font = load_font
+        self._lines: "OrderedDict[Tuple[str, str], Tuple[Optional[Image.Image], int, int]]" = OrderedDict()
+        self._positions: Dict[Tuple[str, int], List[Tuple[int, int]]] = {}
+        self.hits = 0
+        self.misses = 0
+        # the render thread and display_text share the cache
+        self._lock = threading.Lock()
+
+    def font(self, name: str):
+        font = self.fonts.get(name)
+        if font is None:
+            font = self.fonts[name] = self._load_font(name)
+        return font
+
+    def positions(self, mode: str, column: int) -> List[Tuple[int, int]]:
+        """
+        :return: top left corner of every line of the mode in the column
+        """
+        key = (mode, column)
+        positions = self._positions.get(key)
+        if positions is None:
+            offset = int(0.5 * self.width * column)
+            positions = self._positions[key] = [(offset, self.padding + top) for top in self.modes[mode][0]]
+        return positions
+
+    def line(self, font_name: str, text: str) -> Tuple[Optional[Image.Image], int, int]:
+        """
+        :return: bitmap of the text, None if nothing is drawn, and its offset to the position of the line
+        """
+        key = (font_name, text)
+        entry = self._lines.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._lines.move_to_end(key)
+            return entry
+        self.misses += 1
+        font = self.font(font_name)
+        left, top, right, bottom = ImageDraw.Draw(Image.new('1', (1, 1))).textbbox((0, 0), text, font=font)
+        if right <= left or bottom <= top:
+            entry = (None, 0, 0)
+        else:
+            bitmap = Image.new('1', (right - left, bottom - top))
+            ImageDraw.Draw(bitmap).text(xy=(-left, -top), text=text, font=font, fill=255)
+            entry = (bitmap, left, top)
+        self._lines[key] = entry
+        if len(self._lines) > self.cache_size:
+            self._lines.popitem(last=False)
+        return entry
+
+    def render(self, config: Tuple[str, str], text: List[List[str]], rotate: bool = False) -> Image.Image:
+        """
+        :param config: mode of every column, None for an empty column
+        :param text: lines of every column
+        :param rotate: rotate the image by 180 degrees
+        :return: image of the display
+        """
+        image = Image.new('1', (self.width, self.height))
+        with self._lock:
+            for j in range(len(config)):
+                if config[j] is not None:
+                    font_name = self.modes[config[j]][1]
+                    # lines missing after a mode change stay empty until the text follows
+                    lines = text[j] if j < len(text) else []
+                    for i, (x, y) in enumerate(self.positions(config[j], j)[:len(lines)]):
+                        bitmap, left, top = self.line(font_name, lines[i])
+                        if bitmap is not None:
+                            # the bitmap is the mask, pixels already set by other lines stay set like draw.text
+                            image.paste(255, (x + left, y + top), bitmap)
+        if rotate:
+            image = image.rotate(180)
+        return image
+
+    def statistics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "lines": len(self._lines), "fonts": len(self.fonts)}
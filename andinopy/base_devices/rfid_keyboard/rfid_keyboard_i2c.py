@@ -7,10 +7,11 @@
 # by Jakob Groß
 import sys
 import time
-from threading import Thread
+from threading import Thread, Event, Lock
 from typing import Optional
 
 import smbus2
+from smbus2 import i2c_msg
 from gpiozero import Button
 
 from andinopy import andinopy_logger
@@ -18,21 +19,34 @@ from andinopy.interfaces.rfid_keyboard_interface import rfid_keyboard_interface
 
 
 class rfid_keyboard_i2c(rfid_keyboard_interface):
+    # bytes the controller sends when its buffer is empty
+    _padding = (0x00, 0x20, 0xFF)
 
     def __init__(self, on_rfid: callable(str) = None, on_function: callable(str) = None,
-                 on_keyboard: callable(str) = None):
+                 on_keyboard: callable(str) = None, i2c_bus=None, read_block_size: int = 16):
         """
         Initialize the Keyboard and RFID
         :param on_rfid: function
         :param on_function: function
         :param on_keyboard: function
+        :param i2c_bus: smbus2.SMBus compatible bus, default bus 1
+        :param read_block_size: bytes read in one I2C transaction
         """
         self._interruptPin = 23
         self._slaveAddress = 0x4
-        self._i2c = smbus2.SMBus(1)
+        self._bus_number = 1
+        self._i2c = i2c_bus if i2c_bus is not None else smbus2.SMBus(self._bus_number)
         self._interrupt: Optional[Button] = None
+        self.read_block_size = read_block_size
+        # reads per interrupt while the controller keeps it asserted, the controller buffers less
+        self._max_reads = 128
+        self._read_lock = Lock()
         self.interrupted = False
+        # the controller is pinged after this many seconds without a read
+        self.watchdog_idle = 5.0
+        self._last_read = time.monotonic()
         self._thread = None
+        self._stop_event = Event()
         self.running = True
 
         super().__init__()
@@ -46,21 +60,8 @@ class rfid_keyboard_i2c(rfid_keyboard_interface):
         start the Keyboard - be sure to set custom configuration first
         :return:
         """
-        self._i2c.open(1)
-        self._interrupt = Button(self._interruptPin, hold_time=0.01, hold_repeat=True, pull_up=False)
-
-        # Ping I2C with timeout if no input has been received.
-        #  Restart i2c connection if no answer is received after timeout.
-        #  If it cant be restarted kill whole andinopy
-        def _ping_read(handle):
-            while handle.running:
-                if not handle.interrupted:
-                    andinopy_logger.info("Ping Reading")
-                    handle.read_i2c()
-                    time.sleep(5)
-
-        self._thread = Thread(target=_ping_read, args=[self])
-        self._thread.start()
+        self._i2c.open(self._bus_number)
+        self._interrupt = Button(self._interruptPin, pull_up=False)
 
         try:
             counter = 0
@@ -72,15 +73,20 @@ class rfid_keyboard_i2c(rfid_keyboard_interface):
                     raise Exception("More than 128 Inputs buffered -> Firmware Corrupted")
         except TypeError:
             pass
-        self._interrupt.when_held = self.read_i2c
+        # edge triggered, the controller asserts the pin as soon as a character is buffered
+        self._interrupt.when_activated = self.read_i2c
+        self._last_read = time.monotonic()
+        self._thread = Thread(target=self._t_watchdog_code)
+        self._thread.start()
         andinopy_logger.info("RFID and Keyboard started")
 
     def stop(self):
+        self.running = False
+        self._stop_event.set()
+        self._thread.join()
         self._interrupt.close()
         self._i2c.close()
         andinopy_logger.info("RFID and Keyboard stopped")
-        self.running = False
-        self._thread.join()
 
     def buzz_display(self, ms: int):
         """
@@ -90,17 +96,43 @@ class rfid_keyboard_i2c(rfid_keyboard_interface):
         """
         self._send_to_controller(f"buz {ms}")
 
+    def _t_watchdog_code(self):
+        # Ping I2C if nothing has been read for watchdog_idle seconds.
+        #  Restart i2c connection if no answer is received.
+        while self.running:
+            idle = time.monotonic() - self._last_read
+            if idle < self.watchdog_idle:
+                self._stop_event.wait(self.watchdog_idle - idle)
+                continue
+            andinopy_logger.info("Ping Reading")
+            self.read_i2c()
+
     def _send_to_controller(self, input_string):
         self._i2c.write_block_data(self._slaveAddress, 0, input_string.encode("utf-8"))
 
     def read_i2c(self):
-        self.interrupted = True
-        try:
-            char_received = chr(self._i2c.read_byte(self._slaveAddress))
-            self._on_char_received(char_received)
-        except IOError as ioe:
-            andinopy_logger.error(f"IOError while reading I2C - {ioe}")
-            self._i2c.close()
-            self._i2c = smbus2.SMBus(1)
-            self._i2c.open(1)
-        self.interrupted = False
+        """
+        Drain the characters buffered by the controller, one I2C transaction per block
+        :return: None
+        """
+        with self._read_lock:
+            self.interrupted = True
+            try:
+                for _ in range(self._max_reads):
+                    message = i2c_msg.read(self._slaveAddress, self.read_block_size)
+                    self._i2c.i2c_rdwr(message)
+                    chars = "".join([chr(i) for i in bytes(message) if i not in self._padding])
+                    if chars:
+                        self._on_chars_received(chars)
+                    # the pin stays asserted while characters are buffered, there is no new edge for them
+                    if not self._interrupt_active():
+                        break
+            except IOError as ioe:
+                andinopy_logger.error(f"IOError while reading I2C - {ioe}")
+                self._i2c.close()
+                self._i2c.open(self._bus_number)
+            self._last_read = time.monotonic()
+            self.interrupted = False
+
+    def _interrupt_active(self) -> bool:
+        return self._interrupt is not None and self._interrupt.is_active
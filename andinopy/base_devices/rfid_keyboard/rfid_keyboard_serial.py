@@ -25,8 +25,9 @@ class rfid_keyboard_serial(rfid_keyboard_interface):
 
         def read_thread_code(parent_obj: rfid_keyboard_serial):
             while parent_obj.running:
-                char = parent_obj.com_port.read(1)
-                parent_obj._on_char_received(char.decode())
+                # everything buffered is decoded in one call
+                chars = parent_obj.com_port.read(max(parent_obj.com_port.in_waiting, 1))
+                parent_obj._on_chars_received(chars.decode())
 
         self.thread = threading.Thread(target=read_thread_code, args=[self])
         self.thread.start()
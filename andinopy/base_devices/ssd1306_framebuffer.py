@@ -0,0 +1,130 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+from typing import List, Tuple
+
+from PIL import Image
+
+# control bytes starting an i2c transaction
+CONTROL_COMMANDS = 0x00
+CONTROL_DATA = 0x40
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+# bytes of the transaction setting the column and page window
+WINDOW_OVERHEAD = 7
+
+
+def image_to_pages(image: Image.Image) -> bytes:
+    """
+    Convert an image to the SSD1306 memory layout, one byte per column and page of 8 rows, lsb on top
+    :param image: image of the display size
+    :return: pages * width bytes, page by page
+    """
+    width, height = image.size
+    pages = height // 8
+    # transposed and mirrored every row of packed bytes is one column, the last byte holding the top page
+    columns = image.convert('1').transpose(Image.TRANSPOSE).transpose(Image.FLIP_LEFT_RIGHT).tobytes()
+    return b"".join(columns[pages - 1 - page::pages] for page in range(pages))
+
+
+class ssd1306_framebuffer:
+    on_bytes_sent = None
+
+    def __init__(self, i2c_write: callable, width: int = 128, height: int = 64):
+        """
+        Sends only the pages and columns of a frame that changed to a SSD1306 in horizontal addressing mode
+        :param i2c_write: writes one i2c transaction to the display
+        :param width: pixels
+        :param height: pixels, a multiple of 8
+        """
+        self._i2c_write = i2c_write
+        self.width = width
+        self.pages = height // 8
+        self._previous: bytes = None
+        self.frames = 0
+        self.bytes_sent = 0
+
+    def invalidate(self):
+        """
+        Send the next frame as a whole, e.g. after the display was cleared by someone else
+        :return: None
+        """
+        self._previous = None
+
+    def set_cleared(self):
+        """
+        The display memory is known to be blank
+        :return: None
+        """
+        self._previous = bytes(self.width * self.pages)
+
+    def show(self, image: Image.Image) -> int:
+        """
+        Send the changed parts of the image
+        :param image: image of the display size
+        :return: bytes sent over i2c
+        """
+        return self.show_pages(image_to_pages(image))
+
+    def show_pages(self, frame: bytes) -> int:
+        """
+        Send the changed parts of a frame in the SSD1306 memory layout
+        :param frame: see image_to_pages
+        :return: bytes sent over i2c
+        """
+        sent = 0
+        for first_page, last_page, first_column, last_column in self._dirty_windows(frame):
+            sent += self._send_window(frame, first_page, last_page, first_column, last_column)
+        self._previous = frame
+        self.frames += 1
+        self.bytes_sent += sent
+        if self.on_bytes_sent is not None:
+            self.on_bytes_sent(sent)
+        return sent
+
+    def _dirty_windows(self, frame: bytes) -> List[Tuple[int, int, int, int]]:
+        width = self.width
+        previous = self._previous
+        if previous is None:
+            return [(0, self.pages - 1, 0, width - 1)]
+        windows = []
+        for page in range(self.pages):
+            start = page * width
+            new = frame[start:start + width]
+            old = previous[start:start + width]
+            if new == old:
+                continue
+            first = 0
+            while new[first] == old[first]:
+                first += 1
+            last = width - 1
+            while new[last] == old[last]:
+                last -= 1
+            if windows and windows[-1][1] == page - 1:
+                # one window over neighbouring pages if it costs less than another transaction
+                first_page, _, first_column, last_column = windows[-1]
+                union_first = min(first, first_column)
+                union_last = max(last, last_column)
+                merged = (page - first_page + 1) * (union_last - union_first + 1)
+                separate = (page - first_page) * (last_column - first_column + 1) + last - first + 1 \
+                    + WINDOW_OVERHEAD + 1
+                if merged <= separate:
+                    windows[-1] = (first_page, page, union_first, union_last)
+                    continue
+            windows.append((page, page, first, last))
+        return windows
+
+    def _send_window(self, frame: bytes, first_page: int, last_page: int, first_column: int,
+                     last_column: int) -> int:
+        width = self.width
+        self._i2c_write(bytes((CONTROL_COMMANDS, SET_COL_ADDR, first_column, last_column,
+                               SET_PAGE_ADDR, first_page, last_page)))
+        data = bytearray((CONTROL_DATA,))
+        for page in range(first_page, last_page + 1):
+            data += frame[page * width + first_column:page * width + last_column + 1]
+        self._i2c_write(bytes(data))
+        return WINDOW_OVERHEAD + len(data)
@@ -9,7 +9,6 @@ import sys
 
 from andinopy import andinopy_logger
 from andinopy.base_devices import andinoio
-from andinopy.base_devices.nextion_display import display
 from andinopy.interfaces.rfid_keyboard_interface import rfid_keyboard_interface
 
 
@@ -38,7 +37,10 @@ class terminal:
 
         andinopy_logger.info("Terminal starting initialization")
         self.andinoio_instance = andinoio_instance if andinoio_instance is not None else andinoio.andinoio()
-        self.display_instance = display_instance if display_instance is not None else display()
+        if display_instance is None:
+            from andinopy.base_devices.nextion_display import display
+            display_instance = display()
+        self.display_instance = display_instance
 
         andinopy_logger.info("Terminal device initialized")
 
@@ -6,8 +6,46 @@
 #                                     |_|    |___/
 # by Jakob Groß
 import abc
+from typing import Dict, List, Tuple
+
 from andinopy import andinopy_logger
 
+# actions of the dispatch table
+KEY_UNKNOWN = 0
+KEY_IGNORE = 1
+KEY_RFID = 2
+KEY_KEYBOARD = 3
+KEY_FUNCTION = 4
+
+# character sent by the controller -> (action, value passed to the callback) per terminal model
+key_maps: Dict[str, Dict[str, Tuple[int, str]]] = {
+    "terminal": {
+        **{str(i): (KEY_KEYBOARD, str(i)) for i in range(10)},
+        **{chr(ord('a') + i): (KEY_FUNCTION, f"F{i + 1}") for i in range(6)},
+        '+': (KEY_FUNCTION, "UP"),
+        '-': (KEY_FUNCTION, "DOWN"),
+        'o': (KEY_FUNCTION, "OK"),
+        'x': (KEY_FUNCTION, "ESC"),
+        '<': (KEY_FUNCTION, "DEL"),
+    }
+}
+DEFAULT_KEY_MAP = "terminal"
+_unknown_entry = (KEY_UNKNOWN, None)
+
+
+def build_dispatch_table(key_map: Dict[str, Tuple[int, str]]) -> List[Tuple[int, str]]:
+    """
+    :param key_map: character -> (action, value)
+    :return: (action, value) for every byte value
+    """
+    table = [_unknown_entry] * 256
+    for char, entry in key_map.items():
+        table[ord(char)] = entry
+    # the controller pads with spaces and ':' frames a rfid tag on every model
+    table[ord(' ')] = (KEY_IGNORE, None)
+    table[ord(':')] = (KEY_RFID, None)
+    return table
+
 
 class rfid_keyboard_interface(abc.ABC):
     on_rfid_string = None
@@ -15,8 +53,26 @@ class rfid_keyboard_interface(abc.ABC):
     on_keyboard_button = None
 
     def __init__(self):
-        self._rfid_buffer: str = ""
+        self._rfid_buffer: List[str] = []
         self._rfid_mode: bool = False
+        self._key_map_model = DEFAULT_KEY_MAP
+        self._dispatch_table = build_dispatch_table(key_maps[DEFAULT_KEY_MAP])
+        self.unknown_bytes = 0
+        self.unknown_counts: Dict[int, int] = {}
+
+    # region key_map_model
+    @property
+    def key_map_model(self) -> str:
+        return self._key_map_model
+
+    @key_map_model.setter
+    def key_map_model(self, value: str):
+        if value not in key_maps:
+            raise AttributeError(f"unknown key map {value}, known are {', '.join(key_maps)}")
+        self._key_map_model = value
+        self._dispatch_table = build_dispatch_table(key_maps[value])
+
+    # endregion
 
     @abc.abstractmethod
     def start(self) -> None:
@@ -34,32 +90,49 @@ class rfid_keyboard_interface(abc.ABC):
     def _send_to_controller(self, value: str) -> None:
         raise NotImplementedError("meta class method not overwritten")
 
-    def _on_char_received(self, char_received: str):
-        if char_received != ' ' and char_received != '':
-            andinopy_logger.debug(f"received char from display: {char_received}")
-            if char_received == ':':
-                if self._rfid_mode:
+    def _on_chars_received(self, chars_received: str):
+        """
+        Decode a chunk of characters from the controller
+        :param chars_received: characters in the order they were received
+        :return: None
+        """
+        # every ':' opens or closes a rfid tag
+        parts = chars_received.split(':')
+        last = len(parts) - 1
+        for i, part in enumerate(parts):
+            if self._rfid_mode:
+                if part:
+                    self._rfid_buffer.append(part)
+                if i < last:
                     self._rfid_mode = False
+                    tag = "".join(self._rfid_buffer).replace(' ', '')
+                    self._rfid_buffer = []
                     if self.on_rfid_string is not None:
-                        self.on_rfid_string(self._rfid_buffer)
-                    self._rfid_buffer = ""
-
-                else:
+                        self.on_rfid_string(tag)
+            else:
+                if part:
+                    self._decode_keys(part)
+                if i < last:
                     self._rfid_mode = True
-            elif self._rfid_mode:
-                self._rfid_buffer += char_received
-            elif 'a' <= char_received <= 'f':
-                if self.on_function_button is not None:
-                    self.on_function_button("F" + str(ord(char_received) - 96))
-            elif '0' <= char_received <= '9':
+
+    def _on_char_received(self, char_received: str):
+        if self._rfid_mode or char_received == ':':
+            self._on_chars_received(char_received)
+        else:
+            self._decode_keys(char_received)
+
+    def _decode_keys(self, chars: str):
+        table = self._dispatch_table
+        for char_received in chars:
+            code = ord(char_received)
+            action, value = table[code] if code < 256 else _unknown_entry
+            if action == KEY_KEYBOARD:
                 if self.on_keyboard_button is not None:
-                    self.on_keyboard_button(char_received)
-            else:
-                function_match = {
-                    '+': "UP",
-                    '-': "DOWN",
-                    'o': "OK",
-                    'x': "ESC",
-                    '<': "DEL",
-                }
-                self.on_function_button(function_match[char_received])
+                    self.on_keyboard_button(value)
+            elif action == KEY_FUNCTION:
+                if self.on_function_button is not None:
+                    self.on_function_button(value)
+            elif action == KEY_UNKNOWN:
+                self.unknown_bytes += 1
+                self.unknown_counts[code] = self.unknown_counts.get(code, 0) + 1
+                andinopy_logger.debug(f"unknown char from display: {code:#x}")
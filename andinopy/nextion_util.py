@@ -5,81 +5,210 @@
 #   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
 #                                     |_|    |___/
 # by Jakob Groß
+import json
+import threading
 import time
 import serial
 import sys
 import os
 
+try:
+    import fcntl
+except ImportError:
+    # windows, the cache is only locked against other threads
+    fcntl = None
+
 e = bytearray([0xFF, 0xFF, 0xFF])
 
+# whmi-wri: every block is acknowledged with 0x05
+PROTOCOL_V1_0 = "1.0"
+# whmi-wris: after the first block the display answers 0x08 and the offset to continue from (resume)
+PROTOCOL_V1_2 = "1.2"
+PROTOCOLS = {PROTOCOL_V1_0: "whmi-wri", PROTOCOL_V1_2: "whmi-wris"}
+# the display acknowledges every 4096 bytes
+BLOCK_SIZE = 4096
+
+BAUD_RATES = (2400, 4800, 9600, 19200, 38400, 57600, 115200, 921600, 512000, 256000, 250000, 230400)
+UPLOAD_BAUD_RATES = (921600, 512000, 256000, 250000, 230400, 115200, 57600, 38400, 31250, 19200, 9600)
+
+# last working baud rates and the comok info per serial port, tried before sweeping all baud rates
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".andinopy_nextion_cache.json")
+_cache_lock = threading.Lock()
+
+
+# region cache
+def read_cache(cache_file: str = CACHE_FILE) -> dict:
+    """
+    :param cache_file: json file
+    :return: {port: {"baud": ..., "upload_baud": ..., "model": ..., ...}}, empty if missing or unreadable
+    """
+    try:
+        with open(cache_file) as fp:
+            cache = json.load(fp)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def update_cache(port: str, values: dict, cache_file: str = CACHE_FILE):
+    """
+    Merge values into the entry of port, safe for several flashes running in parallel
+    :param port: serial port name
+    :param values: entries to set
+    :param cache_file: json file, None disables the cache
+    :return: None
+    """
+    if cache_file is None:
+        return
+    with _cache_lock:
+        try:
+            with open(cache_file + ".lock", "w") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                cache = read_cache(cache_file)
+                cache.setdefault(port, {}).update(values)
+                # replaced at once, readers never see a partial file
+                tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+                with open(tmp_file, "w") as fp:
+                    json.dump(cache, fp, indent=1)
+                os.replace(tmp_file, cache_file)
+        except OSError as error:
+            print(f"Nextion cache could not be written: {error}")
+
+
+def _cached(port: str, key: str, cache_file: str):
+    if cache_file is None:
+        return None
+    return read_cache(cache_file).get(port, {}).get(key)
 
-def get_baud_rate(dev_port: serial.Serial, diagnostics: bool = False):
+
+def _ordered(rates, first) -> list:
+    if first in rates:
+        return [first] + [rate for rate in rates if rate != first]
+    return list(rates)
+
+
+# endregion
+
+
+def parse_comok(answer: bytes) -> dict:
+    """
+    :param answer: reply to connect without the terminator, e.g. b"comok 1,30601-0,NX4832T035_011R,..."
+    :return: touch, model, firmware, mcu_code, serial and flash_size
+    """
+    status, unknown1, model, firmware, mcucode, nextion_serial, nextion_flash_size = \
+        answer.decode("ascii", errors="ignore").strip("\xff").split(',')[:7]
+    return {"touch": status.split(' ')[1] == "1", "model": model, "firmware": firmware, "mcu_code": mcucode,
+            "serial": nextion_serial, "flash_size": nextion_flash_size}
+
+
+def get_baud_rate(dev_port: serial.Serial, diagnostics: bool = False, cache_file: str = CACHE_FILE):
     def diag_print(text: str):
         if diagnostics:
             print(text)
 
-    for baud_rate in (2400, 4800, 9600, 19200, 38400, 57600, 115200, 921600, 512000, 256000, 250000, 230400):
+    for baud_rate in _ordered(BAUD_RATES, _cached(dev_port.port, "baud", cache_file)):
         dev_port.baudrate = baud_rate
         dev_port.timeout = 3000 / baud_rate + 0.2
         diag_print(f"trying with {baud_rate} baud")
         dev_port.write(e)
         dev_port.write("connect".encode('ascii'))
         dev_port.write(e)
-        r = dev_port.read(128)[:-3]
-        if 'comok' in str(r):
+        # returns with the terminator instead of waiting for the timeout
+        r = dev_port.read_until(e, 128)[:-3]
+        if b'comok' in r:
             diag_print(f"Connected with {baud_rate} baud")
-            status, unknown1, model, firmware, mcucode, nextion_serial, nextion_flash_size = str(r).strip("\xff").split(
-                ',')
-            if status.split(' ')[1] == "1":
+            try:
+                info = parse_comok(r[r.find(b'comok'):])
+            except (ValueError, IndexError):
+                diag_print(f"Unexpected answer: {r}")
+                continue
+            if info["touch"]:
                 diag_print('Touchscreen: enabled')
             else:
                 diag_print('Touchscreen: disabled')
             diag_print(
-                f"Model:{model}\nFirmware:{firmware}\nMCU-Code:{mcucode}\nSerial:{nextion_serial}\nFlashSize:{nextion_flash_size}")
+                f"Model:{info['model']}\nFirmware:{info['firmware']}\nMCU-Code:{info['mcu_code']}\n"
+                f"Serial:{info['serial']}\nFlashSize:{info['flash_size']}")
+            update_cache(dev_port.port, dict(info, baud=baud_rate), cache_file)
             return baud_rate
     return False
 
 
-def force_max_baud(dev_port, filesize, diagnostics=False):
+def force_max_baud(dev_port, filesize, diagnostics=False, protocol: str = PROTOCOL_V1_0,
+                   cache_file: str = CACHE_FILE):
     def diag_print(text: str):
         if diagnostics:
             print(text)
 
-    for baud in [921600, 512000, 256000, 250000, 230400, 115200, 57600, 38400, 31250, 19200, 9600]:
+    command = PROTOCOLS[protocol]
+    parameter = 1 if protocol == PROTOCOL_V1_2 else 0
+    for baud in _ordered(UPLOAD_BAUD_RATES, _cached(dev_port.port, "upload_baud", cache_file)):
         diag_print(f"Trying {baud} baud")
-        diag_print(f"SENDING: whmi-wri {filesize},{baud},0")
-        dev_port.write(f"whmi-wri {filesize},{baud},0".encode("ascii"))
+        diag_print(f"SENDING: {command} {filesize},{baud},{parameter}")
+        dev_port.write(f"{command} {filesize},{baud},{parameter}".encode("ascii"))
         dev_port.write(e)
-        time.sleep(0.4)
+        # the command has to leave with the old baud rate before switching
+        dev_port.flush()
         dev_port.baudrate = baud
         dev_port.timeout = 0.5
-        time.sleep(.1)
         r = dev_port.read(1)
         if 0x05 in r:
+            update_cache(dev_port.port, {"upload_baud": baud}, cache_file)
             return True
     return False
 
 
-def upload_image(dev_port, filename, filesize):
+def upload_image(dev_port, filename, filesize, protocol: str = PROTOCOL_V1_0, block_size: int = BLOCK_SIZE,
+                 timeout: float = 5, statistics: dict = None, diagnostics: bool = True):
+    """
+    Send the tft file after force_max_baud, every block is written as soon as the previous one is acknowledged
+    :param dev_port: serial port
+    :param filename: tft file
+    :param filesize: size of the file
+    :param protocol: PROTOCOL_V1_0 or PROTOCOL_V1_2, has to match force_max_baud
+    :param block_size: bytes per acknowledgement, the display expects 4096
+    :param timeout: seconds to wait for an acknowledgement
+    :param statistics: filled with bytes, seconds, bytes_per_second and offset (resumed from)
+    :param diagnostics: print the progress
+    :return: True if every block was acknowledged
+    """
+    dev_port.timeout = timeout
+    start = time.perf_counter()
+    offset = 0
+    data_count = 0
     with open(filename, 'rb') as image:
-        data_count = 0
+        first_block = True
         while 1:
-            data = image.read(4096)
+            data = image.read(block_size)
             if len(data) < 1:
                 break
             data_count += len(data)
-            dev_port.timeout = 5
             dev_port.write(data)
-            sys.stdout.write('\rUpload, %3.1f%%...' % (data_count / float(filesize) * 100.0))
-            sys.stdout.flush()
-            time.sleep(.5)
             r = dev_port.read(1)
-            if 0x05 not in r:
+            if protocol == PROTOCOL_V1_2 and first_block and r == b"\x08":
+                # offset the display already has
+                offset = int.from_bytes(dev_port.read(4), "little")
+                if offset:
+                    image.seek(offset)
+                    data_count = offset
+            elif 0x05 not in r:
                 return False
+            first_block = False
+            if diagnostics:
+                rate = (data_count - offset) / max(time.perf_counter() - start, 1e-9)
+                sys.stdout.write('\rUpload, %3.1f%%, %.0f bytes/s...' % (data_count / float(filesize) * 100.0, rate))
+                sys.stdout.flush()
+    seconds = time.perf_counter() - start
+    if statistics is not None:
+        statistics.update({"bytes": data_count - offset, "seconds": seconds,
+                           "bytes_per_second": (data_count - offset) / max(seconds, 1e-9), "offset": offset})
+    if diagnostics:
+        print(f"\nUploaded {data_count - offset} bytes in {seconds:.1f} s")
     return True
 
 
-def flash(port: str, tft_file: str):
+def flash(port: str, tft_file: str, protocol: str = PROTOCOL_V1_0):
     port = serial.Serial(port, 9600, timeout=None)
     if not port.isOpen():
         port.open()
@@ -87,17 +216,18 @@ def flash(port: str, tft_file: str):
         print("Baud Rate could not be specified")
         exit(1)
     file_size = os.path.getsize(tft_file)
-    if not force_max_baud(port, file_size, diagnostics=True):
+    if not force_max_baud(port, file_size, diagnostics=True, protocol=protocol):
         print("Could not force baud rate")
         exit(1)
-    if not upload_image(port, tft_file, file_size):
+    if not upload_image(port, tft_file, file_size, protocol=protocol):
         print("could not upload tft File")
         exit(1)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print('usage:\npython3 nextion_util.py file_to_upload.tft')
+    if len(sys.argv) not in (2, 3) or (len(sys.argv) == 3 and sys.argv[2] not in PROTOCOLS):
+        print('usage:\npython3 nextion_util.py file_to_upload.tft [1.0|1.2]')
+        exit(1)
     file = sys.argv[1]
-    flash("/dev/ttyAMA0", file)
+    flash("/dev/ttyAMA0", file, sys.argv[2] if len(sys.argv) == 3 else PROTOCOL_V1_0)
     exit(0)
@@ -6,7 +6,7 @@
 #                                     |_|    |___/
 # by Jakob Groß
 import sys
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 import traceback
 
 import andinopy
@@ -16,14 +16,45 @@ import logging
 from andinopy.interfaces.andino_hardware_interface import andino_hardware_interface
 from andinopy.interfaces.andino_temp_interface import andino_temp_interface
 from andinopy.tcp import simpletcp
+from andinopy.base_devices import oled_protocol
+from andinopy.tcp.event_bus import event_bus
 
 log = logging.getLogger("andinopy")
 
 
+def _flag(argument: str) -> bool:
+    return bool(int(argument))
+
+
+def _digits(argument: str) -> List[int]:
+    return [int(i) for i in argument]
+
+
 class andino_tcp:
+    # verb -> (x1_instance method, arguments known at registration, parser of every tcp argument)
+    hardware_commands: Dict[str, Tuple[str, tuple, Tuple[callable, ...]]] = {
+        "INFO": ("info", (), ()),
+        "HARD": ("hardware", (), (int,)),
+        "POLL": ("set_polling", (), (int,)),
+        "SKIP": ("set_skip", (), (int,)),
+        "EDGE": ("set_edge_detection", (), (_flag,)),
+        "SEND": ("set_send_time", (), (int,)),
+        "CHNG": ("set_broadcast_on_change", (), (_flag,)),
+        # only the io x1 emulator has a change pattern
+        "CHNP": ("set_change_pattern", (), (_digits,)),
+        # TODO.md CNTR	Send Counter - Send counter+states(1) or only states(0)
+        #  (default 1)
+        "CNTR": ("get_counters", (), (int,)),
+        "DEBO": ("set_debounce", (), (int,)),
+        "POWR": ("set_power", (), (int,)),
+        "REL?": ("set_send_relays_status", (), (_flag,)),
+        **{f"REL{i}": ("set_relay", (i,), (int,)) for i in range(1, 9)},
+        **{f"RPU{i}": ("pulse_relay", (i,), (int,)) for i in range(1, 9)},
+    }
 
     def __init__(self, hardware: str = None, port: int = None, oled: bool = None, temp: bool = None,
-                 key_rfid: bool = None, display: bool = None, tcp_encoding=None, display_encoding=None):
+                 key_rfid: bool = None, display: bool = None, tcp_encoding=None, display_encoding=None,
+                 tcp_mode: str = None, reply_to_requester: bool = None):
         """
         create a new instance of the andino_tcp server
         :param hardware: "x1" or "io"
@@ -32,9 +63,11 @@ class andino_tcp:
         :param temp: temperature measure enabled? (only on x1)
         :param key_rfid: keyboard and rfid controller enabled?
         :param display: display enabled?
+        :param tcp_mode: "thread" (one thread per client) or "selector" (all clients on one selector loop)
+        :param reply_to_requester: send command responses only to the issuing client instead of all clients,
+                                   spontaneous events are always sent to all clients
         """
 
-        self._message_counter = 0
         self.temperature_enabled = base_config["andino_tcp"]["temp"] == "True" if temp is None else temp
         self.display_enabled = base_config["andino_tcp"]["display"] == "True" if display is None else display
         self.key_rfid_enabled = base_config["andino_tcp"]["key_rfid"] == "True" if key_rfid is None else key_rfid
@@ -44,10 +77,25 @@ class andino_tcp:
         self.display_encoding = base_config["andino_tcp"][
             "display_encoding"] if display_encoding is None else display_encoding
         self.tcp_encoding = base_config["andino_tcp"]["tcp_encoding"] if tcp_encoding is None else tcp_encoding
-
-        self.tcpserver = simpletcp.tcp_server(port=self.port,
-                                              on_message=self._i_handle_tcp_input,
-                                              encoding=self.tcp_encoding)
+        self.tcp_mode = base_config["andino_tcp"].get("tcp_mode", "thread") if tcp_mode is None else tcp_mode
+        self.reply_to_requester = base_config["andino_tcp"].get("reply_to_requester", "False") == "True" \
+            if reply_to_requester is None else reply_to_requester
+
+        if self.tcp_mode == "selector":
+            server_class = simpletcp.tcp_selector_server
+        elif self.tcp_mode == "thread":
+            server_class = simpletcp.tcp_server
+        else:
+            raise AttributeError("tcp_mode must be 'thread' or 'selector'")
+        self.tcpserver = server_class(port=self.port,
+                                      on_message=self._i_handle_tcp_input,
+                                      encoding=self.tcp_encoding,
+                                      queue_size=int(base_config["andino_tcp"].get("tcp_queue_size", "256")),
+                                      overflow_policy=base_config["andino_tcp"].get("tcp_overflow_policy",
+                                                                                    simpletcp.OVERFLOW_DROP_OLDEST))
+        # events of the gpio, reader and status threads are numbered and sent by one dispatcher thread in order
+        self.event_bus = event_bus(lambda text: self.tcpserver.send_to_all(text),
+                                   max_size=int(base_config["andino_tcp"].get("event_queue_size", "1024")))
 
         self.display_instance = None
 
@@ -74,36 +122,8 @@ class andino_tcp:
             self._init_oled()
 
         self.assign: Dict[str, callable([str, List[str], simpletcp.tcp_server.client_handle])] = {
-            'RESET': lambda x: self._i_reset("", ""),
+            'RESET': self._i_reset,
             'PING': self._i_ping,
-            'INFO': self._i_handle_andino_hardware_message,
-            'HARD': self._i_handle_andino_hardware_message,
-            'POLL': self._i_handle_andino_hardware_message,
-            'SKIP': self._i_handle_andino_hardware_message,
-            'EDGE': self._i_handle_andino_hardware_message,
-            'SEND': self._i_handle_andino_hardware_message,
-            'CHNG': self._i_handle_andino_hardware_message,
-            'CHNP': self._i_handle_andino_hardware_message,
-            'CNTR': self._i_handle_andino_hardware_message,
-            'DEBO': self._i_handle_andino_hardware_message,
-            'POWR': self._i_handle_andino_hardware_message,
-            'REL?': self._i_handle_andino_hardware_message,
-            'REL1': self._i_handle_andino_hardware_message,
-            'REL2': self._i_handle_andino_hardware_message,
-            'REL3': self._i_handle_andino_hardware_message,
-            'REL4': self._i_handle_andino_hardware_message,
-            'REL5': self._i_handle_andino_hardware_message,
-            'REL6': self._i_handle_andino_hardware_message,
-            'REL7': self._i_handle_andino_hardware_message,
-            'REL8': self._i_handle_andino_hardware_message,
-            'RPU1': self._i_handle_andino_hardware_message,
-            'RPU2': self._i_handle_andino_hardware_message,
-            'RPU3': self._i_handle_andino_hardware_message,
-            'RPU4': self._i_handle_andino_hardware_message,
-            'RPU5': self._i_handle_andino_hardware_message,
-            'RPU6': self._i_handle_andino_hardware_message,
-            'RPU7': self._i_handle_andino_hardware_message,
-            'RPU8': self._i_handle_andino_hardware_message,
             'TBUS': self._i_handle_temp_message,
             'ADDRT': self._i_handle_temp_message,
             'SENDT': self._i_handle_temp_message,
@@ -111,10 +131,14 @@ class andino_tcp:
             'BUZZ': self._i_buzz_message,
             'DISP': self._i_handle_nextion_display_message,
             'OLED': self._i_handle_oled_message,
-            'SYS': self._i_handle_sys_message
+            'SYS': self._i_handle_sys_message,
+            'BATCH': self._i_batch
         }
+        for verb, (method, fixed, parsers) in self.hardware_commands.items():
+            self.assign[verb] = self._hardware_handler(method, fixed, parsers)
 
     def start(self):
+        self.event_bus.start()
         self.x1_instance.start()
         if self.display_enabled:
             self.display_instance.start()
@@ -128,7 +152,13 @@ class andino_tcp:
             self.display_instance.stop()
         if self.key_rfid_enabled:
             self.key_rfid_instance.stop()
+        if self.oled_enabled:
+            self.oled_instance.stop()
+        # events of the stopped devices are still sent
+        self.event_bus.stop()
         self.tcpserver.stop()
+        # the devices leave writing pending config changes to the service and the exit hook
+        andinopy.flush_base_config()
 
     # region custom initializers
 
@@ -145,6 +175,7 @@ class andino_tcp:
             import andinopy.base_devices.rfid_keyboard.rfid_keyboard_i2c
             self.key_rfid_instance = andinopy.base_devices.rfid_keyboard.rfid_keyboard_i2c.rfid_keyboard_i2c()
 
+        self.key_rfid_instance.key_map_model = base_config["andino_tcp"].get("key_rfid_model", "terminal")
         self.key_rfid_instance.on_rfid_string = self._o_on_rfid
         self.key_rfid_instance.on_function_button = self._o_on_function_button
         self.key_rfid_instance.on_keyboard_button = self._o_on_number_button
@@ -154,68 +185,116 @@ class andino_tcp:
     # region incoming functions
     def _i_handle_tcp_input(self, tcp_in: str, client_handle: simpletcp.tcp_server.client_handle):
         message = tcp_in.split(" ")
-        func = message[0].upper().rstrip()
-        # print(f"IN:{tcp_in}")
-        log.debug(f"From {client_handle.address}: {tcp_in}")
+        func = message[0]
+        log.debug("From %s: %s", client_handle.address, tcp_in)
         args = message[1:]
+        handler = self.assign.get(func)
+        if handler is None:
+            # verbs are mostly sent upper case already
+            func = func.upper().rstrip()
+            handler = self.assign.get(func)
         if func == '':
-            self.tcpserver.send_line_to_all('')
+            self._reply(client_handle, '')
             return
-        if func not in self.assign.keys():
+        if handler is None:
             log.error(f"Syntax Error in message: {tcp_in}")
             return
         try:
 
-            self.assign[func](func, args, client_handle)
+            handler(func, args, client_handle)
 
         except BufferError as usrWarn:
             log.error(client_handle.address)
             log.error(usrWarn)
             log.error(traceback.format_exc())
-            self.tcpserver.send_line_to_all("ERROR")
+            self._reply(client_handle, "ERROR")
 
         except ValueError as val_error:
             log.error(client_handle.address)
             log.error(val_error)
             log.error(traceback.format_exc())
-            self.tcpserver.send_line_to_all("ERROR")
+            self._reply(client_handle, "ERROR")
         except Exception as ex:
             log.error(client_handle.address)
             log.error(ex)
             log.error(traceback.format_exc())
-            self.tcpserver.send_line_to_all(f"ERROR")
+            self._reply(client_handle, f"ERROR")
         except BaseException as ex:
             log.error(client_handle.address)
             log.error(ex)
             log.error(traceback.format_exc())
-            self.tcpserver.send_line_to_all(f"ERROR CRITICAL SERVICE CLOSED")
+            self._reply(client_handle, f"ERROR CRITICAL SERVICE CLOSED")
             self.stop()
 
-    def _i_ping(self, _, _2, _3):
-        self.tcpserver.send_line_to_all("PING")
+    def _i_batch(self, _, arguments: List[str], client_handle: simpletcp.tcp_server.client_handle):
+        # BATCH <command>;<command>;... -> execute the commands in order, one answer per command
+        # consecutive x1 commands are pipelined instead of waiting for every confirmation
+        commands = [i.strip() for i in " ".join(arguments).split(";") if i.strip()]
+        pipelined = []
+        for command in commands:
+            message = command.split(" ")
+            func = message[0].upper()
+            text = self._pipeline_text(func, message[1:])
+            if text is not None:
+                pipelined.append(text)
+                continue
+            self._flush_batch(pipelined, client_handle)
+            pipelined = []
+            if func == "BATCH":
+                self._reply(client_handle, "ERROR")
+            else:
+                self._i_handle_tcp_input(command, client_handle)
+        self._flush_batch(pipelined, client_handle)
+
+    def _pipeline_text(self, func: str, arguments: List[str]) -> Optional[str]:
+        """
+        Parse a hardware command like its handler does
+        :return: the text the x1_instance sends for it, None if the command is executed by its handler instead,
+                 e.g. it is invalid, not a hardware command or the backend can't pipeline it
+        """
+        entry = self.hardware_commands.get(func)
+        command_text = getattr(self.x1_instance, "command_text", None)
+        if entry is None or command_text is None or not hasattr(self.x1_instance, "send_many"):
+            return None
+        method, fixed, parsers = entry
+        if len(arguments) < len(parsers):
+            return None
+        try:
+            values = [parser(argument) for parser, argument in zip(parsers, arguments)]
+        except ValueError:
+            return None
+        return command_text(method, *fixed, *values)
+
+    def _flush_batch(self, commands: List[str], client_handle: simpletcp.tcp_server.client_handle):
+        if commands:
+            for answer in self.x1_instance.send_many(commands):
+                self._reply(client_handle, answer)
 
-    def _i_handle_sys_message(self, arguments: List[str], client_handle: simpletcp.tcp_server.client_handle):
+    def _i_ping(self, _, _2, client_handle: simpletcp.tcp_server.client_handle):
+        self._reply(client_handle, "PING")
+
+    def _i_handle_sys_message(self, _, arguments: List[str], client_handle: simpletcp.tcp_server.client_handle):
         pass
 
-    def _i_reset(self, _, _2):
-        self._message_counter = 0
-        self.x1_instance.reset()
+    def _i_reset(self, _, _2, client_handle: simpletcp.tcp_server.client_handle):
+        self.event_bus.sequencer.reset()
+        self._reply(client_handle, self.x1_instance.reset())
 
-    def _i_buzz_message(self, _, arguments: List[str], _2):
+    def _i_buzz_message(self, _, arguments: List[str], client_handle: simpletcp.tcp_server.client_handle):
         try:
             self.key_rfid_instance.buzz_display(int(arguments[0]))
-            self.tcpserver.send_line_to_all("BUZZ " + str(arguments[0]))
+            self._reply(client_handle, "BUZZ " + str(arguments[0]))
         except ValueError:
-            self.tcpserver.send_line_to_all("ERROR in buzz - no int")
+            self._reply(client_handle, "ERROR in buzz - no int")
 
     def _i_handle_nextion_display_message(self, _, arguments: List[str],
-                                          _2):
+                                          client_handle: simpletcp.tcp_server.client_handle):
         # DISP PAGE <page> -> Display page setzen
         # DISP TXT <obj> -> Text setzen
         # DISP ATTR <obj> <attribute> <value> -> Object Atribut setzen
         # DISP RAW <bytes in hex> -> send raw bytes to the display
         if not self.display_enabled:
-            self.tcpserver.send_line_to_all("ERROR DISPLAY DISABLED")
+            self._reply(client_handle, "ERROR DISPLAY DISABLED")
             return
         display_call = arguments[0].upper()
         if display_call == "PAGE":
@@ -227,124 +306,101 @@ class andino_tcp:
         elif display_call == "RAW":
             self.display_instance.send_raw("".join(arguments[1:]))
         else:
-            self.tcpserver.send_line_to_all("ERROR")
+            self._reply(client_handle, "ERROR")
             return
-        self.tcpserver.send_line_to_all("DISP " + " ".join(arguments))
+        self._reply(client_handle, "DISP " + " ".join(arguments))
 
-    def _i_handle_temp_message(self, func, arguments: List[str], _):
+    def _i_handle_temp_message(self, func, arguments: List[str], client_handle: simpletcp.tcp_server.client_handle):
         # SENDT [0| ms > 1000] -> Temperatur Meldezyklus
         # ADDRT [1|2] -> Temepraturmesser Adressen
         # TBUS [1|2] -> Bus anzahl setzen
         # TEMP        -> poll temperature once
         if not self.temperature_enabled:
-            self.tcpserver.send_line_to_all("ERROR")
+            self._reply(client_handle, "ERROR")
             return
         else:
             if func == "SENDT":
-                self.tcpserver.send_line_to_all(self.temperature_handle.set_temp_broadcast_timer(int(arguments[0])))
+                self._reply(client_handle, self.temperature_handle.set_temp_broadcast_timer(int(arguments[0])))
             elif func == "ADDRT":
                 # TODO.md unterschied ADDRT und TBUS
-                self.tcpserver.send_line_to_all(self.temperature_handle.set_bus(int(arguments[0])))
+                self._reply(client_handle, self.temperature_handle.set_bus(int(arguments[0])))
             elif func == "TBUS":
-                self.tcpserver.send_line_to_all(self.temperature_handle.set_bus(int(arguments[0])))
+                self._reply(client_handle, self.temperature_handle.set_bus(int(arguments[0])))
             elif func == "TEMP":
-                self.tcpserver.send_line_to_all(self.temperature_handle.get_temp())
-            # self.tcpserver.send_line_to_all(func + " " + " ".join(arguments))
-
-    def _i_handle_oled_message(self, func, arguments: List[str], _):
-        # TODO.md send respone to client
-        if arguments[0].upper() == "MODE":
-            if len(arguments) == 3:
-                self.oled_instance.set_mode(arguments[1], arguments[2])
-            else:
-                self.oled_instance.set_mode(arguments[1])
-        else:
-            text = [j.replace("{", "").split("}")[:-1] for j in
-                    [i.replace("<", "") for i in " ".join(arguments).split(">")[:-1]]]
-            if len(text) == 2:
-                self.oled_instance.set_text([text[0], text[1]])
-            else:
-                self.oled_instance.set_text(text[0])
-        self.tcpserver.send_line_to_all(func + " " + " ".join(arguments))
+                self._reply(client_handle, self.temperature_handle.get_temp())
+
+    def _i_handle_oled_message(self, func, arguments: List[str], client_handle: simpletcp.tcp_server.client_handle):
+        # OLED MODE <mode> [<mode>] -> modes of the columns
+        # OLED INFO -> current modes and text
+        # OLED <{line}{line}>[<{line}{line}>] -> text of the columns, one line per line of the mode
+        update = oled_protocol.parse_oled_command(" ".join(arguments))
+        if update.info:
+            self._reply(client_handle, "OLED INFO " + self.oled_instance.info())
+            return
+        self.oled_instance.apply(update)
+        self._reply(client_handle, func + " " + " ".join(arguments))
 
-    def _i_handle_andino_hardware_message(self, func, arguments: List[str],
-                                          _):
-        try:
-            if func == "INFO":
-                self.tcpserver.send_line_to_all(self.x1_instance.info())
+    def _hardware_handler(self, method: str, fixed: tuple, parsers: tuple) -> callable:
+        """
+        :param method: name of the x1_instance method, resolved on every call as tests replace the instance
+        :param fixed: arguments of the method known at registration, e.g. the relay number
+        :param parsers: converts each tcp argument, further arguments are ignored
+        :return: handler of the command for self.assign
+        """
+        arity = len(parsers)
+        # every hardware command has at most one argument, that case skips building the argument list
+        parse = parsers[0] if arity == 1 else None
+
+        def handle(func, arguments: List[str], client_handle: simpletcp.tcp_server.client_handle):
+            if len(arguments) < arity:
+                log.error(f"{func} expects {arity} argument(s), got {len(arguments)}")
+                self._reply(client_handle, "ERROR")
+                return
+            try:
+                if parse is not None:
+                    answer = getattr(self.x1_instance, method)(*fixed, parse(arguments[0]))
+                else:
+                    values = [parser(argument) for parser, argument in zip(parsers, arguments)]
+                    answer = getattr(self.x1_instance, method)(*fixed, *values)
+            except ValueError as ex:
+                log.error(f"VALUE ERROR in Hardware Message: {ex}")
+                self._reply(client_handle, "ERROR")
                 return
-            elif func == "HARD":
-                self.tcpserver.send_line_to_all(self.x1_instance.hardware(int(arguments[0])))
-            elif func == "POLL":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_polling(int(arguments[0])))
-            elif func == "SKIP":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_skip(int(arguments[0])))
-            elif func == "EDGE":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_edge_detection(bool(int(arguments[0]))))
-            elif func == "SEND":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_send_time(int(arguments[0])))
-            elif func == "CHNG":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_broadcast_on_change(bool(int(arguments[0]))))
-            elif func == "CHNP":
-                if isinstance(self.x1_instance, andinopy.tcp.io_x1_emulator.x1_emulator):
-                    self.tcpserver.send_line_to_all(
-                        self.x1_instance.set_change_pattern([int(i) for i in str(arguments[0])]))
-            elif func == "CNTR":
-                # TODO.md CNTR	Send Counter - Send counter+states(1) or only states(0)
-                #  (default 1)
-                self.tcpserver.send_line_to_all(self.x1_instance.get_counters(int(arguments[0])))
-            elif func == "DEBO":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_debounce(int(arguments[0])))
-            elif func == "POWR":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_power(int(arguments[0])))
-            elif func == "REL?":
-                self.tcpserver.send_line_to_all(self.x1_instance.set_send_relays_status(bool(int(arguments[0]))))
-            elif func.startswith("REL"):
-                i = int(func[3:])
-                self.tcpserver.send_line_to_all(self.x1_instance.set_relay(i, int(arguments[0])))
-            elif func.startswith("RPU"):
-                i = func[3]
-                self.tcpserver.send_line_to_all(self.x1_instance.pulse_relay(int(i), int(arguments[0])))
-        except ValueError as ex:
-            log.error(f"VALUE ERROR in Hardware Message: {ex}")
-            self.tcpserver.send_line_to_all("ERROR")
+            self._reply(client_handle, answer)
+
+        return handle
+
+    def _reply(self, client_handle: simpletcp.tcp_server.client_handle, message: str):
+        """
+        Answer a command - only to the issuing client if reply_to_requester is set, otherwise to all clients
+        """
+        if self.reply_to_requester:
+            client_handle.send_line(message)
+        else:
+            self.tcpserver.send_line_to_all(message)
 
     # endregion
 
     # region outgoing functions
     def _o_on_rfid(self, message: str):
-        self.tcpserver.send_line_to_all(
-            f":{self._get_and_increase_send_ctr()}@R{{{message}}}"
-        )
+        self.event_bus.publish("@R", message)
 
     def _o_on_function_button(self, message: str):
-        self.tcpserver.send_line_to_all(
-            f":{self._get_and_increase_send_ctr()}@F{{{message}}}"
-        )
+        self.event_bus.publish("@F", message)
 
     def _o_on_number_button(self, message: str):
-        self.tcpserver.send_line_to_all(
-            f":{self._get_and_increase_send_ctr()}@N{{{message}}}"
-        )
+        self.event_bus.publish("@N", message)
 
     def _o_on_display_touch(self, message: bytes):
-        self.tcpserver.send_line_to_all(
-            f":{self._get_and_increase_send_ctr()}@D{{{message}}}"
-        )
+        self.event_bus.publish("@D", message)
 
     def _o_on_display_string(self, message: str):
-        self.tcpserver.send_line_to_all(
-            f":{self._get_and_increase_send_ctr()}@D{{{message}}}"
-        )
+        self.event_bus.publish("@D", message)
 
     def _o_broadcast(self, message: str):
-        self.tcpserver.send_line_to_all(f":{self._get_and_increase_send_ctr()}{message}")
+        self.event_bus.publish(None, message)
 
     # endregion
-    def _get_and_increase_send_ctr(self):
-        ctr = self._message_counter
-        self._message_counter = (self._message_counter + 1) % 0xFFFF
-        return f'{ctr:04x}'.upper()
 
 
 if __name__ == "__main__":
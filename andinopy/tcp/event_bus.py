@@ -0,0 +1,192 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import bisect
+import collections
+import threading
+import time
+from typing import List, Optional
+
+from andinopy import andinopy_logger
+from andinopy.tcp.sequencer import message_sequencer
+
+# upper bounds of the latency buckets in microseconds, the last bucket takes everything above
+LATENCY_BUCKETS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+# events written to the clients with one send at most
+MAX_BATCH = 256
+
+
+class latency_histogram:
+    def __init__(self, buckets_us: tuple = LATENCY_BUCKETS_US):
+        """
+        Counts latencies in buckets, not thread safe, the event bus records from its dispatcher only
+        :param buckets_us: ascending upper bounds in microseconds
+        """
+        self.buckets_us = buckets_us
+        self.counts: List[int] = [0] * (len(buckets_us) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets_us, seconds * 1e6)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        :param percent: 0 to 100
+        :return: upper bound of the bucket holding the percentile in seconds, inf for the last bucket,
+                 None without records
+        """
+        if self.count == 0:
+            return None
+        rank = percent / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets_us[i] / 1e6 if i < len(self.buckets_us) else float("inf")
+        return float("inf")
+
+    def reset(self):
+        self.counts = [0] * (len(self.buckets_us) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def __str__(self):
+        if self.count == 0:
+            return "no events"
+        lines = [f"{self.count} events, mean {self.total / self.count * 1e6:.0f}us, max {self.maximum * 1e6:.0f}us"]
+        lower = 0
+        for i, count in enumerate(self.counts):
+            label = f"<={self.buckets_us[i]}us" if i < len(self.buckets_us) else f">{lower}us"
+            if count:
+                lines.append(f"{label:>10} {count:8} {'#' * max(1, round(count * 40 / self.count))}")
+            if i < len(self.buckets_us):
+                lower = self.buckets_us[i]
+        return "\n".join(lines)
+
+
+class event_bus:
+    def __init__(self, send: callable, sequencer: message_sequencer = None, max_size: int = 1024):
+        """
+        Outgoing events of all device threads in one queue, a single dispatcher numbers them in queue order and
+        hands them to the tcp clients, so producers never wait for the network and events keep their order
+        :param send: writes the text of one or more lines to all clients, e.g. tcp_server.send_to_all
+        :param sequencer: numbers the events
+        :param max_size: events queued at most, the oldest are dropped and logged if the dispatcher falls behind
+        """
+        self._send = send
+        self.sequencer = message_sequencer() if sequencer is None else sequencer
+        # deque append and popleft are atomic, producers take no lock
+        self._queue = collections.deque(maxlen=max_size)
+        self._wake = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._running = False
+        self._thread: threading.Thread = None
+        self.dispatched = 0
+        self.dropped = 0
+        # drops already logged by the dispatcher, an overflow is logged when it starts and when it is over
+        self._dropped_logged = 0
+        self._overflowing = False
+        # production to hand over to the client send queues
+        self.latency = latency_histogram()
+
+    # region start_stop
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._t_dispatch_thread_code)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the dispatcher after the queued events are sent
+        :return: None
+        """
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # endregion
+
+    def publish(self, tag: Optional[str], message):
+        """
+        Queue an event, returns at once
+        :param tag: sent as :<sequence><tag>{<message>}, None sends :<sequence><message>
+        :param message: formatted by the dispatcher
+        :return: None
+        """
+        queue = self._queue
+        if len(queue) == queue.maxlen:
+            # counted without a lock, may miss a drop under heavy contention
+            self.dropped += 1
+            if not self._overflowing:
+                self._overflowing = True
+                andinopy_logger.info(f"event queue overflow, dropping the oldest of {queue.maxlen} events")
+        queue.append((time.perf_counter(), tag, message))
+        self._wake.set()
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Wait until every queued event is sent
+        :param timeout: seconds, None waits forever
+        :return: True if nothing is queued
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._queue and not self._busy, timeout)
+
+    def statistics(self) -> dict:
+        return {"queued": len(self._queue), "dispatched": self.dispatched, "dropped": self.dropped,
+                "p50": self.latency.percentile(50), "p99": self.latency.percentile(99),
+                "max": self.latency.maximum}
+
+    def _t_dispatch_thread_code(self):
+        while self._running:
+            self._wake.wait()
+            self._wake.clear()
+            self._dispatch()
+        self._dispatch()
+
+    def _dispatch(self):
+        queue = self._queue
+        with self._idle:
+            self._busy = True
+        try:
+            while queue:
+                lines = []
+                produced = []
+                while queue and len(lines) < MAX_BATCH:
+                    produced_at, tag, message = queue.popleft()
+                    sequence = self.sequencer.next()
+                    lines.append(f":{sequence}{tag}{{{message}}}\n" if tag is not None else f":{sequence}{message}\n")
+                    produced.append(produced_at)
+                try:
+                    self._send("".join(lines))
+                except Exception as ex:
+                    andinopy_logger.error(f"sending events failed: {ex}")
+                now = time.perf_counter()
+                record = self.latency.record
+                for produced_at in produced:
+                    record(now - produced_at)
+                self.dispatched += len(lines)
+            if self._overflowing:
+                self._overflowing = False
+                dropped = self.dropped
+                andinopy_logger.info(f"event queue overflow over, {dropped - self._dropped_logged} events dropped")
+                self._dropped_logged = dropped
+        finally:
+            with self._idle:
+                self._busy = False
+                self._idle.notify_all()
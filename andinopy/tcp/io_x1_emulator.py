@@ -44,6 +44,17 @@ class x1_emulator(andinopy.interfaces.andino_hardware_interface.andino_hardware_
 
         self._hex_counter = [0 for _ in range(len(self.io.input_pins))]
 
+        # broadcast fragments, only updated when a counter, input or relay changes
+        self._fragment_lock = threading.Lock()
+        self._counter_parts: List[str] = []
+        self._input_parts: List[str] = []
+        self._counter_fragment = ""
+        self._input_fragment = ""
+        self._relay_fragment = ""
+        # pulsed relays switch back on their own, their fragment is rebuilt until the pulse is over
+        self._relay_pulse_until = 0.0
+        self._rebuild_fragments()
+
         self._read_size = None
         self._serial_port = None
         self._receive_thread = None
@@ -57,6 +68,7 @@ class x1_emulator(andinopy.interfaces.andino_hardware_interface.andino_hardware_
         self._running = True
         self.reset()
         self.io.start()
+        self._rebuild_fragments()
         self._send_thread.start()
 
     def stop(self):
@@ -68,9 +80,17 @@ class x1_emulator(andinopy.interfaces.andino_hardware_interface.andino_hardware_
 
     # region input functions
     def _on_input_hex(self, i):
-        self._hex_counter[i] = (self._hex_counter[i] + 1) % 0xFFFF
+        with self._fragment_lock:
+            counter = (self._hex_counter[i] + 1) % 0xFFFF
+            self._hex_counter[i] = counter
+            self._counter_parts[i] = format(counter, 'x')
+            self._counter_fragment = f"{{{','.join(self._counter_parts)}}}"
 
     def _on_input_change(self, i):
+        with self._fragment_lock:
+            if i < len(self._input_parts):
+                self._input_parts[i] = str(int(self.io.Inputs[i].is_pressed))
+                self._input_fragment = f"{{{','.join(self._input_parts)}}}"
         if self.send_on_change and self.change_pattern[i] == True:
             self.broad_cast_function(self.generate_broadcast_string())
 
@@ -228,20 +248,41 @@ class x1_emulator(andinopy.interfaces.andino_hardware_interface.andino_hardware_
             if parent_object.send_broadcast and parent_object._running:
                 parent_object.broad_cast_function(parent_object.generate_broadcast_string())
 
+    # region broadcast fragments
+    def _rebuild_fragments(self):
+        with self._fragment_lock:
+            self._counter_parts = [format(i, 'x') for i in self._hex_counter]
+            self._counter_fragment = f"{{{','.join(self._counter_parts)}}}"
+            self._input_parts = [str(int(i)) for i in self.io.get_input_statuses()]
+            self._input_fragment = f"{{{','.join(self._input_parts)}}}"
+            self._relay_fragment = f"{{{','.join([str(i.value) for i in self.io.outRel])}}}"
+
+    def _update_relay_fragment(self):
+        self._relay_fragment = f"{{{','.join([str(i.value) for i in self.io.outRel])}}}"
+
+    def _get_relay_fragment(self) -> str:
+        if self._relay_pulse_until:
+            self._update_relay_fragment()
+            if time.monotonic() >= self._relay_pulse_until:
+                self._relay_pulse_until = 0.0
+        return self._relay_fragment
+
+    # endregion
+
     def generate_broadcast_string(self) -> str:
-        status = ""
         try:
-            if self.send_counter:
-                status += f"{{{','.join([format(i, 'x') for i in self._hex_counter])}}}"
-            status += f"{{{','.join([str(int(i)) for i in self.io.get_input_statuses()])}}}"
+            status = self._counter_fragment + self._input_fragment if self.send_counter else self._input_fragment
             if self.send_rel:
-                status += f"{{{','.join([str(i.value) for i in self.io.outRel])}}}"
+                status += self._get_relay_fragment()
         except Exception:
             return "ERROR GENERATING BROADCAST"
         return status
 
     def reset(self) -> str:
-        self._hex_counter = [0 for _ in range(len(self.io.input_pins))]
+        with self._fragment_lock:
+            self._hex_counter = [0 for _ in range(len(self.io.input_pins))]
+            self._counter_parts = ['0' for _ in range(len(self.io.input_pins))]
+            self._counter_fragment = f"{{{','.join(self._counter_parts)}}}"
         return "RESET"
 
     def info(self) -> str:
@@ -262,6 +303,7 @@ class x1_emulator(andinopy.interfaces.andino_hardware_interface.andino_hardware_
 
     def set_edge_detection(self, value: bool) -> str:
         self.io.input_pull_up = [value for _ in range(len(self.io.Inputs))]
+        self._rebuild_fragments()
         return f"EDGE {int(value)}"
 
     def set_send_time(self, send_time: int) -> str:
@@ -285,10 +327,14 @@ class x1_emulator(andinopy.interfaces.andino_hardware_interface.andino_hardware_
 
     def set_relay(self, relay_num: int, value: int) -> str:
         self.io.set_relay(relay_num - 1, value)
+        self._update_relay_fragment()
         return f"REL{relay_num} {value}"
 
     def pulse_relay(self, relay_num: int, value: int) -> str:
         self.io.pulse_relays(relay_num - 1, value)
+        # the relay switches back after value ms
+        self._relay_pulse_until = max(self._relay_pulse_until, time.monotonic() + value / 1000 + 0.1)
+        self._update_relay_fragment()
         return f"RPU{relay_num} {value}"
 
     def set_broadcast_on_change(self, value: bool) -> str:
@@ -309,9 +355,9 @@ class x1_emulator(andinopy.interfaces.andino_hardware_interface.andino_hardware_
         return f"CNTR {int(value)}"
 
     def get_counters(self, mode: int) -> str:
-        value = f"{{{','.join([format(i, 'x') for i in self._hex_counter])}}}"
+        value = self._counter_fragment
         if mode > 0:
-            value += f"{{{','.join([str(int(i)) for i in self.io.get_input_statuses()])}}}"
+            value += self._input_fragment
         if mode > 1:
-            value += f"{{{','.join([str(i.value) for i in self.io.outRel])}}}"
+            value += self._get_relay_fragment()
         return value
@@ -0,0 +1,34 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import itertools
+
+# the counter wraps after FFFE like it always did
+SEQUENCE_MODULUS = 0xFFFF
+_hex_table = [f"{i:04X}" for i in range(SEQUENCE_MODULUS)]
+
+
+class message_sequencer:
+    def __init__(self):
+        """
+        Numbers the messages sent to the tcp clients, safe to call from every thread without a lock:
+        next() of an itertools.count is atomic and the numbers are formatted by a table lookup
+        """
+        self._counter = itertools.count()
+
+    def next(self) -> str:
+        """
+        :return: the next sequence number as 4 upper case hex digits
+        """
+        return _hex_table[next(self._counter) % SEQUENCE_MODULUS]
+
+    def reset(self):
+        """
+        Start again with 0000
+        :return: None
+        """
+        self._counter = itertools.count()
@@ -5,14 +5,28 @@
 #   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
 #                                     |_|    |___/
 # by Jakob Groß
+import select
+import selectors
+import socket as socket_module
 import sys
-import traceback
-from typing import Callable, Optional
-from socket import socket, AF_INET, SOCK_STREAM, SHUT_WR
+from collections import deque
+from typing import Callable, Deque, Optional, Set
+from socket import socket, socketpair, AF_INET, SOCK_STREAM, SHUT_WR
 import time
-from threading import Thread
+import traceback
+from threading import Thread, Lock, Condition, current_thread
 from andinopy import andinopy_logger
 
+# What happens when a client does not read fast enough and its send queue is full
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # drop the oldest queued message
+OVERFLOW_DISCONNECT = "disconnect"  # disconnect the client
+OVERFLOW_COALESCE = "coalesce"  # drop everything queued, only the latest message is sent
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DISCONNECT, OVERFLOW_COALESCE)
+
+READ_SIZE = 4096
+# the shared writer of the threaded server must not block on one client, windows has no such flag
+SEND_FLAGS = getattr(socket_module, "MSG_DONTWAIT", 0)
+
 
 def print_message(message: str, client: 'tcp_server.client_handle'):
     print(f"{client.address[0]}:{client.address[1]}: {message}")
@@ -23,6 +37,163 @@ def broadcast_all_clients(tcp_server_instance: 'tcp_server'):
            f" {','.join(i.address[0] + ':' + i.address[1] for i in tcp_server_instance.clients)}"
 
 
+class line_framer:
+    """
+    Splits a received byte stream into lines.
+    The buffer is searched from a cursor so every byte is scanned once, all complete lines of a chunk are
+    decoded and split in one go and only the incomplete rest is kept.
+    """
+
+    def __init__(self, encoding: str, on_line: Callable[[str], None], on_error: Callable[[str], None],
+                 max_line_length: int = 4096):
+        """
+        :param encoding: encoding of the lines
+        :param on_line: called with every complete, non empty line without line ending
+        :param on_error: called with an error message for undecodable or too long lines
+        :param max_line_length: lines longer than this are discarded
+        """
+        self.encoding: str = encoding
+        self.max_line_length: int = max_line_length
+        self.dropped_lines: int = 0
+        self._on_line: Callable[[str], None] = on_line
+        self._on_error: Callable[[str], None] = on_error
+        self._buffer: bytearray = bytearray()
+        # everything before the cursor has already been searched for a line ending
+        self._cursor: int = 0
+        self._discarding: bool = False
+
+    def feed(self, data: bytes):
+        buffer = self._buffer
+        buffer += data
+        end = buffer.rfind(b"\n", self._cursor)
+        if end >= 0:
+            complete = bytes(buffer[:end])
+            del buffer[:end + 1]
+            try:
+                lines = complete.decode(self.encoding).split("\n")
+            except UnicodeDecodeError:
+                lines = [self._decode(line) for line in complete.split(b"\n")]
+            if self._discarding:
+                self._discarding = False
+                lines[0] = ""
+            for line in lines:
+                if not line:
+                    continue
+                if "\r" in line:
+                    line = line.replace("\r", "")
+                    if not line:
+                        continue
+                if len(line) > self.max_line_length:
+                    self._drop()
+                    continue
+                self._on_line(line)
+        if len(buffer) > self.max_line_length:
+            buffer.clear()
+            if not self._discarding:
+                self._discarding = True
+                self._drop()
+        self._cursor = len(buffer)
+
+    def _decode(self, line: bytes) -> str:
+        try:
+            return line.decode(self.encoding)
+        except UnicodeDecodeError as decode_err:
+            andinopy_logger.info(f"cant decode bytes:{line} - {decode_err}")
+            self._on_error("ERROR can't decode Message")
+            return ""
+
+    def _drop(self):
+        andinopy_logger.info(f"line longer than {self.max_line_length} bytes discarded")
+        self.dropped_lines += 1
+        self._on_error("ERROR line too long")
+
+
+class client_send_queue:
+    """
+    Bounded queue of encoded messages for one client.
+    The payloads are shared between all clients of a broadcast, a partially sent message is kept as memoryview.
+    """
+
+    def __init__(self, max_size: int = 256, overflow_policy: str = OVERFLOW_DROP_OLDEST):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise AttributeError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
+        self.max_size: int = max_size
+        self.overflow_policy: str = overflow_policy
+        self.dropped: int = 0
+        self.closed: bool = False
+        self._queue: Deque[memoryview] = deque()
+        # the head is being sent or partially sent and must not be dropped
+        self._head_busy: bool = False
+        self._head_partial: bool = False
+        self._condition: Condition = Condition()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, data: bytes) -> bool:
+        """
+        Queue a message
+        :param data: encoded message
+        :return: False if the queue overflowed and the client should be disconnected
+        """
+        with self._condition:
+            if self.closed:
+                return True
+            if len(self._queue) >= self.max_size:
+                if self.overflow_policy == OVERFLOW_DISCONNECT:
+                    return False
+                keep = 1 if self._head_busy or self._head_partial else 0
+                if self.overflow_policy == OVERFLOW_COALESCE:
+                    while len(self._queue) > keep:
+                        self._queue.pop()
+                        self.dropped += 1
+                elif len(self._queue) > keep:
+                    del self._queue[keep]
+                    self.dropped += 1
+            self._queue.append(memoryview(data))
+            self._condition.notify()
+        return True
+
+    def get(self, timeout: float = None) -> Optional[memoryview]:
+        """
+        Get the message which has to be sent next and protect it from being dropped until advance is called
+        :param timeout: None returns immediately, otherwise wait up to timeout seconds for a message
+        :return: the pending bytes of the head message or None
+        """
+        with self._condition:
+            if not self._queue and timeout is not None and not self.closed:
+                self._condition.wait(timeout)
+            if not self._queue:
+                return None
+            self._head_busy = True
+            return self._queue[0]
+
+    def advance(self, sent: int):
+        """
+        Remove sent bytes from the head message
+        :param sent: number of bytes the socket accepted
+        """
+        with self._condition:
+            self._head_busy = False
+            if not self._queue:
+                # closed while sending
+                return
+            head = self._queue[0]
+            if sent >= len(head):
+                self._queue.popleft()
+                self._head_partial = False
+            elif sent > 0:
+                self._queue[0] = head[sent:]
+                self._head_partial = True
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._queue.clear()
+            self._head_partial = False
+            self._condition.notify_all()
+
+
 class tcp_server:
     class client_handle:
 
@@ -33,53 +204,66 @@ class tcp_server:
             self._client_socket: socket = client_socket
             self._parent_server: 'tcp_server' = parent_server
             self._on_message: callable([str, socket]) = on_message
+            self.send_queue: client_send_queue = client_send_queue(parent_server.queue_size,
+                                                                   parent_server.overflow_policy)
+            self._framer: line_framer = line_framer(parent_server.encoding, lambda line: self._on_message(line, self),
+                                                    self.send_line, parent_server.max_line_length)
             self._thread: Thread = Thread(target=self._receive_thread)
             self._thread.daemon = True
 
             self._thread.start()
 
         def send_message(self, message):
-            try:
-                self._client_socket.send(message.encode(self._parent_server.encoding))
-            except OSError as os_err:
-                print(f"OSError: {os_err}")
-                self.remove()
-            except BrokenPipeError as bperr:
-                print(f"Broken Pipe Error: {bperr}")
-                self.remove()
+            self.send_bytes(message.encode(self._parent_server.encoding))
 
         def send_line(self, message: str):
             self.send_message(message + "\n")
 
+        def send_bytes(self, data: bytes):
+            """
+            Queue already encoded data, the writer thread of the server writes it to the socket
+            """
+            if not self.send_queue.put(data):
+                andinopy_logger.info(f"{self.address[0]}:{self.address[1]} send queue overflow")
+                self.remove()
+                return
+            self._parent_server._request_write(self)
+
+        def fileno(self) -> int:
+            return self._client_socket.fileno()
+
+        def _on_writable(self) -> bool:
+            """
+            Write as much of the queued output as the socket accepts without waiting
+            :return: True if output is still pending
+            """
+            while self._running:
+                data = self.send_queue.get()
+                if data is None:
+                    return False
+                try:
+                    sent = self._client_socket.send(data, SEND_FLAGS)
+                except BlockingIOError:
+                    self.send_queue.advance(0)
+                    return True
+                except OSError as os_err:
+                    andinopy_logger.info(f"{self.address[0]}:{self.address[1]} error while sending: {os_err}")
+                    self.remove()
+                    return False
+                self.send_queue.advance(sent)
+                if sent < len(data):
+                    return True
+            return False
+
         def _receive_thread(self):
             andinopy_logger.info(f"{self.address[0]}:{self.address[1]} connected")
             print(f"{self.address} connected")
             try:
-                buffer = ""
                 while self._running:
-                    data = self._client_socket.recv(1024)
+                    data = self._client_socket.recv(READ_SIZE)
                     if not data:
                         break
-                    try:
-                        if not data:
-                            self._running = False
-                            break
-                        data = data.decode(self._parent_server.encoding)
-                    except UnicodeDecodeError as decode_err:
-                        print(f"cant decode bytes:{data}")
-                        print(decode_err)
-                        print(traceback.format_exc(decode_err))
-                        self.send_line("ERROR can't decode Message")
-                        continue
-                    buffer += data
-                    buffer = buffer.lstrip("\n")
-                    buffer = buffer.replace("\r", "")
-                    index = buffer.find("\n")
-                    while index > 0:
-                        word = buffer[:index]
-                        buffer = buffer[index + 1:]
-                        self._on_message(word, self)
-                        index = buffer.find("\n")
+                    self._framer.feed(data)
                 self._running = False
                 self.remove()
             except OSError:
@@ -92,6 +276,7 @@ class tcp_server:
         def remove(self):
             andinopy_logger.info(f"{self.address[0]}:{self.address[1]} disconnected")
             self._running = False
+            self.send_queue.close()
             try:
                 self._client_socket.shutdown(SHUT_WR)
                 self._client_socket.close()
@@ -102,21 +287,36 @@ class tcp_server:
 
     def __init__(self, host: str = "", port: int = 9999, on_message: callable([str, 'client_handle']) = print_message,
                  generate_broadcast: Callable[['tcp_server'], str] = broadcast_all_clients, broadcast_timer: int = 0,
-                 encoding: str = "ascii"):
+                 encoding: str = "ascii", queue_size: int = 256, overflow_policy: str = OVERFLOW_DROP_OLDEST,
+                 max_line_length: int = 4096):
         """
         Initialize a new TCP server which should then be customized
         :param host: An empty string means localhost
         :param port: The Port on which the server should be reachable
+        :param queue_size: maximum number of messages queued per client
+        :param overflow_policy: "drop_oldest", "disconnect" or "coalesce" if a client's queue is full
+        :param max_line_length: received lines longer than this (in bytes) are discarded
         """
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise AttributeError(f"overflow_policy must be one of {OVERFLOW_POLICIES}")
         # Network
 
         self.encoding = encoding
+        self.queue_size: int = queue_size
+        self.overflow_policy: str = overflow_policy
+        self.max_line_length: int = max_line_length
         self.clients = []
         self.broadcast_timer: int = 0
         self._running: bool = False
         self._socket: socket = socket(AF_INET, SOCK_STREAM)
         self._client_accept_thread: Optional[Thread] = None
         self._broadcast_thread: Optional[Thread] = None
+        # one thread writes the output of all clients, woken through the socket pair
+        self._writer_thread: Optional[Thread] = None
+        self._wake_receive: Optional[socket] = None
+        self._wake_send: Optional[socket] = None
+        self._pending_writes: Set['tcp_server.client_handle'] = set()
+        self._pending_lock: Lock = Lock()
 
         # Custom functions
         self.on_message: callable([str, 'client_handle']) = None
@@ -132,20 +332,70 @@ class tcp_server:
 
     def start(self):
         self._running = True
+        self._wake_receive, self._wake_send = socketpair()
+        self._wake_receive.setblocking(False)
+        self._wake_send.setblocking(False)
         self._client_accept_thread = Thread(target=self._accept_thread)
         self._client_accept_thread.daemon = True
         self._broadcast_thread = Thread(target=self._broadcast_thread_function)
         self._broadcast_thread.daemon = True
+        self._writer_thread = Thread(target=self._writer_thread_function)
+        self._writer_thread.daemon = True
         self._client_accept_thread.start()
         self._broadcast_thread.start()
+        self._writer_thread.start()
 
     def stop(self):
         self._running = False
-        for i in self.clients:
+        self._wake()
+        for i in list(self.clients):
             i.remove()
         self._socket.close()
         self._client_accept_thread.join(1)
         self._broadcast_thread.join(1)
+        self._writer_thread.join(1)
+        self._wake_receive.close()
+        self._wake_send.close()
+
+    def _wake(self):
+        try:
+            self._wake_send.send(b"\0")
+        except (BlockingIOError, OSError):
+            # wakeup already pending or server stopped
+            pass
+
+    def _request_write(self, client: 'tcp_server.client_handle'):
+        with self._pending_lock:
+            self._pending_writes.add(client)
+        self._wake()
+
+    def _writer_thread_function(self):
+        andinopy_logger.info("starting writer thread")
+        # clients whose socket did not accept all of their output
+        blocked: Set['tcp_server.client_handle'] = set()
+        while self._running:
+            blocked = {client for client in blocked if client._running}
+            try:
+                readable, writable, _ = select.select([self._wake_receive], list(blocked), [], 1)
+            except (OSError, ValueError):
+                # a blocked client was closed meanwhile, it is left out of the next select
+                continue
+            if readable:
+                try:
+                    while self._wake_receive.recv(1024):
+                        pass
+                except (BlockingIOError, OSError):
+                    pass
+            with self._pending_lock:
+                ready = self._pending_writes
+                self._pending_writes = set()
+            ready.update(writable)
+            for client in ready:
+                if client._on_writable():
+                    blocked.add(client)
+                else:
+                    blocked.discard(client)
+        andinopy_logger.info("writer thread stopped")
 
     def _build_accept_socket(self):
         try:
@@ -160,12 +410,13 @@ class tcp_server:
             self._build_accept_socket()
 
     def send_to_all(self, message: str):
-        for i in self.clients:
-            i.send_message(message)
+        # encoded once, all client queues share the payload
+        data = message.encode(self.encoding)
+        for i in list(self.clients):
+            i.send_bytes(data)
 
     def send_line_to_all(self, message: str):
-        for i in self.clients:
-            i.send_line(message)
+        self.send_to_all(message + "\n")
 
     def _accept_thread(self):
         andinopy_logger.info("starting accept thread")
@@ -188,7 +439,241 @@ class tcp_server:
                 if len(self.clients) > 0:
                     message = self.generate_broadcast(self)
                     andinopy_logger.info(f"{len(self.clients)} clients connected - broadcast message is {message}")
-                    for client in self.clients:
-                        client.send_message(message)
+                    self.send_to_all(message)
             else:
                 time.sleep(1)
+
+
+class tcp_selector_server(tcp_server):
+    """
+    TCP server which multiplexes all clients, the accept socket and the broadcast timer on one selector loop
+    instead of spawning a thread per client. The on_message(str, client_handle) contract stays the same,
+    on_message is called from the loop thread.
+    """
+
+    class client_handle:
+
+        def __init__(self, address: str, client_socket: socket,
+                     parent_server, on_message: callable([str, 'client_handle'])):
+            self._running: bool = True
+            self.address: (str, int) = address
+            self._client_socket: socket = client_socket
+            self._client_socket.setblocking(False)
+            self._parent_server: 'tcp_selector_server' = parent_server
+            self._on_message: callable([str, socket]) = on_message
+            self._framer: line_framer = line_framer(parent_server.encoding, lambda line: self._on_message(line, self),
+                                                    self.send_line, parent_server.max_line_length)
+            self.send_queue: client_send_queue = client_send_queue(parent_server.queue_size,
+                                                                   parent_server.overflow_policy)
+            self._overflowed: bool = False
+            andinopy_logger.info(f"{self.address[0]}:{self.address[1]} connected")
+
+        def send_message(self, message):
+            self.send_bytes(message.encode(self._parent_server.encoding))
+
+        def send_line(self, message: str):
+            self.send_message(message + "\n")
+
+        def send_bytes(self, data: bytes):
+            """
+            Queue already encoded data, the selector loop writes it when the socket is writable
+            """
+            if not self._running:
+                return
+            if not self.send_queue.put(data):
+                # removing is left to the loop thread which owns the selector
+                self._overflowed = True
+            self._parent_server._request_write(self)
+
+        def fileno(self) -> int:
+            return self._client_socket.fileno()
+
+        def _on_readable(self):
+            try:
+                data = self._client_socket.recv(READ_SIZE)
+            except BlockingIOError:
+                return
+            except OSError:
+                andinopy_logger.info("client closed before reading was finished")
+                self.remove()
+                return
+            if not data:
+                self.remove()
+                return
+            self._framer.feed(data)
+
+        def _on_writable(self) -> bool:
+            """
+            Write as much of the queued output as the socket accepts
+            :return: True if output is still pending
+            """
+            while True:
+                data = self.send_queue.get()
+                if data is None:
+                    return False
+                try:
+                    sent = self._client_socket.send(data)
+                except BlockingIOError:
+                    self.send_queue.advance(0)
+                    return True
+                except OSError:
+                    andinopy_logger.info("client closed before sending was finished")
+                    self.remove()
+                    return False
+                self.send_queue.advance(sent)
+                if sent < len(data):
+                    return True
+
+        def remove(self):
+            if not self._running:
+                return
+            andinopy_logger.info(f"{self.address[0]}:{self.address[1]} disconnected")
+            self._running = False
+            self.send_queue.close()
+            self._parent_server._unregister(self)
+            try:
+                self._client_socket.shutdown(SHUT_WR)
+            except OSError:
+                andinopy_logger.info(f"{self.address}:Client unexpectedly disconnected")
+            self._client_socket.close()
+            if self in self._parent_server.clients:
+                self._parent_server.clients.remove(self)
+
+    def __init__(self, host: str = "", port: int = 9999, on_message: callable([str, 'client_handle']) = print_message,
+                 generate_broadcast: Callable[['tcp_server'], str] = broadcast_all_clients, broadcast_timer: int = 0,
+                 encoding: str = "ascii", queue_size: int = 256, overflow_policy: str = OVERFLOW_DROP_OLDEST,
+                 max_line_length: int = 4096):
+        """
+        Initialize a new selector based TCP server which should then be customized
+        :param host: An empty string means localhost
+        :param port: The Port on which the server should be reachable
+        :param queue_size: maximum number of messages queued per client
+        :param overflow_policy: "drop_oldest", "disconnect" or "coalesce" if a client's queue is full
+        :param max_line_length: received lines longer than this (in bytes) are discarded
+        """
+        super().__init__(host, port, on_message, generate_broadcast, broadcast_timer, encoding, queue_size,
+                         overflow_policy, max_line_length)
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._loop_thread: Optional[Thread] = None
+
+    def start(self):
+        self._running = True
+        self._selector = selectors.DefaultSelector()
+        self._wake_receive, self._wake_send = socketpair()
+        self._wake_receive.setblocking(False)
+        self._wake_send.setblocking(False)
+        self._loop_thread = Thread(target=self._loop)
+        self._loop_thread.daemon = True
+        self._loop_thread.start()
+
+    def stop(self):
+        self._running = False
+        self._wake()
+        # on_message may stop the server from the loop thread, which ends after the current event
+        if current_thread() is not self._loop_thread:
+            self._loop_thread.join(1)
+        for i in list(self.clients):
+            i.remove()
+        self._socket.close()
+        self._selector.close()
+        self._wake_receive.close()
+        self._wake_send.close()
+
+    def _unregister(self, client: 'tcp_selector_server.client_handle'):
+        try:
+            self._selector.unregister(client)
+        except (KeyError, ValueError):
+            pass
+
+    def _accept(self):
+        try:
+            sock, address = self._socket.accept()
+        except BlockingIOError:
+            return
+        except OSError as os_err:
+            # e.g. the client reset the connection before it was accepted or no file descriptors are left
+            andinopy_logger.info(f"accepting a client failed: {os_err}")
+            return
+        client = self.client_handle(address, sock, self, self.on_message)
+        self._selector.register(client, selectors.EVENT_READ)
+        self.clients.append(client)
+
+    def _process_pending_writes(self):
+        try:
+            while self._wake_receive.recv(1024):
+                pass
+        except BlockingIOError:
+            pass
+        with self._pending_lock:
+            pending = self._pending_writes
+            self._pending_writes = set()
+        for client in pending:
+            if client._overflowed:
+                andinopy_logger.info(f"{client.address[0]}:{client.address[1]} send queue overflow")
+                client.remove()
+            elif client._running:
+                self._set_writing(client, True)
+
+    def _set_writing(self, client: 'tcp_selector_server.client_handle', writing: bool):
+        events = selectors.EVENT_READ | selectors.EVENT_WRITE if writing else selectors.EVENT_READ
+        try:
+            if self._selector.get_key(client).events != events:
+                self._selector.modify(client, events)
+        except (KeyError, ValueError):
+            pass
+
+    def _broadcast(self):
+        if len(self.clients) > 0:
+            message = self.generate_broadcast(self)
+            andinopy_logger.info(f"{len(self.clients)} clients connected - broadcast message is {message}")
+            self.send_to_all(message)
+
+    def _loop(self):
+        andinopy_logger.info("starting selector loop")
+        self._build_accept_socket()
+        self._socket.setblocking(False)
+        self._selector.register(self._socket, selectors.EVENT_READ)
+        self._selector.register(self._wake_receive, selectors.EVENT_READ)
+        next_broadcast = None
+        while self._running:
+            timeout = None
+            if self.broadcast_timer > 0:
+                now = time.monotonic()
+                if next_broadcast is None:
+                    next_broadcast = now + self.broadcast_timer / 1000
+                if now >= next_broadcast:
+                    self._broadcast()
+                    next_broadcast = now + self.broadcast_timer / 1000
+                timeout = max(next_broadcast - now, 0)
+            else:
+                next_broadcast = None
+                # re-check the broadcast timer once a second like the threaded server
+                timeout = 1
+            try:
+                events = self._selector.select(timeout)
+            except OSError as os_err:
+                # nothing is served anymore, the server reports itself as stopped
+                andinopy_logger.error(f"Error in selector loop, server stopped: {os_err}")
+                self._running = False
+                break
+            for key, mask in events:
+                if not self._running:
+                    # stopped by on_message, the sockets are closed
+                    break
+                if key.fileobj is self._socket:
+                    self._accept()
+                elif key.fileobj is self._wake_receive:
+                    self._process_pending_writes()
+                else:
+                    client: 'tcp_selector_server.client_handle' = key.fileobj
+                    try:
+                        if mask & selectors.EVENT_READ and client._running:
+                            client._on_readable()
+                        if mask & selectors.EVENT_WRITE and client._running:
+                            self._set_writing(client, client._on_writable())
+                    except Exception as ex:
+                        # one failing client must not stop the loop serving all others
+                        andinopy_logger.error(f"{client.address[0]}:{client.address[1]} failed: {ex}")
+                        andinopy_logger.error(traceback.format_exc())
+                        client.remove()
+        andinopy_logger.info("selector loop stopped")
@@ -0,0 +1,67 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Import time of the modules `python -m andinopy` loads for an io without optional devices,
+measured with `python -X importtime` in fresh interpreters. Exits with 1 if the budget is exceeded
+or a device library is imported although the device is disabled.
+Usage: python3 -m benchmarks.bench_import_time [budget in ms]
+"""
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+# on a Raspberry Pi Zero, expect roughly ten times the time of a desktop machine
+BUDGET_MS = 250
+RUNS = 5
+STARTUP_IMPORTS = "import andinopy, andinopy.tcp.andino_tcp, andinopy.tcp.io_x1_emulator"
+# only needed when the corresponding device is enabled
+DEVICE_MODULES = ("PIL", "serial", "smbus2", "busio", "adafruit_ssd1306", "setuptools")
+
+
+def import_times(statement: str) -> Tuple[Dict[str, Tuple[int, int]], set]:
+    """
+    :return: {module: (self us, cumulative us)} and the set of imported modules
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                             statement + "; import sys; print(','.join(sys.modules))"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # drop the separator blank, nested imports stay indented
+        times[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return times, set(result.stdout.strip().split(","))
+
+
+def main(budget_ms: float) -> int:
+    best_ms = None
+    times, modules = {}, set()
+    for _ in range(RUNS):
+        times, modules = import_times(STARTUP_IMPORTS)
+        # top level imports are not indented
+        total_ms = sum(cumulative for name, (_, cumulative) in times.items() if not name.startswith(" ")) / 1000
+        best_ms = total_ms if best_ms is None else min(best_ms, total_ms)
+    print("slowest modules (self time):")
+    for name, (self_us, cumulative_us) in sorted(times.items(), key=lambda x: -x[1][0])[:10]:
+        print(f"  {self_us / 1000:7.2f}ms {cumulative_us / 1000:7.2f}ms {name.strip()}")
+    print(f"startup imports: {best_ms:.1f}ms (best of {RUNS}), budget {budget_ms}ms")
+    failed = False
+    loaded_devices = [i for i in DEVICE_MODULES if i in modules]
+    if loaded_devices:
+        print(f"device libraries imported although disabled: {loaded_devices}")
+        failed = True
+    if best_ms > budget_ms:
+        print("import time budget exceeded")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS))
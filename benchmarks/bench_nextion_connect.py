@@ -0,0 +1,51 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Time from opening the port until the display accepts a tft upload (get_baud_rate and force_max_baud)
+against a fake display on a pseudo terminal pair listening with 115200 baud, without and with the baud rate cache.
+Usage: python3 -m benchmarks.bench_nextion_connect
+"""
+import os
+import tempfile
+import time
+
+import serial
+
+from andinopy import nextion_util
+from pytest.devices.fake_devices import fake_nextion_upload
+
+
+def measure(name: str, fake: fake_nextion_upload, cache_file: str):
+    start = time.perf_counter()
+    port = serial.Serial(fake.port, 9600, timeout=None)
+    try:
+        assert nextion_util.get_baud_rate(port, cache_file=cache_file)
+        assert nextion_util.force_max_baud(port, 4096, cache_file=cache_file)
+        print(f"{name:8} {time.perf_counter() - start:6.2f} s")
+        # finish the upload so the fake accepts commands again
+        port.write(bytes(4096))
+        port.read(1)
+    finally:
+        port.close()
+
+
+def main():
+    fake = fake_nextion_upload(baud=115200, max_upload_baud=115200)
+    cache_file = tempfile.mktemp(suffix=".json")
+    try:
+        measure("sweep", fake, cache_file)
+        measure("cached", fake, cache_file)
+    finally:
+        fake.stop()
+        for file in [cache_file, cache_file + ".lock"]:
+            if os.path.exists(file):
+                os.remove(file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Time to read a dozen HMI fields from a fake Nextion display on a pseudo terminal pair,
+compared with the previous 10 ms polling of the shared requested_value.
+Usage: python3 -m benchmarks.bench_nextion_get
+"""
+import statistics
+import time
+
+from andinopy.base_devices.nextion_display import display
+from pytest.devices.fake_devices import fake_nextion
+
+FIELDS = [f"n{i}.val" for i in range(12)]
+ROUNDS = 20
+
+
+def legacy_get_attr(nextion: display, attr_name: str):
+    nextion.send_raw(f"get {attr_name}")
+    while nextion.requested_value is None and nextion.running:
+        time.sleep(0.01)
+    x = nextion.requested_value
+    nextion.requested_value = None
+    return x
+
+
+def measure(name: str, read):
+    durations = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        assert read() == list(range(12))
+        durations.append((time.perf_counter() - start) * 1000)
+    print(f"{name:10} median {statistics.median(durations):8.2f} ms per {len(FIELDS)} fields")
+
+
+def main():
+    fake = fake_nextion()
+    fake.attributes = {field: i for i, field in enumerate(FIELDS)}
+    nextion = display(serial_port=fake.port)
+    nextion.start()
+    try:
+        measure("legacy", lambda: [legacy_get_attr(nextion, field) for field in FIELDS])
+        measure("get_attr", lambda: [nextion.get_attr(field) for field in FIELDS])
+        measure("get_attrs", lambda: nextion.get_attrs(FIELDS))
+    finally:
+        nextion.stop()
+        fake.stop()
+
+
+if __name__ == '__main__':
+    main()
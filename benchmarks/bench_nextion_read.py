@@ -0,0 +1,118 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Frames per second of the Nextion reader thread replaying a recorded byte stream from a fake serial port,
+compared with the previous byte by byte reader.
+Usage: python3 -m benchmarks.bench_nextion_read
+"""
+import threading
+import time
+
+import serial
+
+from andinopy.base_devices import nextion_display
+from andinopy.base_devices.nextion_display import display
+
+# touch press/release, a numeric and a string answer and a custom frame as sent by the display
+RECORDING = b"\x65\x01\x02\x01\xff\xff\xff" \
+            b"\x65\x01\x02\x00\xff\xff\xff" \
+            b"\x71\x2a\x00\x00\x00\xff\xff\xff" \
+            b"\x70\x31\x32\x33\xff\xff\xff" \
+            b"\x5a\x01\x02\x03\x04\xff\xff\xff"
+FRAMES_PER_RECORDING = 5
+REPEAT = 20000
+# bytes arriving between two reads
+CHUNK = 256
+
+
+class replay_serial:
+    """
+    Serves a recorded stream in chunks like a port receiving at full speed
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.stream = RECORDING * REPEAT
+        self.position = 0
+        self.is_open = True
+        self.done = threading.Event()
+
+    @property
+    def in_waiting(self) -> int:
+        return min(CHUNK, len(self.stream) - self.position)
+
+    def read(self, size: int = 1) -> bytes:
+        if self.position >= len(self.stream):
+            self.done.set()
+            time.sleep(0.01)
+            return b""
+        data = self.stream[self.position:self.position + size]
+        self.position += len(data)
+        return data
+
+    def write(self, data: bytes):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def legacy_read(handle: display):
+    read_buffer = bytearray()
+    while handle.running:
+        x = handle.port.read(1)
+        if not x:
+            continue
+        read_buffer.append(int.from_bytes(x, "big"))
+        if read_buffer.endswith(b'\xff\xff\xff'):
+            if len(read_buffer) > 3:
+                handle.from_nextion(read_buffer[:-3])
+            read_buffer = bytearray()
+
+
+def measure(name: str, run):
+    frames = [0]
+    nextion = display()
+    nextion.on_display_touch = lambda page, obj, press: frames.__setitem__(0, frames[0] + 1)
+    nextion.on_display_string = lambda frame: frames.__setitem__(0, frames[0] + 1)
+    start = time.perf_counter()
+    port = run(nextion)
+    port.done.wait()
+    duration = time.perf_counter() - start
+    nextion.running = False
+    nextion._read_thread.join()
+    nextion.port.close()
+    expected = REPEAT * (FRAMES_PER_RECORDING - 2)
+    assert frames[0] == expected, f"{frames[0]} != {expected}"
+    print(f"{name:8} {REPEAT * FRAMES_PER_RECORDING / duration:12.0f} frames/s")
+
+
+def run_legacy(nextion: display) -> replay_serial:
+    nextion.port = replay_serial()
+    nextion.running = True
+    nextion._read_thread = threading.Thread(target=legacy_read, args=[nextion])
+    nextion._read_thread.start()
+    return nextion.port
+
+
+def run_current(nextion: display) -> replay_serial:
+    nextion.start()
+    return nextion.port
+
+
+def main():
+    serial_class = nextion_display.serial.Serial
+    nextion_display.serial.Serial = replay_serial
+    try:
+        measure("legacy", run_legacy)
+        measure("current", run_current)
+    finally:
+        nextion_display.serial.Serial = serial_class
+
+
+if __name__ == '__main__':
+    main()
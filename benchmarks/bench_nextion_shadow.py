@@ -0,0 +1,48 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+UART time per screen refresh at 9600 baud when a HMI client resends 20 fields every cycle of which one changes,
+with and without the shadow state of nextion_display.
+Usage: python3 -m benchmarks.bench_nextion_shadow
+"""
+from andinopy.base_devices.nextion_display import display
+
+FIELDS = 20
+CYCLES = 100
+BAUD = 9600
+# start bit, 8 data bits, stop bit
+BITS_PER_BYTE = 10
+
+
+class counting_port:
+    def __init__(self):
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        self.bytes_written += len(data)
+
+
+def measure(name: str, use_shadow: bool):
+    nextion = display()
+    nextion.port = counting_port()
+    nextion.use_shadow = use_shadow
+    for cycle in range(CYCLES):
+        for field in range(FIELDS):
+            nextion.set_text(f"t{field}", f"Field {field} value {cycle if field == 0 else 0}")
+            nextion.set_attr(f"t{field}", "pco", "65535")
+    seconds = nextion.port.bytes_written * BITS_PER_BYTE / BAUD / CYCLES
+    print(f"{name:10} {seconds * 1000:8.1f} ms per refresh  {nextion.shadow_statistics()}")
+
+
+def main():
+    measure("unshadowed", False)
+    measure("shadowed", True)
+
+
+if __name__ == '__main__':
+    main()
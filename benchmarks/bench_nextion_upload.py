@@ -0,0 +1,75 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Effective upload speed of nextion_util.upload_image sending pytest/LCD.tft to a fake display on a pseudo terminal pair,
+compared with the previous uploader sleeping 0.5 s per block (measured on the first 8 blocks).
+Usage: python3 -m benchmarks.bench_nextion_upload
+"""
+import os
+import tempfile
+import time
+
+import serial
+
+from andinopy import nextion_util
+from pytest.devices.fake_devices import fake_nextion_upload
+
+TFT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pytest", "LCD.tft")
+LEGACY_BLOCKS = 8
+
+
+def legacy_upload_image(dev_port, filename, filesize):
+    with open(filename, 'rb') as image:
+        data_count = 0
+        while 1:
+            data = image.read(4096)
+            if len(data) < 1:
+                break
+            data_count += len(data)
+            dev_port.timeout = 5
+            dev_port.write(data)
+            time.sleep(.5)
+            r = dev_port.read(1)
+            if 0x05 not in r:
+                return False
+    return True
+
+
+def measure(name: str, filename: str, protocol: str, upload):
+    fake = fake_nextion_upload()
+    port = serial.Serial(fake.port, 9600, timeout=None)
+    size = os.path.getsize(filename)
+    try:
+        nextion_util.get_baud_rate(port, cache_file=None)
+        nextion_util.force_max_baud(port, size, protocol=protocol, cache_file=None)
+        start = time.perf_counter()
+        assert upload(port, filename, size)
+        seconds = time.perf_counter() - start
+        print(f"{name:8} {size:8} bytes in {seconds:7.2f} s  {size / seconds:12.0f} bytes/s")
+    finally:
+        port.close()
+        fake.stop()
+
+
+def main():
+    with open(TFT_FILE, "rb") as f:
+        head = f.read(LEGACY_BLOCKS * 4096)
+    with tempfile.NamedTemporaryFile(suffix=".tft", delete=False) as f:
+        f.write(head)
+    try:
+        measure("legacy", f.name, nextion_util.PROTOCOL_V1_0, legacy_upload_image)
+    finally:
+        os.remove(f.name)
+    for protocol in nextion_util.PROTOCOLS:
+        measure(f"v{protocol}", TFT_FILE, protocol,
+                lambda port, filename, size: nextion_util.upload_image(port, filename, size, protocol=protocol,
+                                                                      diagnostics=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+1000 set_text calls on 20 fields against a fake Nextion display on a pseudo terminal pair:
+time spent in the calling thread, time until the display received the last update and commands on the wire,
+for the previous direct write per call and the writer thread with and without bkcmd=3 acknowledgements.
+Usage: python3 -m benchmarks.bench_nextion_writer
+"""
+import time
+
+from andinopy.base_devices.nextion_display import display
+from pytest.devices.fake_devices import fake_nextion
+
+CALLS = 1000
+FIELDS = 20
+
+
+def legacy_set_text(nextion: display, obj: str, text: str):
+    nextion.port.write(f"{obj}.txt=\"{text}\"".encode(nextion.encoding) + nextion._stop_bits)
+
+
+def measure(name: str, set_text, ack: bool = False):
+    fake = fake_nextion()
+    nextion = display(serial_port=fake.port)
+    nextion.use_shadow = False
+    nextion.start()
+    try:
+        if ack:
+            nextion.set_debug_level(3)
+        last = f't{(CALLS - 1) % FIELDS}.txt="{CALLS - 1}"'
+        start = time.perf_counter()
+        for i in range(CALLS):
+            set_text(nextion, f"t{i % FIELDS}", str(i))
+        caller = time.perf_counter() - start
+        while last not in fake.commands:
+            time.sleep(0.0005)
+        total = time.perf_counter() - start
+        sent = len([c for c in fake.commands if c.startswith("t")])
+        print(f"{name:10} caller {caller * 1000:8.2f} ms  delivered {total * 1000:8.2f} ms  "
+              f"{CALLS / total:10.0f} updates/s  {sent:5} commands on the wire")
+    finally:
+        nextion.stop()
+        fake.stop()
+
+
+def main():
+    measure("legacy", legacy_set_text)
+    measure("writer", display.set_text)
+    measure("writer ack", display.set_text, ack=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+I2C bytes per frame for a two line display counting up in its second line, sending the whole buffer like
+adafruit_ssd1306 show() against the dirty page windows of ssd1306_framebuffer.
+Usage: python3 -m benchmarks.bench_oled_partial
+"""
+import time
+
+from andinopy.base_devices.ssd1306_framebuffer import ssd1306_framebuffer, image_to_pages
+from pytest.devices.fake_devices import fake_ssd1306
+from pytest.devices.test_ssd1306_framebuffer import counter_image, FULL_FRAME_BYTES
+
+FRAMES = 200
+
+
+def main():
+    images = [counter_image(value) for value in range(FRAMES)]
+    print(f"full     {FULL_FRAME_BYTES:7.1f} bytes per frame")
+
+    display = fake_ssd1306()
+    framebuffer = ssd1306_framebuffer(display.write)
+    framebuffer.set_cleared()
+    framebuffer.show(images[0])
+    sent = []
+    framebuffer.on_bytes_sent = sent.append
+    start = time.perf_counter()
+    for image in images[1:]:
+        framebuffer.show(image)
+    elapsed = time.perf_counter() - start
+    assert bytes(display.memory) == image_to_pages(images[-1])
+    average = sum(sent) / len(sent)
+    print(f"partial  {average:7.1f} bytes per frame  {100 - average * 100 / FULL_FRAME_BYTES:4.1f}% less  "
+          f"{elapsed / len(sent) * 1000:.3f} ms to diff and send")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Time an OLED command blocks the tcp handler and frames sent over I2C for a client updating the display
+20 times per second, rendering in the handler (previous display_text with its extra clear) against the render thread.
+The I2C push of a 1 KiB frame at 400 kHz is simulated with a sleep.
+Usage: python3 -m benchmarks.bench_oled_renderer
+"""
+import time
+
+from andinopy.base_devices.oled_renderer import oled_renderer
+
+UPDATES = 40
+INTERVAL = 0.05
+PUSH_TIME = 1024 * 9 / 400000
+
+
+class fake_oled:
+    def __init__(self):
+        self.text = 0
+        self.pushed = 0
+
+    def render(self):
+        return self.text
+
+    def push(self, frame):
+        time.sleep(PUSH_TIME)
+        self.pushed += 1
+
+
+def legacy(oled: fake_oled):
+    # fill(0) and show() before the frame
+    oled.push(None)
+    oled.push(oled.render())
+
+
+def main():
+    oled = fake_oled()
+    blocked = 0.0
+    for i in range(UPDATES):
+        start = time.perf_counter()
+        oled.text = i % 4
+        legacy(oled)
+        blocked += time.perf_counter() - start
+        time.sleep(INTERVAL)
+    print(f"handler  {blocked / UPDATES * 1000:7.3f} ms per command  {oled.pushed:3} frames pushed")
+
+    oled = fake_oled()
+    renderer = oled_renderer(oled.render, oled.push, max_fps=10)
+    renderer.start()
+    blocked = 0.0
+    for i in range(UPDATES):
+        start = time.perf_counter()
+        oled.text = i % 4
+        renderer.request()
+        blocked += time.perf_counter() - start
+        time.sleep(INTERVAL)
+    renderer.flush()
+    renderer.stop()
+    print(f"thread   {blocked / UPDATES * 1000:7.3f} ms per command  {oled.pushed:3} frames pushed")
+
+
+if __name__ == '__main__':
+    main()
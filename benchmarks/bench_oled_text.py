@@ -0,0 +1,43 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+OLED renders per second for every mode with static text, drawing every line with ImageDraw.text like
+andino_io_oled did before against the line bitmap cache. Uses the FreeType font built into Pillow.
+Usage: python3 -m benchmarks.bench_oled_text
+"""
+import time
+
+from andinopy.base_devices.oled_text import oled_text_renderer, OLED_MODES
+from pytest.devices.test_oled_text import load_font, draw_text
+
+DURATION = 0.3
+
+
+def renders_per_second(render) -> float:
+    count = 0
+    start = time.perf_counter()
+    end = start + DURATION
+    while time.perf_counter() < end:
+        render()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    renderer = oled_text_renderer(128, 64, load_font)
+    print("mode   draw.text      cached")
+    for mode, (rows, _) in OLED_MODES.items():
+        text = [[f"Line {i}" for i in range(len(rows))]]
+        config = (mode, None)
+        legacy = renders_per_second(lambda: draw_text(renderer, config, text, True))
+        cached = renders_per_second(lambda: renderer.render(config, text, True))
+        print(f"{mode:>4} {legacy:9.0f}/s {cached:9.0f}/s  x{cached / legacy:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Characters per second through the keypad/RFID decoder for a stream of key presses and rfid tags,
+the previous per character decoder against the dispatch table per character and per received chunk.
+Usage: python3 -m benchmarks.bench_rfid_decoder
+"""
+import time
+
+from andinopy.interfaces.rfid_keyboard_interface import rfid_keyboard_interface
+
+STREAM = ("12a+:0415263748:o" + "9x<-" + ":AB12CD34EF:" + "b5c6d7ef") * 2000
+CHUNK = 16
+
+
+class decoder(rfid_keyboard_interface):
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def buzz_display(self, duration_ms: int):
+        pass
+
+    def _send_to_controller(self, value: str):
+        pass
+
+
+def legacy_on_char_received(self, char_received: str):
+    if char_received != ' ' and char_received != '':
+        if char_received == ':':
+            if self._rfid_mode:
+                self._rfid_mode = False
+                if self.on_rfid_string is not None:
+                    self.on_rfid_string(self._rfid_buffer)
+                self._rfid_buffer = ""
+
+            else:
+                self._rfid_mode = True
+        elif self._rfid_mode:
+            self._rfid_buffer += char_received
+        elif 'a' <= char_received <= 'f':
+            if self.on_function_button is not None:
+                self.on_function_button("F" + str(ord(char_received) - 96))
+        elif '0' <= char_received <= '9':
+            if self.on_keyboard_button is not None:
+                self.on_keyboard_button(char_received)
+        else:
+            function_match = {
+                '+': "UP",
+                '-': "DOWN",
+                'o': "OK",
+                'x': "ESC",
+                '<': "DEL",
+            }
+            self.on_function_button(function_match[char_received])
+
+
+def new_decoder(events: list) -> decoder:
+    instance = decoder()
+    instance.on_rfid_string = events.append
+    instance.on_keyboard_button = events.append
+    instance.on_function_button = events.append
+    return instance
+
+
+def measure(name: str, run) -> list:
+    events = []
+    instance = new_decoder(events)
+    start = time.perf_counter()
+    run(instance)
+    duration = time.perf_counter() - start
+    print(f"{name:10} {len(STREAM) / duration:12.0f} chars/s")
+    return events
+
+
+def main():
+    def legacy(instance):
+        instance._rfid_buffer = ""
+        for char in STREAM:
+            legacy_on_char_received(instance, char)
+
+    def per_char(instance):
+        for char in STREAM:
+            instance._on_char_received(char)
+
+    def chunked(instance):
+        for i in range(0, len(STREAM), CHUNK):
+            instance._on_chars_received(STREAM[i:i + CHUNK])
+
+    expected = measure("legacy", legacy)
+    assert measure("per char", per_char) == expected
+    assert measure("chunked", chunked) == expected
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+RFID tags per second through rfid_keyboard_i2c with a fake smbus and mocked interrupt pin,
+each tag is fed when the previous one was received. Compared with the previous read of one byte per held interrupt.
+Usage: python3 -m benchmarks.bench_rfid_i2c
+"""
+import threading
+import time
+
+import gpiozero
+from gpiozero import Button
+from gpiozero.pins.mock import MockFactory
+
+from andinopy.base_devices.rfid_keyboard.rfid_keyboard_i2c import rfid_keyboard_i2c
+from pytest.devices.fake_devices import fake_smbus
+
+DURATION = 2.0
+TAG = ":1234567890:"
+
+
+class legacy_rfid_keyboard_i2c(rfid_keyboard_i2c):
+    """
+    One byte per callback of an interrupt held for 10 ms and a ping read every 5 s
+    """
+
+    def start(self):
+        self._i2c.open(self._bus_number)
+        self._interrupt = Button(self._interruptPin, hold_time=0.01, hold_repeat=True, pull_up=False)
+
+        def _ping_read(handle):
+            while handle.running:
+                if not handle.interrupted:
+                    handle.read_i2c()
+                    handle._stop_event.wait(5)
+
+        self._thread = threading.Thread(target=_ping_read, args=[self])
+        self._thread.start()
+        self._interrupt.when_held = self.read_i2c
+
+    def read_i2c(self):
+        self.interrupted = True
+        try:
+            char_received = chr(self._i2c.read_byte(self._slaveAddress))
+            self._on_char_received(char_received)
+        except IOError:
+            pass
+        self.interrupted = False
+
+
+def measure(name: str, device_class):
+    gpiozero.Device.pin_factory = MockFactory()
+    bus = fake_smbus(gpiozero.Device.pin_factory.pin(23))
+    received = threading.Event()
+    tags = [0]
+
+    def on_rfid(tag):
+        tags[0] += 1
+        received.set()
+
+    device = device_class(on_rfid=on_rfid, i2c_bus=bus)
+    device.start()
+    time.sleep(0.05)
+    transactions = bus.transactions
+    try:
+        end = time.perf_counter() + DURATION
+        while time.perf_counter() < end:
+            received.clear()
+            bus.feed(TAG)
+            received.wait(2)
+    finally:
+        device.stop()
+    print(f"{name:8} {tags[0] / DURATION:8.1f} tags/s  "
+          f"{(bus.transactions - transactions) / max(tags[0], 1):6.1f} I2C transactions per tag")
+
+
+def main():
+    measure("legacy", legacy_rfid_keyboard_i2c)
+    measure("block", rfid_keyboard_i2c)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Latency from a key press on the controller (interrupt pin raised on a mock pin) until on_keyboard_button,
+the callback andino_tcp sends its KEY event from, for the edge triggered reader and the previous held interrupt.
+Usage: python3 -m benchmarks.bench_rfid_latency
+"""
+import statistics
+import threading
+import time
+
+import gpiozero
+from gpiozero.pins.mock import MockFactory
+
+from andinopy.base_devices.rfid_keyboard.rfid_keyboard_i2c import rfid_keyboard_i2c
+from benchmarks.bench_rfid_i2c import legacy_rfid_keyboard_i2c
+from pytest.devices.fake_devices import fake_smbus
+
+PRESSES = 100
+
+
+def measure(name: str, device_class):
+    gpiozero.Device.pin_factory = MockFactory()
+    bus = fake_smbus(gpiozero.Device.pin_factory.pin(23))
+    received = threading.Event()
+    received_at = [0.0]
+
+    def on_keyboard(key):
+        received_at[0] = time.perf_counter()
+        received.set()
+
+    device = device_class(on_keyboard=on_keyboard, i2c_bus=bus)
+    device.start()
+    time.sleep(0.05)
+    latencies = []
+    try:
+        for i in range(PRESSES):
+            received.clear()
+            # the feeding thread may handle the edge itself, the press is timed before
+            start = time.perf_counter()
+            bus.feed(str(i % 10))
+            assert received.wait(2)
+            latencies.append((received_at[0] - start) * 1000)
+            time.sleep(0.002)
+    finally:
+        device.stop()
+    latencies.sort()
+    print(f"{name:8} median {statistics.median(latencies):7.3f} ms  p99 {latencies[int(len(latencies) * 0.99) - 1]:7.3f} ms")
+
+
+def main():
+    measure("legacy", legacy_rfid_keyboard_i2c)
+    measure("edge", rfid_keyboard_i2c)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Memory and CPU per connected client for the threaded and the selector tcp server.
+The clients run in a child process, so only the server side is measured.
+Usage: python3 -m benchmarks.bench_tcp_clients
+"""
+import multiprocessing
+import resource
+import socket
+import threading
+import time
+
+from andinopy.tcp import simpletcp
+
+CLIENT_COUNTS = (1, 10, 100, 500)
+ROUNDS = 20
+
+
+def _proc_status(key: str) -> int:
+    with open("/proc/self/status") as fp:
+        for line in fp:
+            if line.startswith(key):
+                return int(line.split()[1])
+    return 0
+
+
+def _cpu_time() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _clients(port: int, count: int, ready, go, done):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * count + 64)), hard))
+    sockets = [socket.create_connection(("localhost", port)) for _ in range(count)]
+    ready.set()
+    go.wait()
+    for _ in range(ROUNDS):
+        for sock in sockets:
+            sock.sendall(b"PING\n")
+        for sock in sockets:
+            while not sock.recv(64).endswith(b"\n"):
+                pass
+    done.set()
+    go.wait()
+    for sock in sockets:
+        sock.close()
+
+
+def run(server_class, port: int, count: int):
+    server = server_class(port=port, on_message=lambda message, handle: handle.send_line(message))
+    server.start()
+    time.sleep(0.2)
+    rss_before = _proc_status("VmRSS")
+    size_before = _proc_status("VmSize")
+    threads_before = threading.active_count()
+
+    ready, go, done = multiprocessing.Event(), multiprocessing.Event(), multiprocessing.Event()
+    process = multiprocessing.Process(target=_clients, args=(port, count, ready, go, done))
+    process.start()
+    ready.wait()
+    while len(server.clients) < count:
+        time.sleep(0.01)
+    cpu_start = _cpu_time()
+    start = time.perf_counter()
+    go.set()
+    done.wait()
+    elapsed = time.perf_counter() - start
+    cpu = _cpu_time() - cpu_start
+
+    rss = _proc_status("VmRSS") - rss_before
+    size = _proc_status("VmSize") - size_before
+    threads = threading.active_count() - threads_before
+    process.join()
+    server.stop()
+    print(f"{server_class.__name__:20} clients={count:4}"
+          f" rss/client={rss / count:8.1f}KiB vsize/client={size / count:8.1f}KiB threads={threads:4}"
+          f" cpu/client/request={cpu / (count * ROUNDS) * 1e6:7.1f}us"
+          f" requests/s={count * ROUNDS / elapsed:9.0f}")
+
+
+if __name__ == "__main__":
+    soft_limit, hard_limit = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard_limit, 4096), hard_limit))
+    port_number = 9500
+    for tcp_server_class in (simpletcp.tcp_server, simpletcp.tcp_selector_server):
+        for client_count in CLIENT_COUNTS:
+            run(tcp_server_class, port_number, client_count)
+            port_number += 1
@@ -0,0 +1,115 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Commands per second through andino_tcp._i_handle_tcp_input with a stub hardware backend, for the
+registered hardware command handlers against the previous if/elif chain.
+Usage: python3 -m benchmarks.bench_tcp_dispatch
+"""
+import os
+import time
+from typing import List
+
+import gpiozero
+from gpiozero.pins.mock import MockFactory
+
+import andinopy
+from andinopy.tcp.andino_tcp import andino_tcp, log
+from pytest.andinotcp.test_tcp_dispatch import client_stub
+
+ROUNDS = 5000
+COMMANDS = ["REL1 1", "RPU8 500", "INFO", "POLL 10", "CNTR 1", "EDGE 1", "REL? 0", "REL5 0", "DEBO 3", "PING"]
+
+
+class fast_x1:
+    def __getattr__(self, name):
+        return lambda *arguments: name
+
+
+class legacy_andino_tcp(andino_tcp):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for verb in self.hardware_commands:
+            self.assign[verb] = self._i_handle_andino_hardware_message
+
+    def _i_handle_tcp_input(self, tcp_in: str, client_handle):
+        message = tcp_in.split(" ")
+        func = message[0].upper().rstrip()
+        log.debug(f"From {client_handle.address}: {tcp_in}")
+        args = message[1:]
+        if func == '':
+            self._reply(client_handle, '')
+            return
+        if func not in self.assign.keys():
+            log.error(f"Syntax Error in message: {tcp_in}")
+            return
+        try:
+            self.assign[func](func, args, client_handle)
+        except ValueError:
+            self._reply(client_handle, "ERROR")
+
+    def _i_handle_andino_hardware_message(self, func, arguments: List[str], client_handle):
+        try:
+            if func == "INFO":
+                self._reply(client_handle, self.x1_instance.info())
+                return
+            elif func == "HARD":
+                self._reply(client_handle, self.x1_instance.hardware(int(arguments[0])))
+            elif func == "POLL":
+                self._reply(client_handle, self.x1_instance.set_polling(int(arguments[0])))
+            elif func == "SKIP":
+                self._reply(client_handle, self.x1_instance.set_skip(int(arguments[0])))
+            elif func == "EDGE":
+                self._reply(client_handle, self.x1_instance.set_edge_detection(bool(int(arguments[0]))))
+            elif func == "SEND":
+                self._reply(client_handle, self.x1_instance.set_send_time(int(arguments[0])))
+            elif func == "CHNG":
+                self._reply(client_handle, self.x1_instance.set_broadcast_on_change(bool(int(arguments[0]))))
+            elif func == "CHNP":
+                self._reply(client_handle, self.x1_instance.set_change_pattern([int(i) for i in str(arguments[0])]))
+            elif func == "CNTR":
+                self._reply(client_handle, self.x1_instance.get_counters(int(arguments[0])))
+            elif func == "DEBO":
+                self._reply(client_handle, self.x1_instance.set_debounce(int(arguments[0])))
+            elif func == "POWR":
+                self._reply(client_handle, self.x1_instance.set_power(int(arguments[0])))
+            elif func == "REL?":
+                self._reply(client_handle, self.x1_instance.set_send_relays_status(bool(int(arguments[0]))))
+            elif func.startswith("REL"):
+                i = int(func[3:])
+                self._reply(client_handle, self.x1_instance.set_relay(i, int(arguments[0])))
+            elif func.startswith("RPU"):
+                i = func[3]
+                self._reply(client_handle, self.x1_instance.pulse_relay(int(i), int(arguments[0])))
+        except ValueError as ex:
+            log.error(f"VALUE ERROR in Hardware Message: {ex}")
+            self._reply(client_handle, "ERROR")
+
+
+def measure(name: str, server_class):
+    server = server_class("io", 0, reply_to_requester=True)
+    server.x1_instance = fast_x1()
+    client = client_stub()
+    handle = server._i_handle_tcp_input
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for command in COMMANDS:
+            handle(command, client)
+    elapsed = time.perf_counter() - start
+    assert len(client.answers) == ROUNDS * len(COMMANDS)
+    print(f"{name:9} {ROUNDS * len(COMMANDS) / elapsed:9.0f} commands/s")
+
+
+def main():
+    gpiozero.Device.pin_factory = MockFactory()
+    andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+    measure("if/elif", legacy_andino_tcp)
+    measure("registry", andino_tcp)
+
+
+if __name__ == '__main__':
+    main()
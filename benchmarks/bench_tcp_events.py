@@ -0,0 +1,112 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Outgoing events of 4 producer threads to 3 tcp clients, one of them never reading. Sending from the producer
+threads like andino_tcp did before against the event bus: time a producer spends per event, events received
+out of sequence order and the latency from production until a client read the event from its socket.
+Usage: python3 -m benchmarks.bench_tcp_events
+"""
+import socket
+import threading
+import time
+
+from andinopy.tcp import simpletcp
+from andinopy.tcp.event_bus import event_bus, latency_histogram
+
+PRODUCERS = 4
+EVENTS = 5000
+PORT = 9620
+
+
+class legacy_sender:
+    def __init__(self, server: simpletcp.tcp_server):
+        self.server = server
+        self._message_counter = 0
+
+    def publish(self, tag, message):
+        ctr = self._message_counter
+        self._message_counter = (self._message_counter + 1) % 0xFFFF
+        self.server.send_line_to_all(f":{f'{ctr:04x}'.upper()}{tag}{{{message}}}")
+
+
+def read_events(sock: socket.socket, count: int, histogram: latency_histogram, result: dict):
+    buffer = b""
+    received = 0
+    previous = -1
+    out_of_order = 0
+    while received < count:
+        data = sock.recv(65536)
+        if not data:
+            break
+        now = time.perf_counter()
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            sequence = int(line[1:5], 16)
+            if sequence < previous:
+                out_of_order += 1
+            previous = sequence
+            histogram.record(now - float(line[line.index(b"{") + 1:-1]))
+            received += 1
+    result["out_of_order"] = out_of_order
+
+
+def run(name: str, port: int, make_sender):
+    server = simpletcp.tcp_server(port=port, on_message=lambda message, handle: None, queue_size=100000)
+    server.start()
+    time.sleep(0.2)
+    readers = [socket.create_connection(("localhost", port)) for _ in range(2)]
+    silent = socket.create_connection(("localhost", port))
+    while len(server.clients) < 3:
+        time.sleep(0.01)
+    sender, stop = make_sender(server)
+    histogram = latency_histogram()
+    results = [{} for _ in readers]
+    threads = [threading.Thread(target=read_events, args=(sock, PRODUCERS * EVENTS, histogram, result))
+               for sock, result in zip(readers, results)]
+    for thread in threads:
+        thread.start()
+    producer_time = [0.0] * PRODUCERS
+
+    def produce(index: int):
+        for _ in range(EVENTS):
+            start = time.perf_counter()
+            sender.publish("@N", repr(start))
+            producer_time[index] += time.perf_counter() - start
+            # events of gpio callbacks come one by one
+            time.sleep(0.0001)
+
+    producers = [threading.Thread(target=produce, args=(i,)) for i in range(PRODUCERS)]
+    for thread in producers:
+        thread.start()
+    for thread in producers:
+        thread.join()
+    for thread in threads:
+        thread.join()
+    stop()
+    for sock in readers + [silent]:
+        sock.close()
+    server.stop()
+    print(f"{name}: {sum(producer_time) / (PRODUCERS * EVENTS) * 1e6:.1f}us per event in the producer, "
+          f"{sum(result['out_of_order'] for result in results)} received out of order")
+    print(histogram)
+
+
+def main():
+    run("producer threads", PORT, lambda server: (legacy_sender(server), lambda: None))
+
+    def bus(server):
+        events = event_bus(server.send_to_all, max_size=100000)
+        events.start()
+        return events, events.stop
+
+    run("event bus", PORT + 1, bus)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Throughput of the tcp line framing: 100k pipelined commands through a socketpair into
+andino_tcp._i_handle_tcp_input, and the framing alone compared to the previous string based framing.
+Usage: python3 -m benchmarks.bench_tcp_framing
+"""
+import os
+import socket
+import threading
+import time
+
+import gpiozero
+from gpiozero.pins.mock import MockFactory
+
+import andinopy
+from andinopy.tcp import simpletcp
+
+COMMANDS = 100000
+PAYLOAD = b"".join(f"{('PING', 'INFO', 'CNTR 0')[i % 3]}\r\n".encode() for i in range(COMMANDS))
+
+
+def legacy_framing(chunks, on_line):
+    buffer = ""
+    for data in chunks:
+        buffer += data.decode()
+        buffer = buffer.lstrip("\n")
+        buffer = buffer.replace("\r", "")
+        index = buffer.find("\n")
+        while index > 0:
+            word = buffer[:index]
+            buffer = buffer[index + 1:]
+            on_line(word)
+            index = buffer.find("\n")
+
+
+def framing_only(chunk_size: int):
+    chunks = [PAYLOAD[i:i + chunk_size] for i in range(0, len(PAYLOAD), chunk_size)]
+    lines = []
+    start = time.perf_counter()
+    legacy_framing(chunks, lines.append)
+    legacy = time.perf_counter() - start
+    assert len(lines) == COMMANDS
+
+    lines = []
+    framer = simpletcp.line_framer("utf-8", lines.append, print)
+    start = time.perf_counter()
+    for chunk in chunks:
+        framer.feed(chunk)
+    framed = time.perf_counter() - start
+    assert len(lines) == COMMANDS
+    print(f"framing only, {chunk_size:6} byte chunks: string {COMMANDS / legacy:10.0f} lines/s,"
+          f" line_framer {COMMANDS / framed:10.0f} lines/s")
+
+
+def socketpair_to_andino_tcp():
+    from andinopy.tcp.andino_tcp import andino_tcp
+    server = andino_tcp(hardware="io", port=0)
+    handled = 0
+    done = threading.Event()
+
+    def on_message(message: str, handle):
+        nonlocal handled
+        server._i_handle_tcp_input(message, handle)
+        handled += 1
+        if handled == COMMANDS:
+            done.set()
+
+    server_side, client_side = socket.socketpair()
+    start = time.perf_counter()
+    simpletcp.tcp_server.client_handle(("socketpair", 0), server_side, server.tcpserver, on_message)
+    client_side.sendall(PAYLOAD)
+    done.wait()
+    elapsed = time.perf_counter() - start
+    client_side.close()
+    print(f"socketpair -> andino_tcp._i_handle_tcp_input: {COMMANDS} commands in {elapsed:.3f}s,"
+          f" {COMMANDS / elapsed:.0f} commands/s")
+
+
+if __name__ == "__main__":
+    gpiozero.Device.pin_factory = MockFactory()
+    andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+    for size in (64, 1024, 65536):
+        framing_only(size)
+    socketpair_to_andino_tcp()
@@ -0,0 +1,44 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+End to end time for applying a 16 command x1 configuration against a fake x1 on a pseudo terminal pair:
+one command at a time with the previous 10 ms polling, one command at a time with send_with_confirm
+and pipelined with send_many.
+Usage: python3 -m benchmarks.bench_x1_batch
+"""
+import time
+
+from andinopy.base_devices.andinox1 import andino_x1
+from benchmarks.bench_x1_confirm import legacy_send_with_confirm
+from pytest.devices.fake_devices import fake_x1
+
+CONFIGURATION = ["POLL 10", "SKIP 0", "DEBO 3", "SEND 1000", "CHNG 1", "EDGE 0", "REL? 1", "CNTR 1"] \
+                + [f"REL{i} 0" for i in range(1, 9)]
+ROUNDS = 20
+
+
+def measure(name: str, apply):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        assert apply(CONFIGURATION) == CONFIGURATION
+    print(f"{name:35} {(time.perf_counter() - start) / ROUNDS * 1000:8.2f}ms per configuration")
+
+
+if __name__ == "__main__":
+    for delay in (0, 0.002):
+        fake = fake_x1(delay=delay)
+        x1 = andino_x1(lambda x: None, port=fake.port)
+        x1.start()
+        try:
+            print(f"x1 processing time {delay * 1000}ms per command")
+            measure("sequential, 10ms polling", lambda commands: [legacy_send_with_confirm(x1, i) for i in commands])
+            measure("sequential, send_with_confirm", lambda commands: [x1.send_with_confirm(i) for i in commands])
+            measure("pipelined, send_many", x1.send_many)
+        finally:
+            x1.stop()
+            fake.stop()
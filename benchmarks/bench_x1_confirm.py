@@ -0,0 +1,54 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Round trip latency of andino_x1.send_with_confirm against a fake x1 on a pseudo terminal pair,
+compared with the previous 10 ms polling of the received list.
+Usage: python3 -m benchmarks.bench_x1_confirm
+"""
+import statistics
+import time
+
+from andinopy.base_devices.andinox1 import andino_x1
+from pytest.devices.fake_devices import fake_x1
+
+ROUNDS = 200
+
+
+def legacy_send_with_confirm(x1: andino_x1, message: str) -> str:
+    check_interval = 0.01
+    x1._send_to_x1(message)
+    for i in range(int(x1.timeout / check_interval)):
+        for recv in x1.received:
+            if message == recv:
+                x1.received.remove(recv)
+                return recv
+        time.sleep(check_interval)
+    return "ERROR"
+
+
+def measure(name: str, send):
+    latencies = []
+    for i in range(ROUNDS):
+        start = time.perf_counter()
+        assert send(f"POLL {i}") == f"POLL {i}"
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    print(f"{name:20} median={statistics.median(latencies):7.3f}ms"
+          f" p99={latencies[int(len(latencies) * 0.99) - 1]:7.3f}ms max={latencies[-1]:7.3f}ms")
+
+
+if __name__ == "__main__":
+    fake = fake_x1()
+    x1 = andino_x1(lambda x: None, port=fake.port)
+    x1.start()
+    try:
+        measure("10ms polling", lambda message: legacy_send_with_confirm(x1, message))
+        measure("send_with_confirm", x1.send_with_confirm)
+    finally:
+        x1.stop()
+        fake.stop()
@@ -0,0 +1,85 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Broadcasts per second of x1_emulator.generate_broadcast_string with 8 mocked inputs toggling at 100 Hz,
+compared with rebuilding the whole string from the hardware on every call.
+Usage: python3 -m benchmarks.bench_x1_emulator_broadcast
+"""
+import os
+import threading
+import time
+
+import gpiozero
+from gpiozero.pins.mock import MockFactory
+
+import andinopy
+from andinopy import base_config
+from andinopy.tcp.io_x1_emulator import x1_emulator
+
+INPUT_PINS = [13, 19, 16, 26, 20, 21, 17, 27]
+TOGGLE_HZ = 100
+DURATION = 2.0
+
+
+def legacy_generate_broadcast_string(emulator: x1_emulator) -> str:
+    io = emulator.io
+    status = f"{{{','.join([format(i, 'x') for i in emulator._hex_counter])}}}" \
+             f"{{{','.join([str(int(i)) for i in io.get_input_statuses()])}}}"
+    if emulator.send_rel:
+        status += f"{{{','.join([str(i.value) for i in io.outRel])}}}"
+    return status
+
+
+def toggle(running: threading.Event):
+    pins = [gpiozero.Device.pin_factory.pin(p) for p in INPUT_PINS]
+    state = False
+    while not running.is_set():
+        for pin in pins:
+            pin.drive_low() if state else pin.drive_high()
+        state = not state
+        time.sleep(1 / TOGGLE_HZ)
+
+
+def measure(name: str, emulator: x1_emulator, generate):
+    stop = threading.Event()
+    toggler = threading.Thread(target=toggle, args=[stop])
+    toggler.start()
+    count = 0
+    end = time.perf_counter() + DURATION
+    while time.perf_counter() < end:
+        generate(emulator)
+        count += 1
+    stop.set()
+    toggler.join()
+    print(f"{name:8} {count / DURATION:12.0f} broadcasts/s")
+
+
+def main():
+    gpiozero.Device.pin_factory = MockFactory()
+    andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+    io_config = base_config["andino_io"]
+    io_config["input_pins"] = ",".join(str(i) for i in INPUT_PINS)
+    for key in ["input_pull_up", "inputs_polling_time", "inputs_debounce_time"]:
+        values = io_config[key].split(",")
+        io_config[key] = ",".join(values + [values[0]] * (len(INPUT_PINS) - len(values)))
+    base_config["io_x1_emulator"]["change_pattern"] = ",".join("0" for _ in INPUT_PINS)
+
+    emulator = x1_emulator(lambda x: None)
+    emulator._send_counter = True
+    emulator._send_rel = True
+    emulator.io.start()
+    emulator._rebuild_fragments()
+    try:
+        measure("legacy", emulator, legacy_generate_broadcast_string)
+        measure("cached", emulator, x1_emulator.generate_broadcast_string)
+    finally:
+        emulator.io.stop()
+
+
+if __name__ == '__main__':
+    main()
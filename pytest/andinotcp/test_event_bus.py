@@ -0,0 +1,107 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import threading
+import time
+from unittest import TestCase
+
+from andinopy.tcp.event_bus import event_bus, latency_histogram
+
+
+class test_event_bus(TestCase):
+    def setUp(self):
+        self.lines = []
+        self.sends = 0
+        self.send_delay = 0
+        self.bus = event_bus(self.send)
+
+    def tearDown(self):
+        self.bus.stop()
+
+    def send(self, text: str):
+        time.sleep(self.send_delay)
+        self.sends += 1
+        self.lines.extend(text.splitlines())
+
+    def test_format(self):
+        self.bus.start()
+        self.bus.publish("@R", "1234")
+        self.bus.publish(None, "@{0,0}")
+        self.bus.publish("@D", b"\x65")
+        self.assertTrue(self.bus.flush(1))
+        self.assertEqual([":0000@R{1234}", ":0001@{0,0}", ":0002@D{b'e'}"], self.lines)
+
+    def test_order(self):
+        self.bus = event_bus(self.send, max_size=16000)
+        self.bus.start()
+        threads = [threading.Thread(target=lambda p=p: [self.bus.publish("@N", f"{p}.{i}") for i in range(2000)])
+                   for p in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(self.bus.flush(5))
+        self.assertEqual([f"{i:04X}" for i in range(16000)], [line[1:5] for line in self.lines])
+        # events of every producer keep their order
+        for p in range(8):
+            produced = [line for line in self.lines if line.startswith(f"@N{{{p}.", 5)]
+            self.assertEqual([f"@N{{{p}.{i}}}" for i in range(2000)], [line[5:] for line in produced])
+        self.assertEqual(16000, self.bus.dispatched)
+        self.assertEqual(16000, self.bus.latency.count)
+
+    def test_slow_clients_do_not_block(self):
+        self.send_delay = 0.05
+        self.bus.start()
+        start = time.perf_counter()
+        for i in range(500):
+            self.bus.publish(None, str(i))
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertTrue(self.bus.flush(5))
+        self.assertEqual([str(i) for i in range(500)], [line[5:] for line in self.lines])
+        # waiting events go out together
+        self.assertLess(self.sends, 10)
+
+    def test_overflow_drops_oldest(self):
+        bus = event_bus(self.send, max_size=10)
+        with self.assertLogs("andinopy", "INFO") as logs:
+            for i in range(15):
+                bus.publish(None, str(i))
+        # logged once, not for every dropped event
+        self.assertEqual(1, len(logs.output))
+        self.assertEqual(5, bus.dropped)
+        with self.assertLogs("andinopy", "INFO") as logs:
+            bus.start()
+            self.assertTrue(bus.flush(1))
+            bus.stop()
+        self.assertIn("5 events dropped", logs.output[-1])
+        self.assertEqual([str(i) for i in range(5, 15)], [line[5:] for line in self.lines])
+
+    def test_stop_sends_queued(self):
+        for i in range(3):
+            self.bus.publish(None, str(i))
+        self.bus.start()
+        self.bus.stop()
+        self.assertEqual(3, len(self.lines))
+
+
+class test_latency_histogram(TestCase):
+    def test_percentiles(self):
+        histogram = latency_histogram()
+        self.assertIsNone(histogram.percentile(50))
+        for _ in range(90):
+            histogram.record(0.00002)
+        for _ in range(10):
+            histogram.record(0.003)
+        self.assertEqual(25e-6, histogram.percentile(50))
+        self.assertEqual(25e-6, histogram.percentile(90))
+        self.assertEqual(5000e-6, histogram.percentile(99))
+        self.assertEqual(0.003, histogram.maximum)
+        histogram.record(10)
+        self.assertEqual(float("inf"), histogram.percentile(100))
+        self.assertIn(">250000us", str(histogram))
+        histogram.reset()
+        self.assertEqual(0, histogram.count)
@@ -0,0 +1,70 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import os
+import time
+from unittest import TestCase
+
+import gpiozero
+from gpiozero.pins.mock import MockFactory
+
+import andinopy
+from andinopy.tcp.io_x1_emulator import x1_emulator
+
+
+class test_x1_emulator_broadcast(TestCase):
+    def setUp(self):
+        gpiozero.Device.pin_factory = MockFactory()
+        andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+        self.emulator = x1_emulator(lambda x: None)
+        self.emulator._send_counter = True
+        self.emulator._send_rel = True
+        self.emulator.io.start()
+        self.emulator._rebuild_fragments()
+
+    def tearDown(self):
+        self.emulator.io.stop()
+
+    def expected(self) -> str:
+        # the broadcast as it was built before the fragments were cached
+        io = self.emulator.io
+        return f"{{{','.join([format(i, 'x') for i in self.emulator._hex_counter])}}}" \
+               f"{{{','.join([str(int(i)) for i in io.get_input_statuses()])}}}" \
+               f"{{{','.join([str(i.value) for i in io.outRel])}}}"
+
+    def test_initial(self):
+        self.assertEqual("{0,0,0,0,0,0}{0,0,0,0,0,0}{0,0,0}", self.emulator.generate_broadcast_string())
+
+    def test_counter(self):
+        for _ in range(300):
+            self.emulator._on_input_hex(2)
+        self.emulator._on_input_hex(5)
+        self.assertEqual(self.expected(), self.emulator.generate_broadcast_string())
+        self.assertTrue(self.emulator.generate_broadcast_string().startswith("{0,0,12c,0,0,1}"))
+        self.emulator.reset()
+        self.assertEqual(self.expected(), self.emulator.generate_broadcast_string())
+
+    def test_inputs(self):
+        for pin in self.emulator.io.input_pins[::2]:
+            gpiozero.Device.pin_factory.pin(pin).drive_low()
+        self.assertEqual(self.expected(), self.emulator.generate_broadcast_string())
+        self.assertIn("{1,0,1,0,1,0}", self.emulator.generate_broadcast_string())
+        for pin in self.emulator.io.input_pins:
+            gpiozero.Device.pin_factory.pin(pin).drive_high()
+        time.sleep(0.05)
+        self.assertEqual(self.expected(), self.emulator.generate_broadcast_string())
+        self.assertIn("{0,0,0,0,0,0}{0,0,0}", self.emulator.generate_broadcast_string())
+
+    def test_relays(self):
+        self.emulator.set_relay(2, 1)
+        self.assertTrue(self.emulator.generate_broadcast_string().endswith("{0,1,0}"))
+        self.emulator.pulse_relay(3, 100)
+        time.sleep(0.05)
+        self.assertTrue(self.emulator.generate_broadcast_string().endswith("{0,1,1}"))
+        time.sleep(0.2)
+        self.assertTrue(self.emulator.generate_broadcast_string().endswith("{0,1,0}"))
+        self.assertEqual(self.emulator.get_counters(2), self.emulator.generate_broadcast_string())
@@ -0,0 +1,70 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import os
+import sys
+import threading
+from unittest import TestCase
+
+import gpiozero
+from gpiozero.pins.mock import MockFactory
+
+import andinopy
+from andinopy.tcp.andino_tcp import andino_tcp
+from andinopy.tcp.sequencer import message_sequencer, SEQUENCE_MODULUS
+
+THREADS = 16
+PER_THREAD = 4000
+
+
+class test_sequencer(TestCase):
+    def setUp(self):
+        # switch threads as often as possible to provoke races
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_format_and_wrap(self):
+        sequencer = message_sequencer()
+        self.assertEqual(["0000", "0001", "0002"], [sequencer.next() for _ in range(3)])
+        for _ in range(SEQUENCE_MODULUS - 4):
+            sequencer.next()
+        self.assertEqual(["FFFE", "0000"], [sequencer.next() for _ in range(2)])
+        sequencer.reset()
+        self.assertEqual("0000", sequencer.next())
+
+    def test_producer_threads(self):
+        gpiozero.Device.pin_factory = MockFactory()
+        andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+        # the producers outpace the dispatcher, nothing may be dropped here
+        section = andinopy.base_config["andino_tcp"]
+        self.addCleanup(section.__setitem__, "event_queue_size", section["event_queue_size"])
+        section["event_queue_size"] = str(THREADS * PER_THREAD)
+        server = andino_tcp("io", 0)
+        sent = []
+        server.tcpserver.send_to_all = lambda text: sent.extend(text.splitlines())
+        server.event_bus.start()
+        producers = [server._o_broadcast, server._o_on_rfid, server._o_on_function_button,
+                     server._o_on_number_button]
+        start = threading.Barrier(THREADS)
+
+        def produce(send):
+            start.wait()
+            for _ in range(PER_THREAD):
+                send("event")
+
+        threads = [threading.Thread(target=produce, args=(producers[i % len(producers)],)) for i in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        server.event_bus.stop()
+        numbers = [int(line[1:5], 16) for line in sent]
+        # every number once, no gaps, sent in order
+        self.assertEqual(list(range(THREADS * PER_THREAD)), numbers)
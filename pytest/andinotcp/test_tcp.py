@@ -9,6 +9,7 @@ import os
 import sys
 import time
 import socket
+import threading
 import unittest
 from typing import List
 
@@ -273,3 +274,344 @@ class test_andino_tcp(TestCase):
             andino_tcp.stop()
             client.stop()
         return output
+
+
+class test_tcp_selector_server(TestCase):
+    @staticmethod
+    def connect(port: int) -> TcpClient:
+        # the accept socket is bound from the loop thread
+        for _ in range(50):
+            client = TcpClient('localhost', port)
+            try:
+                client.connect()
+                return client
+            except ConnectionRefusedError:
+                client.stop()
+                time.sleep(0.02)
+        raise ConnectionRefusedError(port)
+
+    def test_receive(self):
+        port = 9989
+        received = []
+
+        def on_message(message: str, _):
+            received.append(message)
+
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port, on_message=on_message)
+        server.start()
+        client = self.connect(port)
+        try:
+            for i in range(10):
+                client.send(f"test {i}\r\n")
+            time.sleep(0.2)
+            self.assertEqual([f"test {i}" for i in range(10)], received)
+        finally:
+            client.stop()
+            server.stop()
+            self.assertEqual(server._running, False)
+
+    def test_answer(self):
+        port = 9988
+
+        def on_message(message: str, handle: andinopy.tcp.simpletcp.tcp_selector_server.client_handle):
+            handle.send_line(message)
+
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port, on_message=on_message)
+        server.start()
+        client = self.connect(port)
+        try:
+            for i in range(1000):
+                test_message = f"test {i}\n"
+                self.assertTrue(client.send_with_response(test_message, test_message))
+        finally:
+            client.stop()
+            server.stop()
+
+    def test_many_clients(self):
+        port = 9987
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port,
+                                                            on_message=lambda m, h: h.send_line(m.upper()))
+        server.start()
+        clients = [self.connect(port) for _ in range(20)]
+        try:
+            for i, client in enumerate(clients):
+                self.assertTrue(client.send_with_response(f"client {i}\n", f"CLIENT {i}\n"))
+            server.send_line_to_all("all")
+            for client in clients:
+                self.assertEqual("all\n", client.receive_message())
+        finally:
+            for client in clients:
+                client.stop()
+            server.stop()
+
+    def test_failing_client(self):
+        port = 9977
+
+        def on_message(message: str, handle: andinopy.tcp.simpletcp.tcp_selector_server.client_handle):
+            if message == "fail":
+                raise ValueError(message)
+            handle.send_line(message)
+
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port, on_message=on_message)
+        server.start()
+        failing = self.connect(port)
+        client = self.connect(port)
+        try:
+            failing.send("fail\n")
+            # only the failing client is removed, the loop keeps serving the others
+            self.assertEqual("", failing.receive_message())
+            self.assertTrue(client.send_with_response("test\n", "test\n"))
+            self.assertEqual(1, len(server.clients))
+        finally:
+            failing.stop()
+            client.stop()
+            server.stop()
+
+    def test_stop_from_message(self):
+        port = 9976
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port, on_message=lambda m, h: server.stop())
+        server.start()
+        client = self.connect(port)
+        try:
+            client.send("stop\n")
+            server._loop_thread.join(2)
+            self.assertFalse(server._loop_thread.is_alive())
+            self.assertEqual(-1, server._socket.fileno())
+        finally:
+            client.stop()
+
+    def test_select_error(self):
+        port = 9973
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port)
+        server.start()
+        self.connect(port).stop()
+
+        def select(_):
+            raise OSError("select failed")
+
+        try:
+            with self.assertLogs("andinopy", "ERROR"):
+                server._selector.select = select
+                server._wake()
+                server._loop_thread.join(2)
+            self.assertFalse(server._running)
+        finally:
+            server.stop()
+
+    def test_tcp_broadcast(self):
+        port = 9986
+        test_message = "broadcast"
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port,
+                                                            generate_broadcast=lambda x: test_message,
+                                                            broadcast_timer=50)
+        server.start()
+        client = self.connect(port)
+        try:
+            self.assertTrue(client.receive_message().startswith(test_message))
+        finally:
+            client.stop()
+            server.stop()
+
+
+class test_client_send_queue(TestCase):
+    def test_partial_send(self):
+        queue = andinopy.tcp.simpletcp.client_send_queue()
+        queue.put(b"hello")
+        queue.put(b"world")
+        self.assertEqual(b"hello", bytes(queue.get()))
+        queue.advance(2)
+        self.assertEqual(b"llo", bytes(queue.get()))
+        queue.advance(3)
+        self.assertEqual(b"world", bytes(queue.get()))
+        queue.advance(5)
+        self.assertIsNone(queue.get())
+
+    def test_shared_payload(self):
+        payload = b"status\n"
+        queues = [andinopy.tcp.simpletcp.client_send_queue() for _ in range(3)]
+        for queue in queues:
+            queue.put(payload)
+        for queue in queues:
+            self.assertIs(payload, queue.get().obj)
+
+    def test_drop_oldest(self):
+        queue = andinopy.tcp.simpletcp.client_send_queue(2, andinopy.tcp.simpletcp.OVERFLOW_DROP_OLDEST)
+        for i in range(4):
+            self.assertTrue(queue.put(str(i).encode()))
+        self.assertEqual(2, queue.dropped)
+        self.assertEqual(b"2", bytes(queue.get()))
+
+    def test_drop_oldest_keeps_partial_head(self):
+        queue = andinopy.tcp.simpletcp.client_send_queue(2, andinopy.tcp.simpletcp.OVERFLOW_DROP_OLDEST)
+        queue.put(b"abc")
+        queue.put(b"def")
+        queue.get()
+        queue.advance(1)
+        queue.put(b"ghi")
+        self.assertEqual(b"bc", bytes(queue.get()))
+        queue.advance(2)
+        self.assertEqual(b"ghi", bytes(queue.get()))
+
+    def test_coalesce(self):
+        queue = andinopy.tcp.simpletcp.client_send_queue(3, andinopy.tcp.simpletcp.OVERFLOW_COALESCE)
+        for i in range(4):
+            queue.put(str(i).encode())
+        self.assertEqual(1, len(queue))
+        self.assertEqual(b"3", bytes(queue.get()))
+
+    def test_disconnect(self):
+        queue = andinopy.tcp.simpletcp.client_send_queue(1, andinopy.tcp.simpletcp.OVERFLOW_DISCONNECT)
+        self.assertTrue(queue.put(b"0"))
+        self.assertFalse(queue.put(b"1"))
+
+    def test_invalid_policy(self):
+        with self.assertRaises(AttributeError):
+            andinopy.tcp.simpletcp.client_send_queue(1, "block")
+
+    def test_threaded_server_send(self):
+        port = 9985
+        server = andinopy.tcp.simpletcp.tcp_server(port=port, on_message=lambda m, h: h.send_line(m))
+        server.start()
+        client = test_tcp_selector_server.connect(port)
+        try:
+            for i in range(100):
+                self.assertTrue(client.send_with_response(f"test {i}\n", f"test {i}\n"))
+            server.send_line_to_all("all")
+            self.assertEqual("all\n", client.receive_message())
+        finally:
+            client.stop()
+            server.stop()
+
+    def test_threaded_server_one_thread_per_client(self):
+        port = 9975
+        server = andinopy.tcp.simpletcp.tcp_server(port=port, on_message=lambda m, h: h.send_line(m))
+        server.start()
+        threads = threading.active_count()
+        clients = [test_tcp_selector_server.connect(port) for _ in range(3)]
+        try:
+            while len(server.clients) < 3:
+                time.sleep(0.01)
+            # the receive threads, the output of all clients is written by the server's writer thread
+            self.assertEqual(threads + 3, threading.active_count())
+        finally:
+            for client in clients:
+                client.stop()
+            server.stop()
+
+    def test_threaded_server_slow_client(self):
+        port = 9974
+        server = andinopy.tcp.simpletcp.tcp_server(port=port, queue_size=4)
+        server.start()
+        slow_client = test_tcp_selector_server.connect(port)
+        client = test_tcp_selector_server.connect(port)
+        try:
+            while len(server.clients) < 2:
+                time.sleep(0.01)
+            payload = "x" * 65536
+            for _ in range(100):
+                server.send_line_to_all(payload)
+            server.send_line_to_all("all")
+            # the writer does not wait for the client which reads nothing
+            received = b""
+            client.socket.settimeout(2)
+            while not received.endswith(b"all\n"):
+                received += client.socket.recv(1 << 20)
+            self.assertTrue(received.endswith(b"x\nall\n"))
+        finally:
+            slow_client.stop()
+            client.stop()
+            server.stop()
+
+    def test_slow_client_disconnected(self):
+        port = 9984
+        server = andinopy.tcp.simpletcp.tcp_selector_server(port=port, queue_size=4,
+                                                            overflow_policy=andinopy.tcp.simpletcp.OVERFLOW_DISCONNECT)
+        server.start()
+        slow_client = test_tcp_selector_server.connect(port)
+        try:
+            while len(server.clients) < 1:
+                time.sleep(0.01)
+            payload = "x" * 65536
+            start = time.perf_counter()
+            for _ in range(100):
+                server.send_line_to_all(payload)
+            self.assertLess(time.perf_counter() - start, 1)
+            for _ in range(100):
+                if len(server.clients) == 0:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(0, len(server.clients))
+        finally:
+            slow_client.stop()
+            server.stop()
+
+
+class test_line_framer(TestCase):
+    def setUp(self):
+        self.lines = []
+        self.errors = []
+        self.framer = andinopy.tcp.simpletcp.line_framer("utf-8", self.lines.append, self.errors.append,
+                                                         max_line_length=16)
+
+    def test_split_chunks(self):
+        for chunk in [b"RE", b"L1 1\r", b"\nPING\n\n\r\nREL", b"2 0\n"]:
+            self.framer.feed(chunk)
+        self.assertEqual(["REL1 1", "PING", "REL2 0"], self.lines)
+        self.assertEqual([], self.errors)
+
+    def test_pipelined(self):
+        self.framer.feed(b"".join(f"CMD {i}\n".encode() for i in range(1000)))
+        self.assertEqual([f"CMD {i}" for i in range(1000)], self.lines)
+
+    def test_decode_error(self):
+        self.framer.feed(b"\xff\xfe\nPING\n")
+        self.assertEqual(["PING"], self.lines)
+        self.assertEqual(["ERROR can't decode Message"], self.errors)
+
+    def test_max_line_length(self):
+        self.framer.feed(b"x" * 10)
+        self.framer.feed(b"x" * 10)
+        self.framer.feed(b"x" * 10 + b"\nPING\n")
+        self.framer.feed(b"y" * 20 + b"\nPING\n")
+        self.assertEqual(["PING", "PING"], self.lines)
+        self.assertEqual(["ERROR line too long", "ERROR line too long"], self.errors)
+        self.assertEqual(2, self.framer.dropped_lines)
+
+
+class test_andino_tcp_reply(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        import gpiozero
+        from gpiozero.pins.mock import MockFactory
+        gpiozero.Device.pin_factory = MockFactory()
+        andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+
+    def run_ping(self, port: int, reply_to_requester: bool):
+        andino_tcp = andinopy.tcp.andino_tcp.andino_tcp("io", port, tcp_mode="selector",
+                                                        reply_to_requester=reply_to_requester)
+        andino_tcp.tcpserver.start()
+        # events are sent by the event dispatcher
+        andino_tcp.event_bus.start()
+        requester = test_tcp_selector_server.connect(port)
+        listener = test_tcp_selector_server.connect(port)
+        try:
+            while len(andino_tcp.tcpserver.clients) < 2:
+                time.sleep(0.01)
+            self.assertTrue(requester.send_with_response("PING\n", "PING\n"))
+            andino_tcp._o_broadcast("{0,0}")
+            listener.socket.settimeout(1)
+            received = ""
+            while not received.endswith("}\n"):
+                received += listener.receive_message()
+            return received
+        finally:
+            requester.stop()
+            listener.stop()
+            andino_tcp.event_bus.stop()
+            andino_tcp.tcpserver.stop()
+
+    def test_reply_to_all(self):
+        self.assertEqual("PING\n:0000{0,0}\n", self.run_ping(9979, False))
+
+    def test_reply_to_requester(self):
+        self.assertEqual(":0000{0,0}\n", self.run_ping(9978, True))
@@ -0,0 +1,81 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import os
+from unittest import TestCase
+
+import gpiozero
+from gpiozero.pins.mock import MockFactory
+
+import andinopy
+from andinopy.tcp.andino_tcp import andino_tcp
+
+
+class stub_x1:
+    """
+    Hardware backend answering every call with its name and arguments
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*arguments):
+            self.calls.append((name,) + arguments)
+            if arguments and arguments[-1] == -1:
+                raise ValueError("rejected by the hardware")
+            return " ".join([name] + [str(i) for i in arguments])
+
+        return call
+
+
+class client_stub:
+    address = ("stub", 0)
+
+    def __init__(self):
+        self.answers = []
+
+    def send_line(self, message: str):
+        self.answers.append(message)
+
+
+class test_tcp_dispatch(TestCase):
+    def setUp(self):
+        gpiozero.Device.pin_factory = MockFactory()
+        andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+        self.server = andino_tcp("io", 0, reply_to_requester=True)
+        self.server.x1_instance = stub_x1()
+        self.client = client_stub()
+
+    def send(self, line: str) -> list:
+        self.client.answers = []
+        self.server._i_handle_tcp_input(line, self.client)
+        return self.client.answers
+
+    def test_relays(self):
+        for i in range(1, 9):
+            self.assertEqual([f"set_relay {i} 1"], self.send(f"REL{i} 1"))
+            self.assertEqual([f"pulse_relay {i} 500"], self.send(f"RPU{i} 500"))
+
+    def test_arguments(self):
+        self.assertEqual(["info"], self.send("INFO"))
+        self.assertEqual(["set_polling 10"], self.send("poll 10"))
+        self.assertEqual(["set_edge_detection True"], self.send("EDGE 1"))
+        self.assertEqual(["set_send_relays_status False"], self.send("REL? 0"))
+        self.assertEqual(["set_change_pattern [0, 1, 1]"], self.send("CHNP 011"))
+        # further arguments are ignored like before
+        self.assertEqual(["get_counters 1"], self.send("CNTR 1 2"))
+
+    def test_errors(self):
+        calls = len(self.server.x1_instance.calls)
+        self.assertEqual(["ERROR"], self.send("REL1"))
+        self.assertEqual(["ERROR"], self.send("REL1 on"))
+        self.assertEqual(["ERROR"], self.send("EDGE x"))
+        self.assertEqual(calls, len(self.server.x1_instance.calls))
+        self.assertEqual(["ERROR"], self.send("DEBO -1"))
+        self.assertEqual([], self.send("REL9 1"))
+        self.assertEqual([], self.send("RELX 1"))
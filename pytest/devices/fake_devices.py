@@ -0,0 +1,322 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+"""
+Stand-ins for serial devices on a pseudo terminal pair (linux only).
+The device under test opens fake.port like a real serial port.
+fake_smbus replaces smbus2.SMBus and fake_ssd1306 an OLED on the i2c bus, both work on every platform.
+"""
+import ctypes
+import os
+import select
+import threading
+import time
+
+
+class pty_device:
+    def __init__(self):
+        # imported here, the i2c fakes of this module are used where these modules do not exist
+        import pty
+        import tty
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        tty.setraw(self._master)
+        self.port: str = os.ttyname(self._slave)
+        self.received = bytearray()
+        self.running = True
+        self._thread = threading.Thread(target=self._read_thread)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def write(self, data: bytes):
+        os.write(self._master, data)
+
+    def stop(self):
+        self.running = False
+        self._thread.join(1)
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _read_thread(self):
+        while self.running:
+            readable, _, _ = select.select([self._master], [], [], 0.05)
+            if readable:
+                try:
+                    data = os.read(self._master, 65536)
+                except OSError:
+                    return
+                self.on_data(data)
+
+    def on_data(self, data: bytes):
+        self.received += data
+
+
+class fake_x1(pty_device):
+    """
+    Confirms every command by echoing it like the x1 controller
+    """
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.commands = []
+        # commands which are never confirmed
+        self.ignore = set()
+        self._buffer = bytearray()
+        super().__init__()
+
+    def on_data(self, data: bytes):
+        self._buffer += data
+        index = self._buffer.find(b"\r\n")
+        while index >= 0:
+            command = bytes(self._buffer[:index])
+            del self._buffer[:index + 2]
+            self.commands.append(command.decode())
+            if command.decode() in self.ignore:
+                index = self._buffer.find(b"\r\n")
+                continue
+            if self.delay:
+                time.sleep(self.delay)
+            self.write(command + b"\r\n")
+            index = self._buffer.find(b"\r\n")
+
+
+class fake_nextion(pty_device):
+    """
+    Answers get and sendme like a nextion display, numeric attributes are numbers, all others strings,
+    get of a constant in quotes answers the string, get or set of an attribute in invalid answers 0x1A.
+    After bkcmd=3 every other command is acknowledged with 0x01
+    """
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.commands = []
+        self.attributes = {}
+        self.page = 0
+        self.bkcmd = 2
+        # commands which are never answered
+        self.ignore = set()
+        # attributes which do not exist
+        self.invalid = set()
+        self._buffer = bytearray()
+        super().__init__()
+
+    def on_data(self, data: bytes):
+        self._buffer += data
+        index = self._buffer.find(b"\xff\xff\xff")
+        while index >= 0:
+            command = bytes(self._buffer[:index]).decode("iso-8859-1")
+            del self._buffer[:index + 3]
+            self.commands.append(command)
+            index = self._buffer.find(b"\xff\xff\xff")
+            if command in self.ignore:
+                continue
+            if self.delay:
+                time.sleep(self.delay)
+            if command == "sendme":
+                self.write(bytes([0x66, self.page]) + b"\xff\xff\xff")
+            elif command.startswith("get "):
+                name = command[4:]
+                if name in self.invalid:
+                    self.write(b"\x1a\xff\xff\xff")
+                    continue
+                if len(name) > 1 and name[0] == name[-1] == '"':
+                    value = name[1:-1]
+                else:
+                    value = self.attributes.get(name, 0)
+                if isinstance(value, int):
+                    self.write(b"\x71" + value.to_bytes(4, "little") + b"\xff\xff\xff")
+                else:
+                    self.write(b"\x70" + value.encode("iso-8859-1") + b"\xff\xff\xff")
+            else:
+                if command.startswith("bkcmd="):
+                    self.bkcmd = int(command[6:])
+                if command.split("=")[0] in self.invalid:
+                    self.write(b"\x1a\xff\xff\xff")
+                elif self.bkcmd == 3:
+                    self.write(b"\x01\xff\xff\xff")
+
+
+class fake_nextion_upload(pty_device):
+    """
+    Accepts a tft upload like a nextion display (whmi-wri and whmi-wris), the file ends up in image.
+    With whmi-wris the display answers the first block with 0x08 and resume_offset.
+    If baud is set, connect is only answered when the port is set to this baud rate
+    and uploads only start up to max_upload_baud
+    """
+
+    def __init__(self, resume_offset: int = 0, block_delay: float = 0, baud: int = None,
+                 max_upload_baud: int = None):
+        self.resume_offset = resume_offset
+        self.block_delay = block_delay
+        self.baud = baud
+        self.max_upload_baud = max_upload_baud
+        self.commands = []
+        self.image = bytearray()
+        self.received_bytes = 0
+        self._uploading = False
+        self._protocol = None
+        self._size = 0
+        self._position = 0
+        self._block = 0
+        self._buffer = bytearray()
+        super().__init__()
+
+    def on_data(self, data: bytes):
+        if self._uploading:
+            self._on_upload_data(data)
+            return
+        self._buffer += data
+        index = self._buffer.find(b"\xff\xff\xff")
+        while index >= 0:
+            command = bytes(self._buffer[:index]).decode("ascii")
+            del self._buffer[:index + 3]
+            index = self._buffer.find(b"\xff\xff\xff")
+            if not command:
+                continue
+            self.commands.append(command)
+            if command == "connect":
+                import termios
+                if self.baud is not None and termios.tcgetattr(self._slave)[4] != getattr(termios, f"B{self.baud}"):
+                    continue
+                self.write(b"comok 1,30601-0,NX4832T035_011R,130,61488,D264B8204F0E1828,16777216\xff\xff\xff")
+            elif command.startswith("whmi-wri"):
+                self._protocol, parameters = command.split(" ")
+                self._size, baud = [int(i) for i in parameters.split(",")[:2]]
+                if self.max_upload_baud is not None and baud > self.max_upload_baud:
+                    continue
+                self.image = bytearray(self._size)
+                self._position = 0
+                self._block = 0
+                self._uploading = True
+                self.write(b"\x05")
+
+    def _on_upload_data(self, data: bytes):
+        self.received_bytes += len(data)
+        self.image[self._position:self._position + len(data)] = data
+        self._position += len(data)
+        self._block += len(data)
+        if self._block >= 4096 or self._position >= self._size:
+            self._block = 0
+            if self.block_delay:
+                time.sleep(self.block_delay)
+            if self._protocol == "whmi-wris" and self._position <= 4096 and self.resume_offset:
+                self._position = self.resume_offset
+                self.write(b"\x08" + self.resume_offset.to_bytes(4, "little"))
+            elif self._protocol == "whmi-wris" and self._position <= 4096:
+                self.write(b"\x08" + bytes(4))
+            else:
+                self.write(b"\x05")
+            if self._position >= self._size:
+                self._uploading = False
+
+
+class fake_smbus:
+    """
+    RFID/keyboard controller on a smbus2.SMBus compatible bus. Characters passed to feed are buffered and
+    returned by reads, an empty buffer reads as spaces. The interrupt pin (gpiozero MockFactory) is high while
+    characters are buffered
+    """
+
+    def __init__(self, interrupt_pin=None, chars_per_transaction: int = None):
+        self.interrupt_pin = interrupt_pin
+        # firmware answering only this many characters per read, None answers as many as requested
+        self.chars_per_transaction = chars_per_transaction
+        self.transactions = 0
+        self.written = []
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def feed(self, chars: str):
+        with self._lock:
+            self._buffer += chars.encode("ascii")
+        # mock pins call edge handlers in this thread, outside the lock
+        self._update_interrupt()
+
+    def _take(self, count: int) -> bytes:
+        if self.chars_per_transaction is not None:
+            count = min(count, self.chars_per_transaction)
+        data = bytes(self._buffer[:count])
+        del self._buffer[:count]
+        return data
+
+    def _update_interrupt(self):
+        if self.interrupt_pin is not None:
+            if self._buffer:
+                self.interrupt_pin.drive_high()
+            else:
+                self.interrupt_pin.drive_low()
+
+    def open(self, bus):
+        pass
+
+    def close(self):
+        pass
+
+    def read_byte(self, i2c_addr, force=None):
+        with self._lock:
+            self.transactions += 1
+            data = self._take(1)
+        self._update_interrupt()
+        return data[0] if data else 0x20
+
+    def i2c_rdwr(self, *i2c_msgs):
+        with self._lock:
+            for msg in i2c_msgs:
+                self.transactions += 1
+                data = self._take(msg.len)
+                data += b" " * (msg.len - len(data))
+                ctypes.memmove(msg.buf, data, msg.len)
+        self._update_interrupt()
+
+    def write_block_data(self, i2c_addr, register, data, force=None):
+        self.written.append(bytes(data))
+
+
+class fake_ssd1306:
+    """
+    SSD1306 in horizontal addressing mode, write takes one i2c transaction. Commands set the column and page
+    window, data fills it column by column and wraps to the next page
+    """
+
+    def __init__(self, width: int = 128, height: int = 64):
+        self.width = width
+        self.pages = height // 8
+        self.memory = bytearray(width * self.pages)
+        self.transactions = 0
+        self.bytes_written = 0
+        self._window = (0, width - 1, 0, self.pages - 1)
+        self._column = 0
+        self._page = 0
+
+    def write(self, data: bytes):
+        self.transactions += 1
+        self.bytes_written += len(data)
+        if data[0] == 0x40:
+            for byte in data[1:]:
+                self._write_data(byte)
+            return
+        commands = list(data[1:])
+        while commands:
+            command = commands.pop(0)
+            if command == 0x21:
+                first, last = commands.pop(0), commands.pop(0)
+                self._window = (first, last) + self._window[2:]
+                self._column = first
+            elif command == 0x22:
+                first, last = commands.pop(0), commands.pop(0)
+                self._window = self._window[:2] + (first, last)
+                self._page = first
+
+    def _write_data(self, byte: int):
+        first_column, last_column, first_page, last_page = self._window
+        self.memory[self._page * self.width + self._column] = byte
+        self._column += 1
+        if self._column > last_column:
+            self._column = first_column
+            self._page += 1
+            if self._page > last_page:
+                self._page = first_page
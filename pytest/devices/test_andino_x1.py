@@ -0,0 +1,113 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import sys
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+from andinopy.base_devices.andinox1 import andino_x1
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "requires a pseudo terminal")
+class test_andino_x1(TestCase):
+    def setUp(self):
+        from pytest.devices.fake_devices import fake_x1
+        self.fake = fake_x1()
+        self.x1 = andino_x1(lambda x: None, port=self.fake.port)
+        self.x1.start()
+
+    def tearDown(self):
+        self.x1.stop()
+        self.fake.stop()
+
+    def test_confirm(self):
+        start = time.perf_counter()
+        self.assertEqual("POLL 10", self.x1.set_polling(10))
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_timeout(self):
+        self.x1.timeout = 0.1
+        self.fake.delay = 0.3
+        self.assertEqual("ERROR", self.x1.set_polling(10))
+        # the late confirmation is kept as unsolicited answer
+        time.sleep(0.3)
+        self.assertEqual(["POLL 10"], list(self.x1.received))
+
+    def test_concurrent(self):
+        results = {}
+
+        def relay(i: int):
+            results[i] = self.x1.set_relay(i, 1)
+
+        threads = [threading.Thread(target=relay, args=[i]) for i in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual({i: f"REL{i} 1" for i in range(1, 9)}, results)
+        self.assertEqual(0, len(self.x1.received))
+
+    def test_received_bounded(self):
+        for i in range(200):
+            self.x1.handle_receive(f"unsolicited {i}")
+        self.assertEqual(self.x1.received.maxlen, len(self.x1.received))
+        self.assertEqual("unsolicited 199", self.x1.received[-1])
+
+    def test_send_many(self):
+        commands = [f"REL{i} 1" for i in range(1, 9)] + ["POLL 10", "SEND 1000", "DEBO 3", "POLL 10"]
+        self.fake.ignore.add("DEBO 3")
+        self.x1.timeout = 0.2
+        expected = commands[:]
+        expected[10] = "ERROR"
+        self.assertEqual(expected, self.x1.send_many(commands, window=4))
+        self.assertEqual(commands, self.fake.commands)
+
+    def tcp_server(self, answers: list):
+        import os
+        import gpiozero
+        from gpiozero.pins.mock import MockFactory
+        import andinopy
+        from andinopy.tcp.andino_tcp import andino_tcp
+        gpiozero.Device.pin_factory = MockFactory()
+        andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+        server = andino_tcp("io", 0, reply_to_requester=True)
+        server.x1_instance = self.x1
+
+        class client_stub:
+            address = ("stub", 0)
+
+            @staticmethod
+            def send_line(message: str):
+                answers.append(message)
+
+        return server, client_stub
+
+    def test_tcp_batch(self):
+        answers = []
+        server, client = self.tcp_server(answers)
+        server._i_handle_tcp_input("BATCH POLL 10; rel1 1;PING;SEND 1000;BATCH", client)
+        self.assertEqual(["POLL 10", "REL1 1", "PING", "SEND 1000", "ERROR"], answers)
+        self.assertEqual(["POLL 10", "REL1 1", "SEND 1000"], self.fake.commands)
+
+    def test_tcp_batch_like_single(self):
+        commands = ["REL1 abc", "SKIP 2", "EDGE 1", "CNTR 1", "RPU2 500", "POLL"]
+        single = []
+        server, client = self.tcp_server(single)
+        for command in commands:
+            server._i_handle_tcp_input(command, client)
+        sent = list(self.fake.commands)
+        self.fake.commands.clear()
+        batched = []
+        server, client = self.tcp_server(batched)
+        server._i_handle_tcp_input("BATCH " + ";".join(commands), client)
+        # a batch only changes when the commands are sent
+        self.assertEqual(["ERROR", "SKIP 2", "EDGE 1", "ERROR", "RPU2 500", "ERROR"], single)
+        self.assertEqual(single, batched)
+        self.assertEqual(["SKIP 2", "EDGE 1", "RPU2 500"], sent)
+        self.assertEqual(sent, self.fake.commands)
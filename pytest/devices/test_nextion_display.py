@@ -5,10 +5,14 @@
 #   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
 #                                     |_|    |___/
 # by Jakob Groß
+import asyncio
 import sys
+import threading
 import time
+import unittest
+from concurrent.futures import Future
 from unittest import TestCase
-from andinopy.base_devices.nextion_display import display
+from andinopy.base_devices.nextion_display import display, REQUEST_GET, REQUEST_PAGE
 
 
 class test_nextion(TestCase):
@@ -121,3 +125,299 @@ class test_nextion(TestCase):
             self.assertEqual("y", input("Is the progressbar full? y/n"))
         finally:
             my_display.stop()
+
+
+class test_nextion_frames(TestCase):
+    def setUp(self):
+        self.nextion = display()
+        self.touches = []
+        self.strings = []
+        self.nextion.on_display_touch = lambda page, obj, press: self.touches.append((page, obj, press))
+        self.nextion.on_display_string = self.strings.append
+
+    def test_frames(self):
+        self.nextion._feed(b"\x65\x01\x02\x01\xff\xff\xff\x71\x2a\x00\x00\x00\xff\xff\xff")
+        self.assertEqual([(1, 2, 1)], self.touches)
+        self.assertEqual(42, self.nextion.requested_value)
+        self.nextion._feed(b"\x70abc\xff\xff\xff\xff\xff\xff")
+        self.assertEqual("abc", self.nextion.requested_value)
+        self.assertEqual(0, len(self.nextion._read_buffer))
+
+    def test_split_frames(self):
+        stream = b"\x65\x00\x03\x00\xff\xff\xff\x5a\x5b\xff\xff\xff" * 3
+        for i in range(len(stream)):
+            self.nextion._feed(stream[i:i + 1])
+        self.assertEqual([(0, 3, 0)] * 3, self.touches)
+        self.assertEqual([bytearray(b"\x5a\x5b")] * 3, self.strings)
+        self.assertEqual(0, len(self.nextion._read_buffer))
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "requires a pseudo terminal")
+    def test_port(self):
+        from pytest.devices.fake_devices import pty_device
+        fake = pty_device()
+        self.nextion.serial_port = fake.port
+        try:
+            self.nextion.start()
+            fake.write(b"\x65\x01\x02\x01\xff\xff\xff" * 100)
+            end = time.time() + 2
+            while len(self.touches) < 100 and time.time() < end:
+                time.sleep(0.01)
+            self.assertEqual([(1, 2, 1)] * 100, self.touches)
+        finally:
+            self.nextion.stop()
+            fake.stop()
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "requires a pseudo terminal")
+class test_nextion_requests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from pytest.devices.fake_devices import fake_nextion
+        cls.fake = fake_nextion()
+        cls.fake.attributes = {"n0.val": 42, "t0.txt": "andino"}
+        cls.nextion = display(serial_port=cls.fake.port)
+        cls.nextion.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.nextion.stop()
+        cls.fake.stop()
+
+    def setUp(self):
+        self.fake.delay = 0
+        self.fake.ignore = set()
+        self.fake.invalid = set()
+        self.nextion.timeout = 1
+
+    def test_get_attr(self):
+        start = time.perf_counter()
+        self.assertEqual(42, self.nextion.get_attr("n0.val"))
+        self.assertEqual("andino", self.nextion.get_attr("t0.txt"))
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+    def test_get_page(self):
+        self.fake.page = 3
+        self.assertEqual(3, self.nextion.get_page())
+
+    def test_timeout(self):
+        self.nextion.timeout = 0.1
+        self.fake.ignore = {"get n1.val"}
+        self.assertIsNone(self.nextion.get_attr("n1.val"))
+        self.assertEqual(42, self.nextion.get_attr("n0.val"))
+        self.assertEqual(0, len(self.nextion._pending))
+
+    def test_late_answer(self):
+        self.fake.attributes["n1.val"] = 1
+        self.nextion.timeout = 0.1
+        self.fake.delay = 0.3
+        self.assertIsNone(self.nextion.get_attr("n0.val"))
+        self.fake.delay = 0
+        # the answer of n0.val arrives after the timeout and must not be taken for n1.val
+        self.nextion.timeout = 1
+        self.assertEqual(1, self.nextion.get_attr("n1.val"))
+        self.assertEqual(42, self.nextion.get_attr("n0.val"))
+
+    def test_error_between_gets(self):
+        self.fake.invalid = {"bad.val"}
+        self.assertEqual([None, 42], self.nextion.get_attrs(["bad.val", "n0.val"]))
+        self.assertEqual([42, None, "andino"], self.nextion.get_attrs(["n0.val", "bad.val", "t0.txt"]))
+
+    def test_failed_set_between_gets(self):
+        self.fake.invalid = {"bad.val"}
+        first = self.nextion.request("get n0.val")
+        self.nextion.set_attr("bad", "val", "3")
+        second = self.nextion.request("get t0.txt")
+        self.assertEqual(42, self.nextion._wait_request(first, 1))
+        self.assertEqual("andino", self.nextion._wait_request(second, 1))
+        self.assertEqual([42, "andino"], self.nextion.get_attrs(["n0.val", "t0.txt"]))
+
+    def test_reply_kind(self):
+        # a number does not answer sendme
+        self.nextion._add_pending((Future(), REQUEST_PAGE, None))
+        self.nextion._resolve_request(REQUEST_GET, 7)
+        self.assertEqual(7, self.nextion.requested_value)
+        self.assertEqual(1, len(self.nextion._pending))
+        self.nextion._resolve_request(REQUEST_PAGE, 2)
+        self.assertEqual(0, len(self.nextion._pending))
+
+    def test_concurrent(self):
+        self.fake.attributes.update({f"n{i}.val": i for i in range(1, 9)})
+        results = {}
+
+        def read(i):
+            results[i] = [self.nextion.get_attr(f"n{i}.val") for _ in range(10)]
+
+        threads = [threading.Thread(target=read, args=[i]) for i in range(1, 9)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual({i: [i] * 10 for i in range(1, 9)}, results)
+
+    def test_get_attrs(self):
+        self.fake.delay = 0.005
+        self.assertEqual([42, "andino", 42], self.nextion.get_attrs(["n0.val", "t0.txt", "n0.val"]))
+
+    def test_async(self):
+        async def read():
+            return await asyncio.gather(self.nextion.get_attr_async("n0.val"),
+                                        self.nextion.get_attr_async("t0.txt"))
+
+        self.assertEqual([42, "andino"], asyncio.run(read()))
+        self.nextion.timeout = 0.1
+        self.fake.ignore = {"get n1.val"}
+        self.assertIsNone(asyncio.run(self.nextion.get_attr_async("n1.val")))
+        self.nextion.timeout = 1
+        self.assertEqual(42, asyncio.run(self.nextion.get_attr_async("n0.val")))
+        self.assertEqual(0, len(self.nextion._pending))
+
+
+class recording_port:
+    def __init__(self):
+        self.written = []
+
+    def write(self, data: bytes):
+        self.written.append(bytes(data))
+
+
+class test_nextion_shadow(TestCase):
+    def setUp(self):
+        self.nextion = display()
+        self.nextion.port = recording_port()
+
+    def test_skip_identical(self):
+        self.nextion.set_text("t0", "andino")
+        self.nextion.set_text("t0", "andino")
+        self.nextion.set_attr("t0", "pco", "255")
+        self.nextion.set_attr("t0", "pco", "255")
+        self.nextion.set_text("t0", "x1")
+        self.assertEqual([b't0.txt="andino"\xff\xff\xff', b't0.pco=255\xff\xff\xff', b't0.txt="x1"\xff\xff\xff'],
+                         self.nextion.port.written)
+        self.assertEqual({"hits": 2, "misses": 3}, self.nextion.shadow_statistics())
+
+    def test_invalidate(self):
+        for invalidate in [lambda: self.nextion.set_page("page1"),
+                           self.nextion.reset,
+                           lambda: self.nextion.send_raw("vis t0,0"),
+                           lambda: self.nextion._feed(b"\x66\x01\xff\xff\xff"),
+                           lambda: self.nextion._feed(b"\x88\xff\xff\xff"),
+                           lambda: self.nextion._feed(b"\x1a\xff\xff\xff"),
+                           lambda: self.nextion._feed(b"\x1b\xff\xff\xff")]:
+            self.nextion.set_text("t0", "andino")
+            self.nextion.port.written.clear()
+            invalidate()
+            self.nextion.set_text("t0", "andino")
+            self.assertEqual(b't0.txt="andino"\xff\xff\xff', self.nextion.port.written[-1])
+
+    def test_disabled(self):
+        self.nextion.use_shadow = False
+        self.nextion.set_text("t0", "andino")
+        self.nextion.set_text("t0", "andino")
+        self.assertEqual(2, len(self.nextion.port.written))
+
+    def test_not_encodable(self):
+        self.nextion.set_text("t0", "\u20ac")
+        self.nextion.encoding = "utf-8"
+        self.nextion.set_text("t0", "\u20ac")
+        self.assertEqual(1, len(self.nextion.port.written))
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "requires a pseudo terminal")
+class test_nextion_writer(TestCase):
+    def setUp(self):
+        from pytest.devices.fake_devices import fake_nextion
+        self.fake = fake_nextion()
+        self.nextion = display(serial_port=self.fake.port)
+        self.nextion.use_shadow = False
+        self.nextion.start()
+
+    def tearDown(self):
+        self.nextion.stop()
+        self.fake.stop()
+
+    def wait_for(self, command: str):
+        end = time.time() + 2
+        while command not in self.fake.commands and time.time() < end:
+            time.sleep(0.01)
+
+    def test_order(self):
+        for i in range(200):
+            self.nextion.set_text(f"t{i}", str(i))
+        self.assertTrue(self.nextion.flush(2))
+        self.wait_for('t199.txt="199"')
+        self.assertEqual([f't{i}.txt="{i}"' for i in range(200)], self.fake.commands)
+
+    def test_collapse(self):
+        self.nextion.set_debug_level(3)
+        # slow acknowledgements keep the queue filled
+        self.fake.delay = 0.02
+        for i in range(50):
+            self.nextion.set_text("t0", str(i))
+        self.assertTrue(self.nextion.flush(2))
+        self.wait_for('t0.txt="49"')
+        texts = [c for c in self.fake.commands if c.startswith("t0")]
+        self.assertLess(len(texts), 50)
+        self.assertEqual('t0.txt="49"', texts[-1])
+        self.assertEqual(50, len(texts) + self.nextion.collapsed)
+
+    def test_barrier(self):
+        self.nextion.set_debug_level(3)
+        self.fake.delay = 0.02
+        for i in range(10):
+            self.nextion.set_text("t1", "filler")
+        self.nextion.set_text("t0", "a")
+        self.nextion.set_page("page1")
+        self.nextion.set_text("t0", "b")
+        self.assertTrue(self.nextion.flush(2))
+        self.wait_for('t0.txt="b"')
+        commands = [c for c in self.fake.commands if not c.startswith("t1")]
+        self.assertEqual(['bkcmd=3', 't0.txt="a"', 'page page1', 't0.txt="b"'], commands)
+
+    def test_window(self):
+        self.nextion.set_debug_level(3)
+        self.fake.ignore = {f't{i}.txt="x"' for i in range(20)}
+        self.nextion.timeout = 0.2
+        for i in range(20):
+            self.nextion.set_text(f"t{i}", "x")
+        time.sleep(0.1)
+        # no acknowledgements, only one window was written
+        self.assertEqual(self.nextion.ack_window, len(self.fake.commands) - 1)
+        # missing acknowledgements don't block forever
+        self.assertTrue(self.nextion.flush(2))
+
+    def test_get_with_acks(self):
+        self.nextion.set_debug_level(3)
+        self.fake.attributes = {"n0.val": 7}
+        for i in range(20):
+            self.nextion.set_text(f"t{i}", "x")
+        self.assertEqual(7, self.nextion.get_attr("n0.val"))
+
+    def test_failed_set_with_acks(self):
+        self.nextion.set_debug_level(3)
+        self.fake.attributes = {"n0.val": 7, "n1.val": 8}
+        self.fake.invalid = {"bad.val"}
+        first = self.nextion.request("get n0.val")
+        self.nextion.set_attr("bad", "val", "3")
+        self.nextion.set_text("t0", "x")
+        second = self.nextion.request("get n1.val")
+        self.assertEqual(7, self.nextion._wait_request(first, 1))
+        self.assertEqual(8, self.nextion._wait_request(second, 1))
+
+    def test_request_back_pressure(self):
+        self.nextion.set_debug_level(3)
+        self.nextion.timeout = 5
+        self.nextion.max_queue = 2
+        self.fake.ignore = {f't{i}.txt="x"' for i in range(10)}
+        # one unacknowledged window is written, two commands wait in the queue
+        for i in range(10):
+            self.nextion.set_text(f"t{i}", "x")
+        requester = threading.Thread(target=self.nextion.request, args=["get n0.val"])
+        requester.start()
+        time.sleep(0.1)
+        self.assertTrue(requester.is_alive())
+        # the reader can still resolve answers while the request waits for room in the queue
+        self.assertTrue(self.nextion._pending_lock.acquire(timeout=0.5))
+        self.nextion._pending_lock.release()
+        self.nextion.stop()
+        requester.join(2)
+        self.assertFalse(requester.is_alive())
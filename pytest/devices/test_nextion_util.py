@@ -0,0 +1,134 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import TestCase
+
+import serial
+
+from andinopy import nextion_util
+
+TFT_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), "LCD.tft")
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "requires a pseudo terminal")
+class test_nextion_upload(TestCase):
+    def setUp(self):
+        from pytest.devices.fake_devices import fake_nextion_upload
+        self.fake = fake_nextion_upload()
+        self.port = serial.Serial(self.fake.port, 9600, timeout=None)
+        self.size = os.path.getsize(TFT_FILE)
+        with open(TFT_FILE, "rb") as f:
+            self.content = f.read()
+        self.cache_file = tempfile.mktemp(suffix=".json")
+
+    def tearDown(self):
+        self.port.close()
+        self.fake.stop()
+        for file in [self.cache_file, self.cache_file + ".lock"]:
+            if os.path.exists(file):
+                os.remove(file)
+
+    def upload(self, protocol: str) -> dict:
+        self.assertTrue(nextion_util.get_baud_rate(self.port, cache_file=self.cache_file))
+        self.assertTrue(nextion_util.force_max_baud(self.port, self.size, protocol=protocol, cache_file=self.cache_file))
+        statistics = {}
+        self.assertTrue(nextion_util.upload_image(self.port, TFT_FILE, self.size, protocol=protocol,
+                                                  statistics=statistics, diagnostics=False))
+        return statistics
+
+    def test_v1_0(self):
+        statistics = self.upload(nextion_util.PROTOCOL_V1_0)
+        self.assertEqual(self.content, bytes(self.fake.image))
+        self.assertEqual(self.size, statistics["bytes"])
+        self.assertIn(f"whmi-wri {self.size},921600,0", self.fake.commands)
+        # driven by the acknowledgements, the fixed 0.5 s per block took 40 s for this file
+        self.assertLess(statistics["seconds"], 5)
+
+    def test_v1_2(self):
+        statistics = self.upload(nextion_util.PROTOCOL_V1_2)
+        self.assertEqual(self.content, bytes(self.fake.image))
+        self.assertIn(f"whmi-wris {self.size},921600,1", self.fake.commands)
+        self.assertEqual(0, statistics["offset"])
+
+    def test_v1_2_resume(self):
+        self.fake.resume_offset = 40 * 4096
+        statistics = self.upload(nextion_util.PROTOCOL_V1_2)
+        self.assertEqual(self.fake.resume_offset, statistics["offset"])
+        self.assertEqual(self.content[self.fake.resume_offset:], bytes(self.fake.image[self.fake.resume_offset:]))
+        # only the first block and the rest after the offset were sent
+        self.assertEqual(4096 + self.size - self.fake.resume_offset, self.fake.received_bytes)
+
+    def test_missing_ack(self):
+        self.assertTrue(nextion_util.get_baud_rate(self.port, cache_file=self.cache_file))
+        self.assertTrue(nextion_util.force_max_baud(self.port, self.size, cache_file=self.cache_file))
+        self.fake.block_delay = 0.5
+        self.assertFalse(nextion_util.upload_image(self.port, TFT_FILE, self.size, timeout=0.2, diagnostics=False))
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "requires a pseudo terminal")
+class test_nextion_baud_cache(TestCase):
+    def setUp(self):
+        from pytest.devices.fake_devices import fake_nextion_upload
+        self.fake = fake_nextion_upload(baud=115200, max_upload_baud=115200)
+        self.cache_file = tempfile.mktemp(suffix=".json")
+
+    def tearDown(self):
+        self.fake.stop()
+        for file in [self.cache_file, self.cache_file + ".lock"]:
+            if os.path.exists(file):
+                os.remove(file)
+
+    def connect(self) -> float:
+        start = time.perf_counter()
+        port = serial.Serial(self.fake.port, 9600, timeout=None)
+        try:
+            self.assertEqual(115200, nextion_util.get_baud_rate(port, cache_file=self.cache_file))
+            self.assertTrue(nextion_util.force_max_baud(port, 4096, cache_file=self.cache_file))
+            # finish the upload so the fake accepts commands again
+            port.write(bytes(4096))
+            self.assertEqual(b"\x05", port.read(1))
+        finally:
+            port.close()
+        return time.perf_counter() - start
+
+    def test_cached(self):
+        self.connect()
+        cached = nextion_util.read_cache(self.cache_file)[self.fake.port]
+        self.assertEqual(115200, cached["baud"])
+        self.assertEqual(115200, cached["upload_baud"])
+        self.assertEqual("NX4832T035_011R", cached["model"])
+        self.assertEqual(7, self.fake.commands.count("connect"))
+        self.fake.commands.clear()
+        self.assertLess(self.connect(), 1)
+        self.assertEqual(["connect", "whmi-wri 4096,115200,0"], self.fake.commands)
+
+    def test_stale_cache(self):
+        nextion_util.update_cache(self.fake.port, {"baud": 9600, "upload_baud": 921600}, self.cache_file)
+        self.connect()
+        self.assertEqual(115200, nextion_util.read_cache(self.cache_file)[self.fake.port]["baud"])
+
+    def test_broken_cache(self):
+        with open(self.cache_file, "w") as fp:
+            fp.write("{broken")
+        self.assertEqual({}, nextion_util.read_cache(self.cache_file))
+        self.connect()
+        self.assertEqual(115200, nextion_util.read_cache(self.cache_file)[self.fake.port]["baud"])
+
+    def test_parallel_updates(self):
+        threads = [threading.Thread(target=nextion_util.update_cache,
+                                    args=[f"/dev/tty{i}", {"baud": 9600}, self.cache_file]) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(20, len(nextion_util.read_cache(self.cache_file)))
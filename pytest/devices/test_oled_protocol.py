@@ -0,0 +1,77 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import random
+import time
+from unittest import TestCase
+
+from andinopy.base_devices.oled_protocol import parse_oled_command, format_oled_text, check_update, oled_update
+
+MODES = {"10": ([0], "font60"), "21": ([5, 40], "font21"), "30": ([2, 24, 46], "font20")}
+
+
+class test_oled_protocol(TestCase):
+    def test_text(self):
+        self.assertEqual(oled_update(columns=[["AndinoPy", "running"]]),
+                         parse_oled_command("<{AndinoPy}{running}>"))
+        self.assertEqual(oled_update(columns=[["a", "b"], ["c d", ""]]),
+                         parse_oled_command(" <{a} {b}>  <{c d}{}> "))
+
+    def test_braces_in_text(self):
+        self.assertEqual([["a>b", "<{x", "}", "\\"]], parse_oled_command(r"<{a>b}{<{x}{\}}{\\}>").columns)
+
+    def test_mode_info(self):
+        self.assertEqual(oled_update(modes=("21", None)), parse_oled_command("MODE 21"))
+        self.assertEqual(oled_update(modes=("21", "30")), parse_oled_command("mode 21 30"))
+        self.assertEqual(oled_update(info=True), parse_oled_command("INFO"))
+
+    def test_syntax_errors(self):
+        for command in ["", "MODE", "MODE 1 2 3", "INFO 1", "{a}", "<{a}", "<{a>", "<a>", "<{a}>x",
+                        "<{a}><{b}><{c}>", "<{a}\\>"]:
+            with self.assertRaises(ValueError, msg=command):
+                parse_oled_command(command)
+
+    def test_check_update(self):
+        check_update(oled_update(columns=[["a", "b"]]), MODES, ("21", None))
+        check_update(oled_update(columns=[["a"], ["a", "b", "c"]]), MODES, ("10", "30"))
+        check_update(oled_update(modes=("30", None)), MODES, ("21", None))
+        for update, config in [(oled_update(columns=[["a"]]), ("21", None)),
+                               (oled_update(columns=[["a", "b", "c"]]), ("21", None)),
+                               (oled_update(columns=[["a", "b"], ["c", "d"]]), ("21", None)),
+                               (oled_update(columns=[["a", "b"]]), ("21", "21")),
+                               (oled_update(modes=("99", None)), ("21", None))]:
+            with self.assertRaises(ValueError, msg=str(update)):
+                check_update(update, MODES, config)
+
+    def test_fuzz_round_trip(self):
+        rng = random.Random(3)
+        alphabet = "ab <>{}\\ ä1"
+        for _ in range(2000):
+            columns = [["".join(rng.choice(alphabet) for _ in range(rng.randrange(8)))
+                        for _ in range(rng.randrange(7))] for _ in range(rng.randrange(1, 3))]
+            self.assertEqual(columns, parse_oled_command(format_oled_text(columns)).columns)
+
+    def test_fuzz_garbage(self):
+        rng = random.Random(4)
+        alphabet = "ab <>{}\\"
+        for _ in range(5000):
+            command = "".join(rng.choice(alphabet) for _ in range(rng.randrange(20)))
+            try:
+                update = parse_oled_command(command)
+            except ValueError:
+                continue
+            self.assertEqual(update.columns, parse_oled_command(format_oled_text(update.columns)).columns)
+
+    def test_throughput(self):
+        command = "<{Counter}{12345}><{Temp}{21.5 C}>"
+        count = 20000
+        start = time.perf_counter()
+        for _ in range(count):
+            parse_oled_command(command)
+        rate = count / (time.perf_counter() - start)
+        print(f"\n{rate:.0f} OLED commands parsed per second")
+        self.assertGreater(rate, 10000)
@@ -0,0 +1,78 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import time
+from unittest import TestCase
+
+from andinopy.base_devices.oled_renderer import oled_renderer
+
+
+class test_oled_renderer(TestCase):
+    def setUp(self):
+        self.state = 0
+        self.pushed = []
+        self.push_delay = 0
+        self.renderer = oled_renderer(lambda: self.state, self.push, max_fps=20)
+        self.renderer.start()
+
+    def tearDown(self):
+        self.renderer.stop()
+
+    def push(self, frame):
+        time.sleep(self.push_delay)
+        self.pushed.append((frame, time.monotonic()))
+
+    def test_latest_state(self):
+        self.state = 1
+        self.renderer.request()
+        self.assertTrue(self.renderer.flush(1))
+        self.assertEqual([1], [frame for frame, _ in self.pushed])
+
+    def test_coalesce_burst(self):
+        self.push_delay = 0.05
+        start = time.perf_counter()
+        for i in range(1, 101):
+            self.state = i
+            self.renderer.request()
+        # requests don't wait for the slow display
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertTrue(self.renderer.flush(2))
+        frames = [frame for frame, _ in self.pushed]
+        self.assertLessEqual(len(frames), 3)
+        self.assertEqual(100, frames[-1])
+        self.assertEqual(100, self.renderer.statistics()["requests"])
+
+    def test_frame_rate(self):
+        end = time.monotonic() + 0.5
+        i = 0
+        while time.monotonic() < end:
+            i += 1
+            self.state = i
+            self.renderer.request()
+            time.sleep(0.005)
+        self.assertTrue(self.renderer.flush(1))
+        times = [t for _, t in self.pushed]
+        # 20 fps -> at least 50 ms between frames
+        self.assertTrue(all(b - a >= 0.045 for a, b in zip(times, times[1:])))
+        self.assertLessEqual(len(times), 12)
+        self.assertEqual(i, self.pushed[-1][0])
+
+    def test_skip_identical(self):
+        for _ in range(3):
+            self.renderer.request()
+            self.assertTrue(self.renderer.flush(1))
+        self.assertEqual(1, len(self.pushed))
+        self.assertEqual({"requests": 3, "rendered": 3, "pushed": 1, "skipped": 2}, self.renderer.statistics())
+
+    def test_render_error(self):
+        self.renderer._render = lambda: 1 / 0
+        self.renderer.request()
+        self.assertTrue(self.renderer.flush(1))
+        self.renderer._render = lambda: self.state
+        self.renderer.request()
+        self.assertTrue(self.renderer.flush(1))
+        self.assertEqual([0], [frame for frame, _ in self.pushed])
@@ -0,0 +1,91 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+from unittest import TestCase
+
+from PIL import Image, ImageDraw, ImageFont
+
+from andinopy.base_devices.oled_text import oled_text_renderer, OLED_MODES
+
+
+def load_font(name: str):
+    # the FreeType font built into Pillow stands in for the font file of the device
+    return ImageFont.load_default(int(name[len("font"):]))
+
+
+def draw_text(renderer: oled_text_renderer, config, text, rotate: bool = False) -> Image.Image:
+    """
+    Rendering of andino_io_oled before the line cache
+    """
+    image = Image.new('1', (128, 64))
+    draw = ImageDraw.Draw(image)
+    for j in range(len(config)):
+        if config[j] is not None:
+            row, font = OLED_MODES[config[j]]
+            for i in range(len(row)):
+                draw.text(xy=(0.5 * 128 * j, -2 + row[i]), font=renderer.font(font), text=text[j][i], fill=255)
+    if rotate:
+        image = image.rotate(180)
+    return image
+
+
+class test_oled_text(TestCase):
+    def setUp(self):
+        self.loaded = []
+
+        def counting_load_font(name):
+            self.loaded.append(name)
+            return load_font(name)
+
+        self.renderer = oled_text_renderer(128, 64, counting_load_font)
+
+    def test_same_pixels(self):
+        lines = ["AndinoPy", "running", "", " ", "gjpq|", "ÄÖÜ", "12:34", "W"]
+        for mode, (rows, _) in OLED_MODES.items():
+            for second in (None, "21", mode):
+                for shift in range(len(lines)):
+                    text = [[lines[(shift + i) % len(lines)] for i in range(6)],
+                            [lines[(shift + 3 + i) % len(lines)] for i in range(6)]]
+                    for rotate in (False, True):
+                        self.assertEqual(draw_text(self.renderer, (mode, second), text, rotate).tobytes(),
+                                         self.renderer.render((mode, second), text, rotate).tobytes(),
+                                         (mode, second, text, rotate))
+
+    def test_lazy_fonts(self):
+        self.assertEqual([], self.loaded)
+        self.renderer.render(("21", None), [["a", "b"]])
+        self.renderer.render(("21", None), [["c", "d"]])
+        self.assertEqual(["font21"], self.loaded)
+        self.renderer.render(("10", "60"), [["1"], ["1", "2", "3", "4", "5", "6"]])
+        self.assertEqual(["font21", "font60", "font8"], self.loaded)
+
+    def test_static_screen_hits(self):
+        text = [["Andino", "IO"], ["in", "out"]]
+        self.renderer.render(("20", "20"), text)
+        self.assertEqual({"hits": 0, "misses": 4, "lines": 4, "fonts": 1}, self.renderer.statistics())
+        self.renderer.render(("20", "20"), text)
+        self.assertEqual(4, self.renderer.hits)
+
+    def test_lru_eviction(self):
+        self.renderer.cache_size = 3
+        for text in ("a", "b", "c"):
+            self.renderer.line("font8", text)
+        # "a" is used again, "b" is the least recently used
+        self.renderer.line("font8", "a")
+        self.renderer.line("font8", "d")
+        self.assertEqual(3, self.renderer.statistics()["lines"])
+        misses = self.renderer.misses
+        self.renderer.line("font8", "a")
+        self.assertEqual(misses, self.renderer.misses)
+        self.renderer.line("font8", "b")
+        self.assertEqual(misses + 1, self.renderer.misses)
+
+    def test_missing_lines(self):
+        # after OLED MODE the text of the previous mode is drawn until the new text arrives
+        image = self.renderer.render(("30", "21"), [["a", "b"]])
+        self.assertEqual(draw_text(self.renderer, ("21", None), [["a", "b"]]).size, image.size)
+        self.assertEqual(draw_text(self.renderer, ("30", None), [["a", "b", ""]]).tobytes(), image.tobytes())
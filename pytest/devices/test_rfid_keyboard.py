@@ -87,3 +87,156 @@ class test_key_rfid(TestCase):
             self.assertIn(rfids[0], ["2457002B", "63915203", "A97784C1"])
         finally:
             rfid_keyboard.stop()
+
+
+class test_rfid_keyboard_i2c_block_read(TestCase):
+    def setUp(self):
+        import gpiozero
+        from gpiozero.pins.mock import MockFactory
+        from pytest.devices.fake_devices import fake_smbus
+        from andinopy.base_devices.rfid_keyboard.rfid_keyboard_i2c import rfid_keyboard_i2c
+        gpiozero.Device.pin_factory = MockFactory()
+        self.bus = fake_smbus(gpiozero.Device.pin_factory.pin(23))
+        self.rfid = []
+        self.keys = []
+        self.functions = []
+        self.rfid_keyboard = rfid_keyboard_i2c(on_rfid=self.rfid.append, on_keyboard=self.keys.append,
+                                               on_function=self.functions.append, i2c_bus=self.bus)
+        self.rfid_keyboard.start()
+        # let the first ping read pass
+        time.sleep(0.05)
+
+    def tearDown(self):
+        self.rfid_keyboard.stop()
+
+    def wait_for(self, values: list, count: int):
+        end = time.time() + 2
+        while len(values) < count and time.time() < end:
+            time.sleep(0.005)
+
+    def test_tag_in_one_transaction(self):
+        transactions = self.bus.transactions
+        self.bus.feed(":1234567890:")
+        self.wait_for(self.rfid, 1)
+        self.assertEqual(["1234567890"], self.rfid)
+        self.assertEqual(1, self.bus.transactions - transactions)
+
+    def test_long_buffer(self):
+        self.bus.feed(":1234567890:" * 5 + "12ao")
+        self.wait_for(self.functions, 2)
+        self.assertEqual(["1234567890"] * 5, self.rfid)
+        self.assertEqual(["1", "2"], self.keys)
+        self.assertEqual(["F1", "OK"], self.functions)
+
+    def test_single_char_firmware(self):
+        self.bus.chars_per_transaction = 1
+        self.bus.feed(":1234567890:5")
+        self.wait_for(self.keys, 1)
+        self.assertEqual(["1234567890"], self.rfid)
+        self.assertEqual(["5"], self.keys)
+
+
+class test_rfid_keyboard_i2c_interrupt(TestCase):
+    def setUp(self):
+        import gpiozero
+        from gpiozero.pins.mock import MockFactory
+        from pytest.devices.fake_devices import fake_smbus
+        from andinopy.base_devices.rfid_keyboard.rfid_keyboard_i2c import rfid_keyboard_i2c
+        gpiozero.Device.pin_factory = MockFactory()
+        self.bus = fake_smbus(gpiozero.Device.pin_factory.pin(23))
+        self.keys = []
+        self.rfid_keyboard = rfid_keyboard_i2c(on_keyboard=lambda key: self.keys.append((key, time.perf_counter())),
+                                               i2c_bus=self.bus)
+        self.rfid_keyboard.watchdog_idle = 0.2
+        self.rfid_keyboard.start()
+
+    def tearDown(self):
+        self.rfid_keyboard.stop()
+
+    def test_edge_before_watchdog(self):
+        # the latency itself is measured by benchmarks/bench_rfid_latency.py
+        for key in "0123456789":
+            start = time.perf_counter()
+            self.bus.feed(key)
+            end = time.time() + 1
+            while (not self.keys or self.keys[-1][0] != key) and time.time() < end:
+                time.sleep(0.0005)
+            self.assertEqual(key, self.keys[-1][0])
+            # read on the edge, not by the next watchdog ping
+            self.assertLess(self.keys[-1][1] - start, self.rfid_keyboard.watchdog_idle)
+        self.assertEqual(list("0123456789"), [key for key, _ in self.keys])
+
+    def test_watchdog_pings_when_idle(self):
+        transactions = self.bus.transactions
+        time.sleep(0.5)
+        self.assertGreaterEqual(self.bus.transactions - transactions, 2)
+
+    def test_watchdog_quiet_while_active(self):
+        transactions = self.bus.transactions
+        for _ in range(10):
+            self.bus.feed("1")
+            time.sleep(0.05)
+        # one read per key, no pings in between
+        self.assertEqual(10, self.bus.transactions - transactions)
+
+
+class decoder_only(rfid_keyboard_interface):
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def buzz_display(self, duration_ms: int) -> None:
+        pass
+
+    def _send_to_controller(self, value: str) -> None:
+        pass
+
+
+class test_rfid_keyboard_decoder(TestCase):
+    def setUp(self):
+        self.events = []
+        self.decoder = decoder_only()
+        self.decoder.on_rfid_string = lambda tag: self.events.append(("RFID", tag))
+        self.decoder.on_keyboard_button = lambda key: self.events.append(("KEY", key))
+        self.decoder.on_function_button = lambda key: self.events.append(("FUNCTION", key))
+
+    def test_chunk(self):
+        self.decoder._on_chars_received("1:12 34:a+-ox< 9")
+        self.assertEqual([("KEY", "1"), ("RFID", "1234"), ("FUNCTION", "F1"), ("FUNCTION", "UP"),
+                          ("FUNCTION", "DOWN"), ("FUNCTION", "OK"), ("FUNCTION", "ESC"), ("FUNCTION", "DEL"),
+                          ("KEY", "9")], self.events)
+
+    def test_split_tag(self):
+        for chunk in [":12", "34", "", "56:", "f"]:
+            self.decoder._on_chars_received(chunk)
+        self.assertEqual([("RFID", "123456"), ("FUNCTION", "F6")], self.events)
+
+    def test_same_as_single_chars(self):
+        stream = ":0815:12:AB:ab+<o"
+        for char in stream:
+            self.decoder._on_char_received(char)
+        single = list(self.events)
+        self.events.clear()
+        self.decoder._on_chars_received(stream)
+        self.assertEqual(single, self.events)
+
+    def test_unknown(self):
+        self.decoder._on_chars_received("1?\x05?\u20ac2")
+        self.assertEqual([("KEY", "1"), ("KEY", "2")], self.events)
+        self.assertEqual(4, self.decoder.unknown_bytes)
+        self.assertEqual({ord("?"): 2, 5: 1, 0x20ac: 1}, self.decoder.unknown_counts)
+
+    def test_key_map_model(self):
+        from andinopy.interfaces import rfid_keyboard_interface as interface
+        interface.key_maps["test"] = {"#": (interface.KEY_FUNCTION, "ENTER"), "1": (interface.KEY_KEYBOARD, "1")}
+        try:
+            self.decoder.key_map_model = "test"
+            self.decoder._on_chars_received("#1o:99:")
+            self.assertEqual([("FUNCTION", "ENTER"), ("KEY", "1"), ("RFID", "99")], self.events)
+            self.assertEqual(1, self.decoder.unknown_bytes)
+            with self.assertRaises(AttributeError):
+                self.decoder.key_map_model = "missing"
+        finally:
+            del interface.key_maps["test"]
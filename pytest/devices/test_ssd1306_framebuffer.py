@@ -0,0 +1,88 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import random
+from unittest import TestCase
+
+from PIL import Image, ImageDraw, ImageFont
+
+from andinopy.base_devices.ssd1306_framebuffer import ssd1306_framebuffer, image_to_pages
+from pytest.devices.fake_devices import fake_ssd1306
+
+# full frame as sent by adafruit_ssd1306 show(): 6 commands and the buffer with its control byte
+FULL_FRAME_BYTES = 6 * 2 + 1 + 1024
+
+
+def counter_image(value: int) -> Image.Image:
+    image = Image.new('1', (128, 64))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    draw.text(xy=(0, 5), text="Andino IO", font=font, fill=255)
+    draw.text(xy=(0, 40), text=f"Count {value}", font=font, fill=255)
+    return image
+
+
+def random_image(rng: random.Random) -> Image.Image:
+    return Image.frombytes('1', (128, 64), bytes(rng.getrandbits(8) for _ in range(1024)))
+
+
+class test_ssd1306_framebuffer(TestCase):
+    def setUp(self):
+        self.display = fake_ssd1306()
+        self.framebuffer = ssd1306_framebuffer(self.display.write)
+        self.sent = []
+        self.framebuffer.on_bytes_sent = self.sent.append
+
+    def test_image_to_pages(self):
+        image = random_image(random.Random(1))
+        expected = bytearray(1024)
+        for x in range(128):
+            for y in range(64):
+                if image.getpixel((x, y)):
+                    expected[(y // 8) * 128 + x] |= 1 << (y % 8)
+        self.assertEqual(bytes(expected), image_to_pages(image))
+
+    def test_first_frame_full(self):
+        image = counter_image(1)
+        self.framebuffer.show(image)
+        self.assertEqual(image_to_pages(image), bytes(self.display.memory))
+        self.assertEqual(7 + 1 + 1024, self.sent[0])
+        self.assertEqual(self.display.bytes_written, self.sent[0])
+
+    def test_counter_update(self):
+        self.framebuffer.set_cleared()
+        self.framebuffer.show(counter_image(41))
+        for value in range(42, 60):
+            self.framebuffer.show(counter_image(value))
+            self.assertEqual(image_to_pages(counter_image(value)), bytes(self.display.memory))
+        # a one line counter update saves at least 80% against the full frame
+        self.assertTrue(all(sent < FULL_FRAME_BYTES * 0.2 for sent in self.sent[1:]), self.sent)
+        self.assertEqual(sum(self.sent), self.framebuffer.bytes_sent)
+        self.assertEqual(19, self.framebuffer.frames)
+
+    def test_unchanged(self):
+        self.framebuffer.show(counter_image(1))
+        transactions = self.display.transactions
+        self.assertEqual(0, self.framebuffer.show(counter_image(1)))
+        self.assertEqual(transactions, self.display.transactions)
+
+    def test_invalidate(self):
+        self.framebuffer.show(counter_image(1))
+        self.display.memory[:] = bytes(1024)
+        self.framebuffer.invalidate()
+        self.framebuffer.show(counter_image(1))
+        self.assertEqual(image_to_pages(counter_image(1)), bytes(self.display.memory))
+
+    def test_random_changes(self):
+        rng = random.Random(2)
+        frame = bytearray(image_to_pages(random_image(rng)))
+        self.framebuffer.show_pages(bytes(frame))
+        for _ in range(200):
+            for _ in range(rng.randrange(1, 20)):
+                frame[rng.randrange(1024)] = rng.getrandbits(8)
+            self.framebuffer.show_pages(bytes(frame))
+            self.assertEqual(frame, self.display.memory)
@@ -0,0 +1,97 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import configparser
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+import andinopy
+
+
+class test_config(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.directory, "test.cfg")
+        self.saved_file = os.path.join(self.directory, "test_saved.cfg")
+        shutil.copy(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"), self.config_file)
+        andinopy.initialize_cfg(self.config_file)
+        andinopy.base_config["andino_tcp"]["config_save_delay"] = "0.2"
+
+    def tearDown(self):
+        andinopy.flush_base_config()
+        andinopy.initialize_cfg(os.path.join(os.path.dirname(andinopy.__file__), "default.cfg"))
+        shutil.rmtree(self.directory)
+
+    def saved_value(self) -> str:
+        saved = configparser.ConfigParser()
+        saved.read(self.saved_file)
+        return saved["io_x1_emulator"]["polling"]
+
+    def test_coalesced(self):
+        stats = andinopy.save_statistics()
+        for i in range(100):
+            andinopy.base_config["io_x1_emulator"]["polling"] = str(i)
+            andinopy.save_base_config()
+        self.assertFalse(os.path.isfile(self.saved_file))
+        time.sleep(0.5)
+        self.assertEqual("99", self.saved_value())
+        self.assertEqual(["test.cfg", "test_saved.cfg"], sorted(os.listdir(self.directory)))
+        self.assertEqual(100, andinopy.save_statistics()["requested"] - stats["requested"])
+        self.assertEqual(1, andinopy.save_statistics()["written"] - stats["written"])
+
+    def test_burst_longer_than_delay(self):
+        written = andinopy.save_statistics()["written"]
+        for i in range(6):
+            andinopy.base_config["io_x1_emulator"]["polling"] = str(i)
+            andinopy.save_base_config()
+            time.sleep(0.1)
+        # every change restarts the delay
+        self.assertEqual(written, andinopy.save_statistics()["written"])
+        time.sleep(0.3)
+        self.assertEqual("5", self.saved_value())
+        self.assertEqual(written + 1, andinopy.save_statistics()["written"])
+
+    def test_longest_wait(self):
+        andinopy.base_config["andino_tcp"]["config_save_delay"] = "0.05"
+        written = andinopy.save_statistics()["written"]
+        end = time.monotonic() + 0.05 * andinopy.MAX_SAVE_DELAYS + 0.2
+        while time.monotonic() < end:
+            andinopy.save_base_config()
+            time.sleep(0.01)
+        # changes without a pause are still written
+        self.assertLess(written, andinopy.save_statistics()["written"])
+
+    def test_flush(self):
+        andinopy.base_config["io_x1_emulator"]["polling"] = "42"
+        andinopy.save_base_config()
+        andinopy.flush_base_config()
+        self.assertEqual("42", self.saved_value())
+        written = andinopy.save_statistics()["written"]
+        andinopy.flush_base_config()
+        self.assertEqual(written, andinopy.save_statistics()["written"])
+
+    def test_immediate(self):
+        andinopy.base_config["andino_tcp"]["config_save_delay"] = "0"
+        andinopy.base_config["io_x1_emulator"]["polling"] = "7"
+        andinopy.save_base_config()
+        self.assertEqual("7", self.saved_value())
+
+    def test_failed_write(self):
+        andinopy.base_config["andino_tcp"]["config_save_delay"] = "0"
+        # a directory in place of the temporary file makes the write fail
+        os.mkdir(self.saved_file + ".tmp")
+        andinopy.base_config["io_x1_emulator"]["polling"] = "8"
+        with self.assertLogs("andinopy", "ERROR"):
+            andinopy.save_base_config()
+        self.assertFalse(os.path.isfile(self.saved_file))
+        os.rmdir(self.saved_file + ".tmp")
+        # still dirty, flushing retries
+        andinopy.flush_base_config()
+        self.assertEqual("8", self.saved_value())
@@ -0,0 +1,31 @@
+#       _              _ _
+#      / \   _ __   __| (_)_ __   ___  _ __  _   _
+#     / _ \ | '_ \ / _` | | '_ \ / _ \| '_ \| | | |
+#    / ___ \| | | | (_| | | | | | (_) | |_) | |_| |
+#   /_/   \_\_| |_|\__,_|_|_| |_|\___/| .__/ \__, |
+#                                     |_|    |___/
+# by Jakob Groß
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+import andinopy
+
+
+class test_imports(TestCase):
+    def test_disabled_devices_not_imported(self):
+        config = os.path.join(os.path.dirname(andinopy.__file__), "default.cfg")
+        statement = f"""
+import sys
+import andinopy
+andinopy.initialize_cfg({config!r})
+from andinopy.tcp.andino_tcp import andino_tcp
+server = andino_tcp(hardware="io", oled=False, temp=False, key_rfid=False, display=False)
+print(",".join(sys.modules))
+"""
+        result = subprocess.run([sys.executable, "-c", statement], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.dirname(andinopy.__file__)))
+        modules = result.stdout.strip().split(",")
+        for module in ("PIL", "serial", "smbus2", "busio", "adafruit_ssd1306", "setuptools"):
+            self.assertNotIn(module, modules)
@@ -10,7 +10,7 @@ from datetime import datetime
 
 setup(
     name="andinopy",
-    packages=find_packages(),
+    packages=find_packages(exclude=("benchmarks", "benchmarks.*")),
     version='0.2',
     description="Library for Andino.Systems Products",
     author="Jakob Groß - Clear Systems GmbH",